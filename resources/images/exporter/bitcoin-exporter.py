@@ -1,17 +1,31 @@
 import os
+import select
+import threading
 
 from authproxy import AuthServiceProxy
 from prometheus_client import Gauge, start_http_server
 
+# Metrics are read by the threads serving scrapes. They share one keep-alive
+# connection to bitcoind and take turns on it.
+rpc_lock = threading.Lock()
 
-# Ensure that all RPC calls are made with brand new http connections
-def auth_proxy_request(self, method, path, postdata):
-    self._set_conn()  # creates new http client connection
-    return self.oldrequest(method, path, postdata)
+
+def keep_alive_request(self, method, path, postdata):
+    conn = self._AuthServiceProxy__conn
+    with rpc_lock:
+        # bitcoind closes idle connections, which leaves them readable: reconnect
+        # before sending, as a request that was sent is never sent again
+        if conn.sock is not None and select.select([conn.sock], [], [], 0)[0]:
+            conn.close()
+        try:
+            return self.oldrequest(method, path, postdata)
+        except BaseException as e:
+            conn.close()
+            raise e
 
 
 AuthServiceProxy.oldrequest = AuthServiceProxy._request
-AuthServiceProxy._request = auth_proxy_request
+AuthServiceProxy._request = keep_alive_request
 
 
 # RPC Credentials for bitcoin node
@@ -1,22 +1,28 @@
 import argparse
 import base64
 import configparser
+import heapq
+import http.client
 import json
 import logging
 import os
 import pathlib
 import random
+import select
 import signal
 import struct
 import sys
 import tempfile
 import threading
-from time import sleep
+from collections.abc import Callable, Iterable, Mapping
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from time import monotonic, sleep
+from typing import Optional
 
 from kubernetes import client, config
 from kubernetes.stream import stream
 from ln_framework.ln import CLN, LND, LNNode
-from test_framework.authproxy import AuthServiceProxy
+from test_framework.authproxy import USER_AGENT, AuthServiceProxy
 from test_framework.blocktools import get_witness_script, script_BIP34_coinbase_height
 from test_framework.messages import (
     CBlock,
@@ -57,8 +63,9 @@ PSBT_SIGNET_BLOCK = (
 )
 
 NAMESPACE = None
-pods = client.V1PodList(items=[])
-cmaps = client.V1ConfigMapList(items=[])
+sclient = None
+# Set by `warnet run` to a precomputed description of the network, see discover_network()
+MANIFEST_ENV = "WARNET_MANIFEST"
 
 try:
     # Get the in-cluster k8s client to determine what we have access to
@@ -68,70 +75,243 @@ try:
     # Figure out what namespace we are in
     with open("/var/run/secrets/kubernetes.io/serviceaccount/namespace") as f:
         NAMESPACE = f.read().strip()
+except Exception:
+    # If there is no cluster config, the user might just be
+    # running the scenario file locally with --help
+    pass
+
 
+def _list(list_all, list_namespaced, **kwargs):
     try:
         # An admin with cluster access can list everything.
         # A wargames player with namespaced access will get a FORBIDDEN error here
-        pods = sclient.list_pod_for_all_namespaces()
-        cmaps = sclient.list_config_map_for_all_namespaces()
+        return list_all(**kwargs).items
     except Exception:
         # Just get whatever we have access to in this namespace only
-        pods = sclient.list_namespaced_pod(namespace=NAMESPACE)
-        cmaps = sclient.list_namespaced_config_map(namespace=NAMESPACE)
-except Exception:
-    # If there is no cluster config, the user might just be
-    # running the scenario file locally with --help
-    pass
+        return list_namespaced(namespace=NAMESPACE, **kwargs).items
+
+
+def discover_network() -> dict:
+    """
+    Describe the tanks, lightning nodes and channels the scenario can reach.
+
+    Only pods with a tank or lightning mission and ConfigMaps labelled with
+    channels are listed. `warnet run` may instead pass the description as a
+    file named by WARNET_MANIFEST, in which case nothing is listed at all.
+    """
+    if os.environ.get(MANIFEST_ENV):
+        with open(os.environ[MANIFEST_ENV]) as f:
+            return json.load(f)
+
+    manifest = {"tanks": [], "lightning": [], "channels": []}
+    if sclient is None:
+        return manifest
+
+    pods = _list(
+        sclient.list_pod_for_all_namespaces,
+        sclient.list_namespaced_pod,
+        label_selector="mission in (tank,lightning)",
+    )
+    for pod in pods:
+        if pod.metadata.labels["mission"] == "tank":
+            manifest["tanks"].append(
+                {
+                    "tank": pod.metadata.name,
+                    "namespace": pod.metadata.namespace,
+                    "chain": pod.metadata.labels["chain"],
+                    "rpc_host": pod.status.pod_ip,
+                    "rpc_port": int(pod.metadata.labels["RPCPort"]),
+                    "rpc_user": "user",
+                    "rpc_password": pod.metadata.labels["rpcpassword"],
+                    "init_peers": pod.metadata.annotations["init_peers"],
+                }
+            )
+        else:
+            manifest["lightning"].append(
+                {
+                    "name": pod.metadata.name,
+                    "namespace": pod.metadata.namespace,
+                    "impl": "cln"
+                    if "cln" in pod.metadata.labels["app.kubernetes.io/name"]
+                    else "lnd",
+                    "host": pod.status.pod_ip,
+                    "adminMacaroon": (pod.metadata.annotations or {}).get("adminMacaroon"),
+                }
+            )
 
-WARNET = {"tanks": [], "lightning": [], "channels": []}
-for pod in pods.items:
-    if "mission" not in pod.metadata.labels:
-        continue
-
-    if pod.metadata.labels["mission"] == "tank":
-        WARNET["tanks"].append(
-            {
-                "tank": pod.metadata.name,
-                "namespace": pod.metadata.namespace,
-                "chain": pod.metadata.labels["chain"],
-                "rpc_host": pod.status.pod_ip,
-                "rpc_port": int(pod.metadata.labels["RPCPort"]),
-                "rpc_user": "user",
-                "rpc_password": pod.metadata.labels["rpcpassword"],
-                "init_peers": pod.metadata.annotations["init_peers"],
-            }
+    cmaps = _list(
+        sclient.list_config_map_for_all_namespaces,
+        sclient.list_namespaced_config_map,
+        label_selector="channels=true",
+    )
+    for cm in cmaps:
+        for channel_json in json.loads(cm.data["channels"]):
+            channel_json["source"] = cm.data["source"]
+            manifest["channels"].append(channel_json)
+    return manifest
+
+
+class _Warnet(Mapping):
+    """The network as WARNET["tanks"], ["lightning"] and ["channels"], discovered on first use"""
+
+    def __init__(self):
+        self._network = None
+        self._lock = threading.Lock()
+
+    def _load(self) -> dict:
+        with self._lock:
+            if self._network is None:
+                manifest = discover_network()
+                lightning = []
+                for ln in manifest["lightning"]:
+                    if ln["impl"] == "cln":
+                        lightning.append(CLN(ln["name"], ln["namespace"], ln["host"]))
+                    else:
+                        lightning.append(
+                            LND(ln["name"], ln["namespace"], ln["host"], ln["adminMacaroon"])
+                        )
+                self._network = {**manifest, "lightning": lightning}
+            return self._network
+
+    def __getitem__(self, key):
+        return self._load()[key]
+
+    def __iter__(self):
+        return iter(self._load())
+
+    def __len__(self):
+        return len(self._load())
+
+
+WARNET = _Warnet()
+
+
+# Keep idle RPC connections to each tank open for reuse. AuthServiceProxy objects are
+# shared by the threads of a scenario while an http.client connection is not thread
+# safe, so every request checks a connection out of the pool for its thread.
+RPC_POOL_MAX_IDLE = 32
+
+
+class RPCConnectionPool:
+    """Idle keep-alive connections to one RPC server"""
+
+    def __init__(self, scheme: str, host: str, port: int, timeout: float):
+        self.scheme = scheme
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self._idle: list[http.client.HTTPConnection] = []
+        self._lock = threading.Lock()
+
+    def checkout(self) -> tuple[http.client.HTTPConnection, bool]:
+        """A connection and whether it was open already, so may still fail to send"""
+        while True:
+            with self._lock:
+                if not self._idle:
+                    break
+                conn = self._idle.pop()
+            if conn.sock is None:
+                return conn, False
+            # An idle connection is only readable once the server closed it
+            readable, _, _ = select.select([conn.sock], [], [], 0)
+            if not readable:
+                return conn, True
+            conn.close()
+        connection_class = (
+            http.client.HTTPSConnection if self.scheme == "https" else http.client.HTTPConnection
         )
+        return connection_class(self.host, self.port, timeout=self.timeout), False
 
-    if pod.metadata.labels["mission"] == "lightning":
-        if "lnd" in pod.metadata.labels["app.kubernetes.io/name"]:
-            lnnode = LND(
-                pod.metadata.name,
-                pod.metadata.namespace,
-                pod.status.pod_ip,
-                pod.metadata.annotations["adminMacaroon"],
-            )
-        if "cln" in pod.metadata.labels["app.kubernetes.io/name"]:
-            lnnode = CLN(pod.metadata.name, pod.metadata.namespace, pod.status.pod_ip)
-        assert lnnode
-        WARNET["lightning"].append(lnnode)
+    def checkin(self, conn: http.client.HTTPConnection):
+        with self._lock:
+            if len(self._idle) < RPC_POOL_MAX_IDLE:
+                self._idle.append(conn)
+                return
+        conn.close()
+
+
+_rpc_pools: dict[tuple, RPCConnectionPool] = {}
+_rpc_pools_lock = threading.Lock()
+
+
+def get_rpc_pool(scheme: str, host: str, port: int, timeout: float) -> RPCConnectionPool:
+    key = (scheme, host, port, timeout)
+    with _rpc_pools_lock:
+        if key not in _rpc_pools:
+            _rpc_pools[key] = RPCConnectionPool(*key)
+        return _rpc_pools[key]
 
-for cm in cmaps.items:
-    if not cm.metadata.labels or "channels" not in cm.metadata.labels:
-        continue
-    channel_jsons = json.loads(cm.data["channels"])
-    for channel_json in channel_jsons:
-        channel_json["source"] = cm.data["source"]
-        WARNET["channels"].append(channel_json)
 
+class _CheckedOutConnection:
+    """
+    Replaces AuthServiceProxy's connection attribute: during a request it is the
+    connection the current thread checked out, otherwise the proxy's own unused
+    connection, which only carries its timeout to proxies derived from it.
+    """
 
-# Ensure that all RPC calls are made with brand new http connections
-def auth_proxy_request(self, method, path, postdata):
-    self._set_conn()  # creates new http client connection
-    return self.oldrequest(method, path, postdata)
+    def __init__(self):
+        self._local = threading.local()
 
+    def __get__(self, proxy, owner=None):
+        if proxy is None:
+            return self
+        return getattr(self._local, "conn", None) or proxy.__dict__.get("_unpooled_conn")
 
-AuthServiceProxy.oldrequest = AuthServiceProxy._request
-AuthServiceProxy._request = auth_proxy_request
+    def __set__(self, proxy, conn):
+        proxy.__dict__["_unpooled_conn"] = conn
+
+    def use(self, conn: Optional[http.client.HTTPConnection]):
+        self._local.conn = conn
+
+
+def pooled_request(self, method, path, postdata):
+    url = self._AuthServiceProxy__url
+    port = url.port or (443 if url.scheme == "https" else 80)
+    pool = get_rpc_pool(url.scheme, url.hostname, port, self.timeout)
+    headers = {
+        "Host": url.hostname,
+        "User-Agent": USER_AGENT,
+        "Authorization": self._AuthServiceProxy__auth_header,
+        "Content-type": "application/json",
+    }
+    while True:
+        conn, reused = pool.checkout()
+        _checked_out.use(conn)
+        try:
+            try:
+                conn.request(method, path, postdata, headers)
+            except (OSError, http.client.HTTPException) as e:
+                conn.close()
+                # The request was not sent whole, so bitcoind did not run it
+                if reused:
+                    continue
+                raise e
+            # Once sent the request may have run, so it is never sent again
+            result = self._get_response()
+        except BaseException as e:
+            # E.g. a timeout: the response may still arrive, so the connection is dropped
+            conn.close()
+            raise e
+        finally:
+            _checked_out.use(None)
+        pool.checkin(conn)
+        return result
+
+
+_checked_out = _CheckedOutConnection()
+AuthServiceProxy._AuthServiceProxy__conn = _checked_out
+AuthServiceProxy._request = pooled_request
+
+# Commander.wait_all polls nodes from a bounded pool, backing off between attempts
+WAIT_ALL_CONCURRENCY = 32
+WAIT_ALL_MIN_DELAY = 0.5
+WAIT_ALL_MAX_DELAY = 15
+WAIT_ALL_PROGRESS_INTERVAL = 30
+WAIT_ALL_STRAGGLERS_SHOWN = 3
+
+
+def _node_name(node) -> str:
+    return getattr(node, "tank", None) or getattr(node, "name", None) or str(node)
 
 
 # Create a custom formatter
@@ -185,28 +365,110 @@ class Commander(BitcoinTestFramework):
         else:
             return base64.b64decode(b64).hex()
 
-    def wait_for_tanks_connected(self):
-        def tank_connected(self, tank):
-            while True:
-                peers = tank.getpeerinfo()
-                count = sum(
-                    1
-                    for peer in peers
-                    if peer.get("connection_type") == "manual" or peer.get("addnode") is True
-                )
-                self.log.info(f"Tank {tank.tank} connected to {count}/{tank.init_peers} peers")
-                if count >= tank.init_peers:
-                    break
+    def wait_all(
+        self,
+        nodes: Iterable,
+        predicate: Callable,
+        timeout: Optional[float] = None,
+        concurrency: int = WAIT_ALL_CONCURRENCY,
+        label: str = "nodes",
+        describe: Callable[..., str] = _node_name,
+    ) -> list:
+        """
+        Call predicate(node) for every node until it returns something truthy and
+        return those results, in the order of nodes.
+
+        At most `concurrency` calls run at once. A node whose predicate returns
+        something falsy or raises, e.g. because it is still starting, is polled
+        again after a jittered exponential backoff. Progress is logged as counts
+        with a few of the nodes still waiting. An AssertionError raised by the
+        predicate, or the timeout (scaled by --timeout-factor, None waits forever),
+        ends the wait with an AssertionError naming the first failing node.
+        """
+        nodes = list(nodes)
+        results = [None] * len(nodes)
+        attempts = [0] * len(nodes)
+        last_error: dict[int, str] = {}
+        # (time due, index of the node) of the nodes waiting for their next poll
+        due = [(0.0, i) for i in range(len(nodes))]
+        running = {}
+        ready = 0
+        start = monotonic()
+        deadline = None if timeout is None else start + timeout * self.options.timeout_factor
+        next_report = start + WAIT_ALL_PROGRESS_INTERVAL
+
+        def waiting(limit):
+            pending = sorted({i for _, i in due} | set(running.values()))
+            return ", ".join(
+                describe(nodes[i]) + (f" ({last_error[i]})" if i in last_error else "")
+                for i in pending[:limit]
+            )
+
+        executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="wait_all")
+        try:
+            while ready < len(nodes):
+                now = monotonic()
+                if deadline is not None and now > deadline:
+                    raise AssertionError(
+                        f"{label}: only {ready}/{len(nodes)} ready after {now - start:.0f}s, "
+                        f"first still waiting: {waiting(1)}"
+                    )
+                while due and due[0][0] <= now and len(running) < concurrency:
+                    _, i = heapq.heappop(due)
+                    running[executor.submit(predicate, nodes[i])] = i
+
+                wake = [next_report] + ([deadline] if deadline is not None else [])
+                if due and len(running) < concurrency:
+                    wake.append(due[0][0])
+                idle = max(0, min(wake) - now)
+                if running:
+                    finished, _ = wait(running, timeout=idle, return_when=FIRST_COMPLETED)
                 else:
-                    sleep(5)
+                    sleep(idle)
+                    finished = set()
+
+                for future in finished:
+                    i = running.pop(future)
+                    try:
+                        result = future.result()
+                    except AssertionError as e:
+                        raise AssertionError(f"{label}: {describe(nodes[i])} failed: {e}") from e
+                    except Exception as e:
+                        result = None
+                        last_error[i] = str(e) or type(e).__name__
+                    if result:
+                        results[i] = result
+                        last_error.pop(i, None)
+                        ready += 1
+                        continue
+                    attempts[i] += 1
+                    delay = min(WAIT_ALL_MAX_DELAY, WAIT_ALL_MIN_DELAY * 2 ** min(attempts[i], 16))
+                    heapq.heappush(due, (monotonic() + random.uniform(delay / 2, delay), i))
+
+                if monotonic() >= next_report and ready < len(nodes):
+                    self.log.info(
+                        f"{label}: {ready}/{len(nodes)} ready, waiting for "
+                        f"{waiting(WAIT_ALL_STRAGGLERS_SHOWN)}"
+                        + (" ..." if len(nodes) - ready > WAIT_ALL_STRAGGLERS_SHOWN else "")
+                    )
+                    next_report = monotonic() + WAIT_ALL_PROGRESS_INTERVAL
+        finally:
+            # Calls still running finish on their own, bounded by their RPC timeout
+            executor.shutdown(wait=False, cancel_futures=True)
+        self.log.info(f"{label}: all {len(nodes)} ready after {monotonic() - start:.0f}s")
+        return results
 
-        conn_threads = [
-            threading.Thread(target=tank_connected, args=(self, tank)) for tank in self.nodes
-        ]
-        for thread in conn_threads:
-            thread.start()
+    def wait_for_tanks_connected(self):
+        def tank_connected(tank):
+            peers = tank.getpeerinfo()
+            count = sum(
+                1
+                for peer in peers
+                if peer.get("connection_type") == "manual" or peer.get("addnode") is True
+            )
+            return count >= tank.init_peers
 
-        all(thread.join() is None for thread in conn_threads)
+        self.wait_all(self.nodes, tank_connected, label="Tanks connected to their peers")
         self.log.info("Network connected")
 
     def handle_sigterm(self, signum, frame):
@@ -214,29 +476,17 @@ class Commander(BitcoinTestFramework):
         self.shutdown()
         sys.exit(0)
 
-    # The following functions are chopped-up hacks of
-    # the original methods from BitcoinTestFramework
-
-    def setup(self):
-        signal.signal(signal.SIGTERM, self.handle_sigterm)
-
-        # hacked from _start_logging()
-        # Scenarios will log plain messages to stdout only, which will can redirected by warnet
-        self.log = logging.getLogger(self.__class__.__name__)
-        self.log.setLevel(logging.INFO)  # set this to DEBUG to see ALL RPC CALLS
-
-        # Because scenarios run in their own subprocess, the logger here
-        # is not the same as the warnet server or other global loggers.
-        # Scenarios log directly to stdout which gets picked up by the
-        # subprocess manager in the server, and reprinted to the global log.
-        ch = logging.StreamHandler(sys.stdout)
-        ch.setFormatter(ColorFormatter())
-        self.log.addHandler(ch)
+    # The network is discovered the first time a scenario touches
+    # self.nodes, self.tanks, self.lns, self.ln_nodes or self.channels
+    def _load_network(self):
+        if self._network_loaded:
+            return
+        self._network_loaded = True
 
         # Keep a separate index of tanks by pod name
-        self.tanks: dict[str, TestNode] = {}
-        self.lns: dict[str, LNNode] = {}
-        self.channels = WARNET["channels"]
+        self._tanks: dict[str, TestNode] = {}
+        self._lns: dict[str, LNNode] = {}
+        self._channels = WARNET["channels"]
 
         for i, tank in enumerate(WARNET["tanks"]):
             self.log.info(
@@ -264,15 +514,71 @@ class Commander(BitcoinTestFramework):
             node.rpc_connected = True
             node.init_peers = int(tank["init_peers"])
 
-            self.nodes.append(node)
-            self.tanks[tank["tank"]] = node
+            self._nodes.append(node)
+            self._tanks[tank["tank"]] = node
 
-        self.ln_nodes = []
+        self._ln_nodes = []
         for ln in WARNET["lightning"]:
-            self.ln_nodes.append(ln)
-            self.lns[ln.name] = ln
+            self._ln_nodes.append(ln)
+            self._lns[ln.name] = ln
+
+        self.num_nodes = len(self._nodes)
+
+    @property
+    def nodes(self) -> list[TestNode]:
+        if getattr(self, "options", None) is not None:
+            self._load_network()
+        return self._nodes
+
+    @nodes.setter
+    def nodes(self, nodes):
+        # BitcoinTestFramework.__init__() and shutdown() assign the list directly
+        self._nodes = nodes
+        self._network_loaded = bool(nodes)
+
+    @property
+    def tanks(self) -> dict[str, TestNode]:
+        self._load_network()
+        return self._tanks
+
+    @property
+    def lns(self) -> dict[str, LNNode]:
+        self._load_network()
+        return self._lns
+
+    @property
+    def ln_nodes(self) -> list[LNNode]:
+        self._load_network()
+        return self._ln_nodes
+
+    @property
+    def channels(self) -> list[dict]:
+        self._load_network()
+        return self._channels
+
+    def shutdown(self):
+        # Don't look the network up just to let go of it
+        self._network_loaded = True
+        return super().shutdown()
 
-        self.num_nodes = len(self.nodes)
+    # The following functions are chopped-up hacks of
+    # the original methods from BitcoinTestFramework
+
+    def setup(self):
+        signal.signal(signal.SIGTERM, self.handle_sigterm)
+
+        # hacked from _start_logging()
+        # Scenarios will log plain messages to stdout only, which will can redirected by warnet
+        self.log = logging.getLogger(self.__class__.__name__)
+        self.log.setLevel(logging.INFO)  # set this to DEBUG to see ALL RPC CALLS
+
+        # Because scenarios run in their own subprocess, the logger here
+        # is not the same as the warnet server or other global loggers.
+        # Scenarios log directly to stdout which gets picked up by the
+        # subprocess manager in the server, and reprinted to the global log.
+        ch = logging.StreamHandler(sys.stdout)
+        ch.setFormatter(ColorFormatter())
+        self.log.addHandler(ch)
 
         # Set up temp directory and start logging
         if self.options.tmpdir:
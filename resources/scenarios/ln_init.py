@@ -70,28 +70,9 @@ class LNInit(Commander):
         # WALLET ADDRESSES
         ##
         self.log.info("Getting LN wallet addresses...")
-        ln_addrs = {}
-
-        def get_ln_addr(self, ln):
-            while True:
-                try:
-                    address = ln.newaddress()
-                    ln_addrs[ln.name] = address
-                    self.log.info(f"Got wallet address {address} from {ln.name}")
-                    break
-                except Exception as e:
-                    self.log.info(
-                        f"Couldn't get wallet address from {ln.name} because {e}, retrying in 5 seconds..."
-                    )
-                    sleep(5)
-
-        addr_threads = [
-            threading.Thread(target=get_ln_addr, args=(self, ln)) for ln in self.lns.values()
-        ]
-        for thread in addr_threads:
-            thread.start()
-
-        all(thread.join() is None for thread in addr_threads)
+        lns = list(self.lns.values())
+        addrs = self.wait_all(lns, lambda ln: ln.newaddress(), label="LN wallet addresses")
+        ln_addrs = {ln.name: addr for ln, addr in zip(lns, addrs)}
         self.log.info(f"Got {len(ln_addrs)} addresses from {len(self.lns)} LN nodes")
 
         ##
@@ -140,59 +121,19 @@ class LNInit(Commander):
 
         self.log.info("Waiting for funds to be spendable by channel-openers")
 
-        def confirm_ln_balance(self, ln_name):
-            ln = self.lns[ln_name]
-            while True:
-                try:
-                    bal = ln.walletbalance()
-                    if bal >= 0:
-                        self.log.info(f"LN node {ln_name} confirmed funds")
-                        break
-                    else:
-                        self.log.info(f"Got 0 balance from {ln_name} retrying in 5 seconds...")
-                        sleep(5)
-                except Exception as e:
-                    self.log.info(
-                        f"Couldn't get balance from {ln_name} because {e}, retrying in 5 seconds..."
-                    )
-                    sleep(5)
-
-        fund_threads = [
-            threading.Thread(target=confirm_ln_balance, args=(self, ln_name))
-            for ln_name in channel_openers
-        ]
-        for thread in fund_threads:
-            thread.start()
-
-        all(thread.join() is None for thread in fund_threads)
+        self.wait_all(
+            [self.lns[ln_name] for ln_name in channel_openers],
+            lambda ln: ln.walletbalance() >= 0,
+            label="Funded channel-openers",
+        )
         self.log.info("All channel-opening LN nodes are funded")
 
         ##
         # URIs
         ##
         self.log.info("Getting URIs for all LN nodes...")
-        ln_uris = {}
-
-        def get_ln_uri(self, ln):
-            while True:
-                try:
-                    uri = ln.uri()
-                    ln_uris[ln.name] = uri
-                    self.log.info(f"LN node {ln.name} has URI {uri}")
-                    break
-                except Exception as e:
-                    self.log.info(
-                        f"Couldn't get URI from {ln.name} because {e}, retrying in 5 seconds..."
-                    )
-                    sleep(5)
-
-        uri_threads = [
-            threading.Thread(target=get_ln_uri, args=(self, ln)) for ln in self.lns.values()
-        ]
-        for thread in uri_threads:
-            thread.start()
-
-        all(thread.join() is None for thread in uri_threads)
+        uris = self.wait_all(lns, lambda ln: ln.uri(), label="LN node URIs")
+        ln_uris = {ln.name: uri for ln, uri in zip(lns, uris)}
         self.log.info("Got URIs from all LN nodes")
 
         ##
@@ -352,34 +293,11 @@ class LNInit(Commander):
 
         self.log.info("Waiting for channel announcement gossip...")
 
-        def ln_all_chs(self, ln):
-            expected = len(self.channels)
-            actual = 0
-            while actual != expected:
-                try:
-                    actual = len(ln.graph()["edges"])
-                    if actual == expected:
-                        self.log.info(f"LN {ln.name} has graph with all {expected} channels")
-                        break
-                    else:
-                        self.log.info(
-                            f"LN {ln.name} graph is incomplete - {actual} of {expected} channels, checking again in 5 seconds..."
-                        )
-                        sleep(5)
-                except Exception as e:
-                    self.log.info(
-                        f"Couldn't check graph from {ln.name} because {e}, retrying in 5 seconds..."
-                    )
-                    sleep(5)
-
-        ch_ann_threads = [
-            threading.Thread(target=ln_all_chs, args=(self, ln)) for ln in self.lns.values()
-        ]
-        for thread in ch_ann_threads:
-            sleep(0.25)
-            thread.start()
-
-        all(thread.join() is None for thread in ch_ann_threads)
+        self.wait_all(
+            lns,
+            lambda ln: len(ln.graph()["edges"]) == len(self.channels),
+            label="LN graphs with all channels",
+        )
         self.log.info("All LN nodes have complete graph")
 
         ##
@@ -446,67 +364,46 @@ class LNInit(Commander):
         def policy_equal(pol1, pol2, capacity):
             return pol1.to_lnd_chanpolicy(capacity) == pol2.to_lnd_chanpolicy(capacity)
 
-        def matching_graph(self, expected, ln):
-            done = False
-            while not done:
-                try:
-                    actual = ln.graph()["edges"]
-                except Exception as e:
-                    self.log.info(
-                        f"Couldn't get graph from {ln.name} because {e}, retrying in 5 seconds..."
-                    )
-                    sleep(5)
-                    continue
-
-                self.log.debug(f"LN {ln.name} channel graph edges: {actual}")
-                if len(actual) > 0:
-                    done = True
-                    assert len(expected) == len(actual), (
-                        f"Expected edges {len(expected)}, actual edges {len(actual)}\n{actual}"
-                    )
-                for i, actual_ch in enumerate(actual):
-                    expected_ch = expected[i]
-                    capacity = expected_ch["capacity"]
-                    # We assert this because it isn't updated as part of policy.
-                    # If this fails we have a bigger issue
-                    assert int(actual_ch["capacity"]) == capacity, (
-                        f"LN {ln.name} graph capacity mismatch:\n actual: {actual_ch['capacity']}\n expected: {capacity}"
-                    )
+        def matching_graph(expected, ln):
+            actual = ln.graph()["edges"]
+            self.log.debug(f"LN {ln.name} channel graph edges: {actual}")
+            if len(actual) == 0:
+                return False
+            assert len(expected) == len(actual), (
+                f"Expected edges {len(expected)}, actual edges {len(actual)}\n{actual}"
+            )
+            for i, actual_ch in enumerate(actual):
+                expected_ch = expected[i]
+                capacity = expected_ch["capacity"]
+                # We assert this because it isn't updated as part of policy.
+                # If this fails we have a bigger issue
+                assert int(actual_ch["capacity"]) == capacity, (
+                    f"LN {ln.name} graph capacity mismatch:\n actual: {actual_ch['capacity']}\n expected: {capacity}"
+                )
 
-                    # Policies were not defined in network.yaml
-                    if "source_policy" not in expected_ch or "target_policy" not in expected_ch:
-                        continue
+                # Policies were not defined in network.yaml
+                if "source_policy" not in expected_ch or "target_policy" not in expected_ch:
+                    continue
 
-                    # policy actual/expected source/target
-                    polas = Policy.from_lnd_describegraph(actual_ch["node1_policy"])
-                    polat = Policy.from_lnd_describegraph(actual_ch["node2_policy"])
-                    poles = Policy(**expected_ch["source_policy"])
-                    polet = Policy(**expected_ch["target_policy"])
-                    # Allow policy swap when comparing channels
-                    if policy_equal(polas, poles, capacity) and policy_equal(
-                        polat, polet, capacity
-                    ):
-                        continue
-                    if policy_equal(polas, polet, capacity) and policy_equal(
-                        polat, poles, capacity
-                    ):
-                        continue
-                    done = False
-                if done:
-                    self.log.info(f"LN {ln.name} graph channel policies all match expected source")
-                else:
-                    sleep(5)
+                # policy actual/expected source/target
+                polas = Policy.from_lnd_describegraph(actual_ch["node1_policy"])
+                polat = Policy.from_lnd_describegraph(actual_ch["node2_policy"])
+                poles = Policy(**expected_ch["source_policy"])
+                polet = Policy(**expected_ch["target_policy"])
+                # Allow policy swap when comparing channels
+                if policy_equal(polas, poles, capacity) and policy_equal(polat, polet, capacity):
+                    continue
+                if policy_equal(polas, polet, capacity) and policy_equal(polat, poles, capacity):
+                    continue
+                return False
+            return True
 
         expected = sorted(self.channels, key=lambda ch: (ch["id"]["block"], ch["id"]["index"]))
-        policy_threads = [
-            threading.Thread(target=matching_graph, args=(self, expected, ln))
-            for ln in self.lns.values()
-        ]
-        for thread in policy_threads:
-            sleep(0.25)
-            thread.start()
-
-        all(thread.join() is None for thread in policy_threads)
+        self.wait_all(
+            lns,
+            lambda ln: matching_graph(expected, ln),
+            label="LN graphs with matching channel policies",
+        )
         self.log.info("All LN nodes have matching graph!")
 
 
@@ -0,0 +1,322 @@
+import ast
+import base64
+import hashlib
+import io
+import os
+import tempfile
+import threading
+import zipapp
+import zipfile
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Optional
+
+from kubernetes.client.rest import ApiException
+
+from .constants import COMMANDER_MISSION, WARNET_STATE_DIR
+from .k8s import get_static_client
+
+ARCHIVE_CACHE_DIR = WARNET_STATE_DIR / "archives"
+# Archives kept in the cache, the least recently used are removed first
+ARCHIVE_CACHE_ENTRIES = 64
+
+# Libraries shared by scenarios, shipped once per namespace instead of with every run
+FRAMEWORK_MODULES = ("commander", "test_framework", "ln_framework")
+FRAMEWORK_CONFIGMAP_PREFIX = "warnet-framework-"
+FRAMEWORK_ARCHIVE = "framework.zip"
+# Scenario archives are mounted into the commander pod from a ConfigMap too
+SCENARIO_CONFIGMAP_PREFIX = "warnet-scenario-"
+SCENARIO_ARCHIVE = "archive.pyz"
+ARCHIVE_LABEL = "warnet.io/archive"
+# ConfigMaps are limited to 1MiB, leave room for the base64 encoding
+MAX_ARCHIVE_SIZE = 700 * 1024
+# Seconds a scenario ConfigMap is kept before any commander mounts it, the
+# run that published it may not have created its commander yet
+SCENARIO_CONFIGMAP_GRACE = 600
+
+# Archive ConfigMaps known to exist, per namespace
+_published: set[tuple[str, str]] = set()
+_published_lock = threading.Lock()
+
+
+def _module_file(source_dir: Path, module: str) -> Optional[Path]:
+    path = source_dir.joinpath(*module.split("."))
+    for candidate in (path.with_suffix(".py"), path / "__init__.py"):
+        if candidate.is_file():
+            return candidate
+    return None
+
+
+def _module_name(source_dir: Path, path: Path) -> str:
+    parts = path.relative_to(source_dir).with_suffix("").parts
+    return ".".join(parts[:-1] if parts[-1] == "__init__" else parts)
+
+
+def _imported_modules(path: Path, module: str) -> set[str]:
+    """Names of the modules a file imports, including from-imported submodules"""
+    package = module if path.name == "__init__.py" else module.rpartition(".")[0]
+    names = set()
+    for node in ast.walk(ast.parse(path.read_bytes(), str(path))):
+        if isinstance(node, ast.Import):
+            names.update(alias.name for alias in node.names)
+        elif isinstance(node, ast.ImportFrom):
+            base = node.module or ""
+            if node.level:
+                parent = package.split(".")[: len(package.split(".")) - node.level + 1]
+                base = ".".join(part for part in [*parent, base] if part)
+            names.add(base)
+            names.update(f"{base}.{alias.name}" if base else alias.name for alias in node.names)
+    return {name for name in names if name}
+
+
+def is_framework_module(module: str) -> bool:
+    return module.split(".")[0] in FRAMEWORK_MODULES
+
+
+def import_graph(scenario_path: Path, source_dir: Path, skip_framework: bool) -> set[Path]:
+    """
+    Files of source_dir the scenario needs: itself, every module it imports from
+    there, transitively, and the __init__.py of each package on the way.
+    """
+    files = set()
+    pending = [scenario_path]
+    # The packages holding the scenario itself
+    parts = _module_name(source_dir, scenario_path).split(".")
+    for i in range(1, len(parts)):
+        found = _module_file(source_dir, ".".join(parts[:i]))
+        if found:
+            pending.append(found)
+    while pending:
+        path = pending.pop()
+        if path in files:
+            continue
+        files.add(path)
+        module = _module_name(source_dir, path)
+        for name in _imported_modules(path, module):
+            if skip_framework and is_framework_module(name):
+                continue
+            parts = name.split(".")
+            # Packages are imported before their submodules
+            for i in range(1, len(parts) + 1):
+                found = _module_file(source_dir, ".".join(parts[:i]))
+                if found and found not in files:
+                    pending.append(found)
+    return files
+
+
+def framework_files(source_dir: Path) -> list[Path]:
+    files = []
+    for name in FRAMEWORK_MODULES:
+        if (source_dir / f"{name}.py").is_file():
+            files.append(source_dir / f"{name}.py")
+        elif (source_dir / name).is_dir():
+            files.extend((source_dir / name).rglob("*.py"))
+    return sorted(files)
+
+
+def _digest(files: list[Path], source_dir: Path, extra: str = "") -> str:
+    digest = hashlib.sha256(extra.encode())
+    for path in sorted(files):
+        digest.update(str(path.relative_to(source_dir)).encode() + b"\0")
+        digest.update(path.read_bytes())
+    return digest.hexdigest()
+
+
+def _cached(digest: str, build) -> bytes:
+    """Archive bytes stored under their content hash, built only on a miss"""
+    cache_file = ARCHIVE_CACHE_DIR / f"{digest}.zip"
+    try:
+        data = cache_file.read_bytes()
+        # The modification time records the last use
+        os.utime(cache_file)
+        return data
+    except FileNotFoundError:
+        pass
+    data = build()
+    ARCHIVE_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    with tempfile.NamedTemporaryFile("wb", dir=ARCHIVE_CACHE_DIR, delete=False) as f:
+        f.write(data)
+    os.replace(f.name, cache_file)
+    prune_cache()
+    return data
+
+
+def prune_cache(keep: Optional[int] = None):
+    """Remove all but the `keep` most recently used archives from the cache"""
+    keep = ARCHIVE_CACHE_ENTRIES if keep is None else keep
+    entries = []
+    for path in ARCHIVE_CACHE_DIR.glob("*.zip"):
+        try:
+            entries.append((path.stat().st_mtime_ns, path))
+        except FileNotFoundError:
+            # Pruned by a concurrent run
+            continue
+    for _, path in sorted(entries, reverse=True)[keep:]:
+        path.unlink(missing_ok=True)
+
+
+def _zip(files: list[Path], source_dir: Path, main: Optional[str] = None) -> bytes:
+    buffer = io.BytesIO()
+    if main:
+        # zipapp adds the __main__.py calling main, and only the files kept by the filter
+        keep = {path.relative_to(source_dir) for path in files}
+        zipapp.create_archive(
+            source=source_dir,
+            target=buffer,
+            main=main,
+            compressed=True,
+            filter=lambda path: path in keep or any(path in file.parents for file in keep),
+        )
+    else:
+        with zipfile.ZipFile(buffer, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+            for path in sorted(files):
+                zf.write(path, path.relative_to(source_dir))
+    return buffer.getvalue()
+
+
+def framework_archive(source_dir: Path) -> Optional[tuple[str, bytes]]:
+    """Digest and zip of the framework libraries in source_dir, if it has any that fit"""
+    files = framework_files(source_dir)
+    if not files:
+        return None
+    digest = _digest(files, source_dir)
+    data = _cached(digest, lambda: _zip(files, source_dir))
+    if len(data) > MAX_ARCHIVE_SIZE:
+        return None
+    return digest, data
+
+
+def publish_archive(namespace: str, name: str, key: str, data: bytes, kind: str):
+    """
+    Make sure the namespace has an immutable ConfigMap holding an archive.
+
+    The name carries the archive's digest, so one that already exists holds the
+    same bytes and is reused, by later runs and by concurrent ones.
+    """
+    with _published_lock:
+        if (namespace, name) in _published:
+            return
+    body = {
+        "apiVersion": "v1",
+        "kind": "ConfigMap",
+        "metadata": {"name": name, "labels": {ARCHIVE_LABEL: kind}},
+        "immutable": True,
+        "binaryData": {key: base64.b64encode(data).decode()},
+    }
+    try:
+        get_static_client().create_namespaced_config_map(namespace, body)
+    except ApiException as e:
+        if e.status != 409:
+            raise e
+    with _published_lock:
+        _published.add((namespace, name))
+
+
+def publish_framework(namespace: str, digest: str, data: bytes) -> Optional[str]:
+    """
+    Publish the framework archive to the namespace and return its ConfigMap.
+    Returns None if it cannot be created, e.g. for lack of permission, in which
+    case the framework is bundled with the scenario instead.
+    """
+    name = f"{FRAMEWORK_CONFIGMAP_PREFIX}{digest[:16]}"
+    try:
+        publish_archive(namespace, name, FRAMEWORK_ARCHIVE, data, "framework")
+    except ApiException:
+        return None
+    return name
+
+
+def publish_scenario(
+    scenario_path: Path, source_dir: Path, namespace: str
+) -> tuple[str, Optional[str]]:
+    """
+    Publish a scenario's archive to the namespace for a commander pod to mount.
+
+    Returns the ConfigMaps of the scenario archive and of the framework, if the
+    framework could be published on its own. Raises ValueError if the archive is
+    too large for a ConfigMap.
+    """
+    digest, data, framework = build_scenario_archive(scenario_path, source_dir, namespace)
+    if len(data) > MAX_ARCHIVE_SIZE:
+        raise ValueError(
+            f"The archive of {scenario_path.name} is {len(data) // 1024} KiB, more than the "
+            f"{MAX_ARCHIVE_SIZE // 1024} KiB a ConfigMap can hold. Move the modules it does "
+            "not need out of its imports, or pass a smaller --source-dir"
+        )
+    name = f"{SCENARIO_CONFIGMAP_PREFIX}{digest[:16]}"
+    publish_archive(namespace, name, SCENARIO_ARCHIVE, data, "scenario")
+    return name, framework
+
+
+def build_scenario_archive(
+    scenario_path: Path, source_dir: Path, namespace: str
+) -> tuple[str, bytes, Optional[str]]:
+    """
+    Archive a scenario with only the modules it imports, cached by content.
+
+    The framework libraries are published to the namespace once as a ConfigMap
+    and left out of the archive, when possible. Returns the archive's digest,
+    the archive and the name of that ConfigMap, which the commander puts on
+    its PYTHONPATH.
+    """
+    framework = framework_archive(source_dir)
+    configmap = publish_framework(namespace, *framework) if framework else None
+
+    files = import_graph(scenario_path, source_dir, skip_framework=configmap is not None)
+    relative_name = scenario_path.relative_to(source_dir).with_suffix("")
+    main = f"{'.'.join(relative_name.parts)}:main"
+    digest = _digest(sorted(files), source_dir, extra=main)
+    return digest, _cached(digest, lambda: _zip(sorted(files), source_dir, main)), configmap
+
+
+def delete_unused_scenarios(namespace: str):
+    """
+    Remove the scenario ConfigMaps of a namespace that no commander pod mounts,
+    other than those published in the last SCENARIO_CONFIGMAP_GRACE seconds
+    """
+    sclient = get_static_client()
+    try:
+        pods = sclient.list_namespaced_pod(
+            namespace, label_selector=f"mission={COMMANDER_MISSION}"
+        ).items
+        configmaps = sclient.list_namespaced_config_map(
+            namespace, label_selector=f"{ARCHIVE_LABEL}=scenario"
+        ).items
+    except ApiException as e:
+        if e.status != 403:
+            raise e
+        return
+    mounted = {
+        volume.config_map.name
+        for pod in pods
+        for volume in pod.spec.volumes or []
+        if volume.config_map
+    }
+    cutoff = datetime.now(timezone.utc) - timedelta(seconds=SCENARIO_CONFIGMAP_GRACE)
+    for configmap in configmaps:
+        name = configmap.metadata.name
+        if name in mounted or configmap.metadata.creation_timestamp > cutoff:
+            continue
+        try:
+            sclient.delete_namespaced_config_map(name, namespace)
+        except ApiException as e:
+            # Wargames players may not delete ConfigMaps
+            if e.status == 403:
+                return
+            if e.status != 404:
+                raise e
+        with _published_lock:
+            _published.discard((namespace, name))
+
+
+def delete_archives(namespace: str):
+    """Remove the scenario and framework archives published to a namespace"""
+    try:
+        get_static_client().delete_collection_namespaced_config_map(
+            namespace, label_selector=ARCHIVE_LABEL
+        )
+    except ApiException as e:
+        if e.status not in (403, 404):
+            raise e
+    with _published_lock:
+        _published.difference_update({key for key in _published if key[0] == namespace})
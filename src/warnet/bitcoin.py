@@ -1,20 +1,62 @@
+import heapq
 import json
-import os
+import queue
 import re
 import shlex
+import struct
 import sys
+import tarfile
+import tempfile
+import threading
+from collections.abc import Iterator
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import ExitStack
 from datetime import datetime
 from io import BytesIO
-from typing import Optional
+from pathlib import Path
+from typing import Any, Optional
 
 import click
+from kubernetes.client.models import V1Pod
 from test_framework.messages import ser_uint256
 from test_framework.p2p import MESSAGEMAP
 from urllib3.exceptions import MaxRetryError
 
-from .constants import BITCOINCORE_CONTAINER
-from .k8s import get_default_namespace_or, get_mission, pod_log
+from .constants import BITCOINCORE_CONTAINER, KUBE_CONNECTION_POOL_SIZE, TANK_MISSION
+from .k8s import (
+    exec_output,
+    get_default_namespace_or,
+    get_mission,
+    get_pod,
+    get_pods,
+    get_service,
+    set_connection_pool_size,
+)
+from .log_cache import (
+    LOG_CACHE_DIR,
+    PodLogCache,
+    cached_pod_log,
+    log_timestamp_key,
+    parse_log_time,
+)
 from .process import run_command
+from .rpc import (
+    DEFAULT_RPC_TIMEOUT,
+    RPCError,
+    RPCTransportError,
+    format_result,
+    get_rpc_pool,
+    rpc_call,
+)
+
+# bitcoin-cli options such as -named or -rpcwallet=<name> need the real bitcoin-cli
+CLI_OPTION = re.compile(r"^-[a-zA-Z]")
+# RPC_TYPE_ERROR: a param had the wrong JSON type
+RPC_TYPE_ERROR = -3
+# Matches buffered before grep-logs --no-sort pauses reading the logs
+GREP_QUEUE_SIZE = 1000
+# Seconds allowed per tank with --all or --selector unless --timeout is given
+FAN_OUT_TIMEOUT = 30.0
 
 
 @click.group(name="bitcoin")
@@ -23,23 +65,223 @@ def bitcoin():
 
 
 @bitcoin.command(context_settings={"ignore_unknown_options": True})
-@click.argument("tank", type=str)
-@click.argument("method", type=str)
+@click.argument("tank", type=str, required=False)
+@click.argument("method", type=str, required=False)
 @click.argument("params", type=click.UNPROCESSED, nargs=-1)  # get raw unprocessed arguments
 @click.option("--namespace", default=None, show_default=True)
-def rpc(tank: str, method: str, params: list[str], namespace: Optional[str]):
+@click.option("--all", "all_tanks", is_flag=True, default=False, help="Call <method> on every tank")
+@click.option(
+    "--selector", default=None, help="Call <method> on tanks matching this label selector"
+)
+@click.option(
+    "--concurrency", default=32, show_default=True, help="Max tanks called at once with --all"
+)
+@click.option(
+    "--timeout",
+    type=float,
+    default=None,
+    help=f"Seconds allowed per call, {FAN_OUT_TIMEOUT:g} per tank with --all or --selector",
+)
+@click.option("--summary", is_flag=True, default=False, help="Print aggregate results last")
+def rpc(
+    tank: Optional[str],
+    method: Optional[str],
+    params: list[str],
+    namespace: Optional[str],
+    all_tanks: bool,
+    selector: Optional[str],
+    concurrency: int,
+    timeout: Optional[float],
+    summary: bool,
+):
     """
     Call bitcoin-cli <method> [params] on <tank pod name>
+
+    With --all or --selector there is no <tank pod name>: <method> runs on every
+    matching tank and one JSON line is printed per tank.
     """
+    if all_tanks or selector:
+        # No tank given, so the positional arguments start with the method
+        params = [arg for arg in (method, *params) if arg is not None]
+        method = tank
+        if not method:
+            raise click.UsageError("Missing argument 'METHOD'.")
+        if timeout is None:
+            timeout = FAN_OUT_TIMEOUT
+        _rpc_fan_out(method, params, namespace, selector, concurrency, timeout, summary)
+        return
+    if not tank or not method:
+        raise click.UsageError("Missing argument 'TANK' or 'METHOD'.")
     try:
-        result = _rpc(tank, method, params, namespace)
+        result = _rpc(tank, method, params, namespace, timeout)
     except Exception as e:
         print(f"{e}")
         sys.exit(1)
     print(result)
 
 
-def _rpc(tank: str, method: str, params: list[str], namespace: Optional[str] = None):
+def _rpc(
+    tank: str,
+    method: str,
+    params: list[str],
+    namespace: Optional[str] = None,
+    timeout: Optional[float] = None,
+):
+    """
+    Call bitcoin-cli <method> [params] on a tank and return what bitcoin-cli prints.
+
+    The call is made over a pooled JSON-RPC connection. Anything the native
+    transport cannot reproduce (bitcoin-cli options, a tank that cannot be reached,
+    parameters bitcoind rejects as the wrong JSON type) is retried through
+    kubectl exec. A request that was sent is never retried, as it may have run.
+    """
+    namespace = get_default_namespace_or(namespace)
+    params = list(params or [])
+    native, result = _try_native_rpc(tank, method, params, namespace, timeout)
+    if native:
+        return format_result(result)
+    return _rpc_exec(tank, method, params, namespace, timeout)
+
+
+def _rpc_result(
+    tank: str,
+    method: str,
+    params: list[str],
+    namespace: Optional[str] = None,
+    timeout: Optional[float] = None,
+):
+    """Like _rpc but return the decoded result instead of bitcoin-cli output"""
+    namespace = get_default_namespace_or(namespace)
+    params = list(params or [])
+    native, result = _try_native_rpc(tank, method, params, namespace, timeout)
+    if native:
+        return result
+    output = _rpc_exec(tank, method, params, namespace, timeout).strip()
+    try:
+        return json.loads(output)
+    except json.JSONDecodeError:
+        return output
+
+
+def _try_native_rpc(
+    tank: str, method: str, params: list[str], namespace: str, timeout: Optional[float]
+) -> tuple[bool, Any]:
+    if method.startswith("-") or any(CLI_OPTION.match(p) for p in params):
+        return False, None
+    try:
+        return True, rpc_call(
+            tank, method, _json_params(params), namespace, timeout or DEFAULT_RPC_TIMEOUT
+        )
+    except RPCTransportError:
+        return False, None
+    except RPCError as e:
+        # bitcoin-cli knows which arguments are strings, we only guess
+        if e.code == RPC_TYPE_ERROR:
+            return False, None
+        raise
+
+
+def _rpc_fan_out(
+    method: str,
+    params: list[str],
+    namespace: Optional[str],
+    selector: Optional[str],
+    concurrency: int,
+    timeout: float,
+    summary: bool,
+):
+    label_selector = f"mission={TANK_MISSION}"
+    if selector:
+        label_selector += f",{selector}"
+    try:
+        tanks = get_pods(label_selector=label_selector)
+    except MaxRetryError as e:
+        print(f"{e}")
+        sys.exit(1)
+    if namespace:
+        tanks = [tank for tank in tanks if tank.metadata.namespace == namespace]
+
+    # Every worker may need the API server at once (pod lookups, port-forwards)
+    if concurrency > KUBE_CONNECTION_POOL_SIZE:
+        set_connection_pool_size(concurrency)
+    get_rpc_pool().add_pods(tanks)
+
+    results = []
+    failed = 0
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as executor:
+        futures = {
+            executor.submit(
+                _rpc_result,
+                tank.metadata.name,
+                method,
+                params,
+                tank.metadata.namespace,
+                timeout,
+            ): tank
+            for tank in tanks
+        }
+        for future in as_completed(futures):
+            tank = futures[future]
+            line = {"tank": tank.metadata.name, "namespace": tank.metadata.namespace}
+            try:
+                line["result"] = future.result()
+                results.append(line["result"])
+            except RPCError as e:
+                line["error"] = {"code": e.code, "message": e.message}
+                failed += 1
+            except Exception as e:
+                line["error"] = str(e).strip()
+                failed += 1
+            print(json.dumps(line), flush=True)
+
+    if summary:
+        print(json.dumps({"summary": _summarize(results, failed)}))
+    if failed:
+        sys.exit(1)
+
+
+def _summarize(results: list, failed: int) -> dict:
+    """Aggregate fan-out results: counts, numeric range and distinct values"""
+    distinct: dict[str, int] = {}
+    for result in results:
+        key = json.dumps(result, sort_keys=True)
+        distinct[key] = distinct.get(key, 0) + 1
+    summary = {"tanks": len(results) + failed, "ok": len(results), "errors": failed}
+    summary["distinct"] = len(distinct)
+    numbers = [r for r in results if isinstance(r, (int, float)) and not isinstance(r, bool)]
+    if numbers and len(numbers) == len(results):
+        summary["min"] = min(numbers)
+        summary["max"] = max(numbers)
+    if all(not isinstance(r, (dict, list)) for r in results):
+        summary["values"] = distinct
+    return summary
+
+
+def _json_params(params: list[str]) -> list:
+    """Decode command line params into JSON-RPC params the way bitcoin-cli would"""
+    full_param_str = " ".join(params)
+    # A single JSON object/array the shell split on whitespace
+    if len(params) > 1 and full_param_str.strip().startswith(("[", "{")):
+        try:
+            return [json.loads(full_param_str)]
+        except json.JSONDecodeError:
+            pass
+    decoded = []
+    for param in params:
+        try:
+            decoded.append(json.loads(param))
+        except json.JSONDecodeError:
+            decoded.append(param)
+    return decoded
+
+
+def _rpc_exec(
+    tank: str,
+    method: str,
+    params: list[str],
+    namespace: Optional[str] = None,
+    timeout: Optional[float] = None,
+):
     namespace = get_default_namespace_or(namespace)
 
     if params:
@@ -70,20 +312,36 @@ def _rpc(tank: str, method: str, params: list[str], namespace: Optional[str] = N
         # Handle commands with no parameters
         cmd = f"kubectl -n {namespace} exec {tank} --container {BITCOINCORE_CONTAINER} -- bitcoin-cli {method}"
 
-    return run_command(cmd)
+    return run_command(cmd, timeout=timeout)
+
+
+def _log_time(ctx, param, value):
+    if value is None:
+        return None
+    try:
+        return parse_log_time(value)
+    except ValueError as e:
+        raise click.BadParameter(str(e)) from None
 
 
 @bitcoin.command()
 @click.argument("tank", type=str, required=True)
 @click.option("--namespace", default=None, show_default=True)
-def debug_log(tank: str, namespace: Optional[str]):
+@click.option("--since", default=None, callback=_log_time, help="Start at a time or duration ago")
+@click.option("--until", default=None, callback=_log_time, help="Stop at a time or duration ago")
+@click.option("--no-cache", is_flag=True, default=False, help="Bypass the local log cache")
+def debug_log(
+    tank: str, namespace: Optional[str], since: Optional[str], until: Optional[str], no_cache: bool
+):
     """
     Fetch the Bitcoin Core debug log from <tank pod name>
     """
     namespace = get_default_namespace_or(namespace)
-    cmd = f"kubectl logs {tank} --namespace {namespace}"
     try:
-        print(run_command(cmd))
+        pod = get_pod(tank, namespace)
+        for line in cached_pod_log(pod, BITCOINCORE_CONTAINER, since, until, not no_cache):
+            # Drop the k8s timestamp, bitcoind writes its own
+            print(line.split(" ", 1)[-1])
     except Exception as e:
         print(f"{e}")
 
@@ -92,9 +350,22 @@ def debug_log(tank: str, namespace: Optional[str]):
 @click.argument("pattern", type=str, required=True)
 @click.option("--show-k8s-timestamps", is_flag=True, default=False, show_default=True)
 @click.option("--no-sort", is_flag=True, default=False, show_default=True)
-def grep_logs(pattern: str, show_k8s_timestamps: bool, no_sort: bool):
+@click.option("--since", default=None, callback=_log_time, help="Start at a time or duration ago")
+@click.option("--until", default=None, callback=_log_time, help="Stop at a time or duration ago")
+@click.option("--no-cache", is_flag=True, default=False, help="Bypass the local log cache")
+def grep_logs(
+    pattern: str,
+    show_k8s_timestamps: bool,
+    no_sort: bool,
+    since: Optional[str],
+    until: Optional[str],
+    no_cache: bool,
+):
     """
     Grep combined bitcoind logs using regex <pattern>
+
+    Sorted output starts once the log of every tank has been fetched,
+    with --no-sort matches are printed while the logs are fetched.
     """
 
     try:
@@ -102,60 +373,177 @@ def grep_logs(pattern: str, show_k8s_timestamps: bool, no_sort: bool):
     except MaxRetryError as e:
         print(f"{e}")
         sys.exit(1)
+    if not tanks:
+        return
+
+    regex = re.compile(pattern)
+    longest_namespace_len = max(len(tank.metadata.namespace) for tank in tanks)
+    # Logs are fetched by as many workers as the API client has connections
+    workers = min(KUBE_CONNECTION_POOL_SIZE, len(tanks))
+
+    def show(tank: V1Pod, log_entry: str):
+        _print_log_entry(
+            log_entry,
+            tank.metadata.namespace,
+            tank.metadata.name,
+            longest_namespace_len,
+            show_k8s_timestamps,
+        )
 
-    matching_logs = []
-    longest_namespace_len = 0
-
+    try:
+        if no_sort:
+            _grep_unsorted(tanks, regex, workers, since, until, not no_cache, show)
+            return
+        # Without the cache the logs are spooled to a temporary one
+        with ExitStack() as stack:
+            cache_dir = LOG_CACHE_DIR
+            if no_cache:
+                cache_dir = Path(stack.enter_context(tempfile.TemporaryDirectory()))
+            for tank, log_entry in _grep_sorted(tanks, regex, workers, since, until, cache_dir):
+                show(tank, log_entry)
+    except KeyboardInterrupt:
+        print("Interrupted streaming log!")
+
+
+def _grep_unsorted(
+    tanks: list[V1Pod],
+    regex: re.Pattern,
+    workers: int,
+    since: Optional[str],
+    until: Optional[str],
+    use_cache: bool,
+    show,
+):
+    """Show the matches of all tanks in the order they are read"""
+    shared: queue.Queue = queue.Queue(maxsize=GREP_QUEUE_SIZE)
+    pending: queue.Queue = queue.Queue()
     for tank in tanks:
-        if len(tank.metadata.namespace) > longest_namespace_len:
-            longest_namespace_len = len(tank.metadata.namespace)
-
-        pod_name = tank.metadata.name
-        logs = pod_log(pod_name, BITCOINCORE_CONTAINER)
+        pending.put(tank)
 
-        if logs is not False:
+    def stream_logs():
+        while True:
             try:
-                for line in logs:
-                    log_entry = line.decode("utf-8").rstrip()
-                    if re.search(pattern, log_entry):
-                        matching_logs.append((log_entry, tank.metadata.namespace, pod_name))
-            except Exception as e:
-                print(e)
-            except KeyboardInterrupt:
-                print("Interrupted streaming log!")
-
-    # Sort logs if needed
-    if not no_sort:
-        matching_logs.sort(key=lambda x: x[0])
+                tank = pending.get_nowait()
+            except queue.Empty:
+                return
+            _grep_pod_log(tank, regex, shared, since, until, use_cache)
+
+    for _ in range(workers):
+        threading.Thread(target=stream_logs, daemon=True).start()
+
+    running = len(tanks)
+    while running:
+        tank, log_entry = shared.get()
+        if log_entry is None:
+            running -= 1
+        elif isinstance(log_entry, Exception):
+            print(log_entry)
+        else:
+            show(tank, log_entry)
+
+
+def _grep_sorted(
+    tanks: list[V1Pod],
+    regex: re.Pattern,
+    workers: int,
+    since: Optional[str],
+    until: Optional[str],
+    cache_dir: Path,
+) -> Iterator[tuple[V1Pod, str]]:
+    """
+    Yield the matches of all tanks ordered by k8s timestamp.
 
-    # Print matching logs
-    for log_entry, namespace, pod_name in matching_logs:
-        try:
-            # Split the log entry into Kubernetes timestamp, Bitcoin timestamp, and the rest of the log
-            k8s_timestamp, rest = log_entry.split(" ", 1)
-            bitcoin_timestamp, log_message = rest.split(" ", 1)
-
-            # Format the output based on the show_k8s_timestamps option
-            if show_k8s_timestamps:
-                print(
-                    f"{pod_name} {namespace:<{longest_namespace_len}} {k8s_timestamp} {bitcoin_timestamp} {log_message}"
-                )
-            else:
-                print(
-                    f"{pod_name} {namespace:<{longest_namespace_len}} {bitcoin_timestamp} {log_message}"
-                )
-        except ValueError:
-            # If we can't parse the timestamps, just print the original log entry
-            print(f"{pod_name}: {log_entry}")
+    The logs are synced to cache_dir concurrently, then merged reading one line
+    of each cached file at a time, so no log is held in memory.
+    """
+    caches = [PodLogCache(tank, BITCOINCORE_CONTAINER, cache_dir) for tank in tanks]
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(cache.sync, since) for cache in caches]
+        for future in as_completed(futures):
+            if future.exception():
+                print(future.exception())
+
+    def matches(cache: PodLogCache) -> Iterator[tuple[str, V1Pod, str]]:
+        for line in cache.lines(since, until):
+            log_entry = line.rstrip()
+            if regex.search(log_entry):
+                yield log_timestamp_key(log_entry), cache.pod, log_entry
+
+    # A failed sync keeps whatever was fetched before it failed
+    readable = [cache for cache in caches if cache.log_path.exists()]
+    for _, tank, log_entry in heapq.merge(*map(matches, readable), key=lambda m: m[0]):
+        yield tank, log_entry
+
+
+def _grep_pod_log(
+    tank: V1Pod,
+    regex: re.Pattern,
+    out: queue.Queue,
+    since: Optional[str],
+    until: Optional[str],
+    use_cache: bool,
+):
+    """Stream one tank log into out: matching lines, then an exception if any, then None"""
+    try:
+        for line in cached_pod_log(tank, BITCOINCORE_CONTAINER, since, until, use_cache):
+            log_entry = line.rstrip()
+            if regex.search(log_entry):
+                out.put((tank, log_entry))
+    except Exception as e:
+        out.put((tank, e))
+    finally:
+        out.put((tank, None))
+
+
+def _print_log_entry(
+    log_entry: str,
+    namespace: str,
+    pod_name: str,
+    longest_namespace_len: int,
+    show_k8s_timestamps: bool,
+):
+    try:
+        # Split the log entry into Kubernetes timestamp, Bitcoin timestamp, and the rest of the log
+        k8s_timestamp, rest = log_entry.split(" ", 1)
+        bitcoin_timestamp, log_message = rest.split(" ", 1)
 
-    return matching_logs
+        # Format the output based on the show_k8s_timestamps option
+        if show_k8s_timestamps:
+            print(
+                f"{pod_name} {namespace:<{longest_namespace_len}} {k8s_timestamp} {bitcoin_timestamp} {log_message}"
+            )
+        else:
+            print(
+                f"{pod_name} {namespace:<{longest_namespace_len}} {bitcoin_timestamp} {log_message}"
+            )
+    except ValueError:
+        # If we can't parse the timestamps, just print the original log entry
+        print(f"{pod_name}: {log_entry}")
 
 
 @bitcoin.command()
 @click.argument("tank_a", type=str, required=True)
 @click.argument("tank_b", type=str, required=True)
 @click.option("--chain", default="regtest", show_default=True)
-def messages(tank_a: str, tank_b: str, chain: str):
+@click.option("--msgtype", multiple=True, help="Only show this message type (repeatable)")
+@click.option(
+    "--direction",
+    type=click.Choice(["both", "sent", "received"]),
+    default="both",
+    show_default=True,
+    help="Messages sent or received by <tank_a>",
+)
+@click.option("--since", default=None, callback=_log_time, help="Start at a time or duration ago")
+@click.option("--until", default=None, callback=_log_time, help="Stop at a time or duration ago")
+def messages(
+    tank_a: str,
+    tank_b: str,
+    chain: str,
+    msgtype: tuple[str, ...],
+    direction: str,
+    since: Optional[str],
+    until: Optional[str],
+):
     """
     Fetch messages sent between <tank_a pod name> and <tank_b pod name> in [chain]
 
@@ -186,17 +574,21 @@ def messages(tank_a: str, tank_b: str, chain: str):
 
         # Get the messages
         messages = get_messages(
-            tank_a, tank_b, chain, namespace_a=namespace_a, namespace_b=namespace_b
+            tank_a,
+            tank_b,
+            chain,
+            namespace_a=namespace_a,
+            namespace_b=namespace_b,
+            msgtypes=set(msgtype),
+            outbound={"both": None, "sent": True, "received": False}[direction],
+            since=_to_micros(since),
+            until=_to_micros(until),
         )
 
-        if not messages:
-            print(
-                f"No messages found between {tank_a} ({namespace_a}) and {tank_b} ({namespace_b})"
-            )
-            return
-
         # Process and print messages
+        found = False
         for message in messages:
+            found = True
             if not (message.get("time") and isinstance(message["time"], (int, float))):
                 continue
 
@@ -213,123 +605,178 @@ def messages(tank_a: str, tank_b: str, chain: str):
             body_str = ", ".join(f"{key}: {value}" for key, value in body_dict.items())
             print(f"{timestamp} {direction} {msgtype} {body_str}")
 
+        if not found:
+            print(
+                f"No messages found between {tank_a} ({namespace_a}) and {tank_b} ({namespace_b})"
+            )
+
     except Exception as e:
         print(f"Error fetching messages between nodes {tank_a} and {tank_b}: {e}")
 
 
-def get_messages(tank_a: str, tank_b: str, chain: str, namespace_a: str, namespace_b: str):
+def _to_micros(timestamp: Optional[str]) -> Optional[int]:
+    if timestamp is None:
+        return None
+    moment = datetime.fromisoformat(timestamp.replace("Z", "+00:00"))
+    return int(moment.timestamp() * 1_000_000)
+
+
+def get_messages(
+    tank_a: str,
+    tank_b: str,
+    chain: str,
+    namespace_a: str,
+    namespace_b: str,
+    msgtypes: Optional[set[str]] = None,
+    outbound: Optional[bool] = None,
+    since: Optional[int] = None,
+    until: Optional[int] = None,
+    compress: bool = True,
+) -> Iterator[dict]:
     """
     Fetch messages from the message capture files
+
+    All capture files for the peer come back in one (gzipped) tar stream. Only
+    messages of the given msgtypes and direction (outbound None for both) sent
+    between since and until (microseconds since the epoch) are yielded, in time
+    order, each decoded only when it is reached.
     """
     subdir = "" if chain == "main" else f"{chain}/"
     base_dir = f"/root/.bitcoin/{subdir}message_capture"
 
-    # Get the IP of node_b
-    cmd = f"kubectl get pod {tank_b} -o jsonpath='{{.status.podIP}}' --namespace {namespace_b}"
-    tank_b_ip = run_command(cmd).strip()
-
-    # Get the service IP of node_b
-    cmd = (
-        f"kubectl get service {tank_b} -o jsonpath='{{.spec.clusterIP}}' --namespace {namespace_b}"
+    # Capture directories are named after the peer address: <ip>_<port>
+    tank_b_ips = [get_pod(tank_b, namespace_b).status.pod_ip]
+    service = get_service(tank_b, namespace_b)
+    if service and service.spec.cluster_ip:
+        tank_b_ips.append(service.spec.cluster_ip)
+
+    files = []
+    if outbound is not True:
+        files.append("msgs_recv.dat")
+    if outbound is not False:
+        files.append("msgs_sent.dat")
+
+    # Pack every matching capture file into one tar stream
+    dirs = " ".join(f"{shlex.quote(ip)}_*" for ip in tank_b_ips if ip)
+    tar_flags = "-czf" if compress else "-cf"
+    script = (
+        f"cd {shlex.quote(base_dir)} && for d in {dirs}; do for f in {' '.join(files)}; do "
+        f'[ -f "$d/$f" ] && echo "$d/$f"; done; done | tar {tar_flags} - -T -'
     )
-    tank_b_service_ip = run_command(cmd).strip()
-
-    # List directories in the message capture folder
-    cmd = f"kubectl exec {tank_a} --namespace {namespace_a} -- ls {base_dir}"
-
-    dirs = run_command(cmd).splitlines()
+    archive = exec_output(tank_a, ["sh", "-c", script], BITCOINCORE_CONTAINER, namespace_a)
+
+    captures = []
+    if archive:
+        with tarfile.open(fileobj=BytesIO(archive), mode="r:*") as tar:
+            for member in tar.getmembers():
+                capture = tar.extractfile(member)
+                if capture is None:
+                    continue
+                is_outbound = member.name.endswith("msgs_sent.dat")
+                captures.append(
+                    iter_raw_messages(capture.read(), is_outbound, msgtypes, since, until)
+                )
 
-    messages = []
+    # Each capture file is in time order already, so a merge orders them all
+    merged = heapq.merge(*captures, key=lambda message: message.time)
+    return (message.to_dict() for message in merged)
 
-    for dir_name in dirs:
-        if tank_b_ip in dir_name or tank_b_service_ip in dir_name:
-            for file, outbound in [["msgs_recv.dat", False], ["msgs_sent.dat", True]]:
-                file_path = f"{base_dir}/{dir_name}/{file}"
-                # Fetch the file contents from the container
-                cmd = f"kubectl exec {tank_a} --namespace {namespace_a} -- cat {file_path}"
-                import subprocess
 
-                blob = subprocess.run(
-                    cmd, shell=True, capture_output=True, executable="bash"
-                ).stdout
+# Header of every record in a message_capture file: time, msgtype, length
+CAPTURE_HEADER = struct.Struct("<Q12sI")
 
-                # Parse the blob
-                json = parse_raw_messages(blob, outbound)
-                messages = messages + json
 
-    messages.sort(key=lambda x: x["time"])
-    return messages
+class CapturedMessage:
+    """
+    One record of a message_capture file.
 
+    The header fields are read eagerly, the payload stays a view into the capture
+    blob until body() or to_dict() deserializes it.
+    """
 
-# This function is a hacked-up copy of process_file() from
-# Bitcoin Core contrib/message-capture/message-capture-parser.py
-def parse_raw_messages(blob: bytes, outbound: bool):
-    TIME_SIZE = 8
-    LENGTH_SIZE = 4
-    MSGTYPE_SIZE = 12
+    __slots__ = ("outbound", "time", "raw_msgtype", "size", "payload")
 
-    messages = []
-    offset = 0
-    while True:
-        # Read the Header
-        header_len = TIME_SIZE + LENGTH_SIZE + MSGTYPE_SIZE
-        tmp_header_raw = blob[offset : offset + header_len]
+    def __init__(self, outbound: bool, time: int, raw_msgtype: bytes, payload: memoryview):
+        self.outbound = outbound
+        self.time = time
+        self.raw_msgtype = raw_msgtype
+        self.size = len(payload)
+        self.payload = payload
 
-        offset = offset + header_len
-        if not tmp_header_raw:
-            break
-        tmp_header = BytesIO(tmp_header_raw)
-        time = int.from_bytes(tmp_header.read(TIME_SIZE), "little")  # type: int
-        msgtype = tmp_header.read(MSGTYPE_SIZE).split(b"\x00", 1)[0]  # type: bytes
-        length = int.from_bytes(tmp_header.read(LENGTH_SIZE), "little")  # type: int
-
-        # Start converting the message to a dictionary
-        msg_dict = {}
-        msg_dict["outbound"] = outbound
-        msg_dict["time"] = time
-        msg_dict["size"] = length  # "size" is less readable here, but more readable in the output
-
-        msg_ser = BytesIO(blob[offset : offset + length])
-        offset = offset + length
-
-        # Determine message type
-        if msgtype not in MESSAGEMAP:
-            # Unrecognized message type
-            try:
-                msgtype_tmp = msgtype.decode()
-                if not msgtype_tmp.isprintable():
-                    raise UnicodeDecodeError
-                msg_dict["msgtype"] = msgtype_tmp
-            except UnicodeDecodeError:
-                msg_dict["msgtype"] = "UNREADABLE"
-            msg_dict["body"] = msg_ser.read().hex()
+    @property
+    def msgtype(self) -> str:
+        if self.raw_msgtype in MESSAGEMAP:
+            return self.raw_msgtype.decode()
+        try:
+            msgtype = self.raw_msgtype.decode()
+            return msgtype if msgtype.isprintable() else "UNREADABLE"
+        except UnicodeDecodeError:
+            return "UNREADABLE"
+
+    def body(self):
+        """Deserialize the payload into its test_framework message object"""
+        msg = MESSAGEMAP[self.raw_msgtype]()
+        msg.deserialize(BytesIO(self.payload))
+        return msg
+
+    def to_dict(self) -> dict:
+        msg_dict = {"outbound": self.outbound, "time": self.time, "size": self.size}
+        msg_dict["msgtype"] = self.msgtype
+        if self.raw_msgtype not in MESSAGEMAP:
+            msg_dict["body"] = self.payload.hex()
             msg_dict["error"] = "Unrecognized message type."
-            messages.append(msg_dict)
-            # print(f"WARNING - Unrecognized message type {msgtype}", file=sys.stderr)
-            continue
-
-        # Deserialize the message
-        msg = MESSAGEMAP[msgtype]()
-        msg_dict["msgtype"] = msgtype.decode()
-
+            return msg_dict
         try:
-            msg.deserialize(msg_ser)
+            msg = self.body()
         except KeyboardInterrupt:
             raise
         except Exception:
-            # Unable to deserialize message body
-            msg_ser.seek(0, os.SEEK_SET)
-            msg_dict["body"] = msg_ser.read().hex()
+            msg_dict["body"] = self.payload.hex()
             msg_dict["error"] = "Unable to deserialize message."
-            messages.append(msg_dict)
-            # print("WARNING - Unable to deserialize message", file=sys.stderr)
-            continue
-
+            return msg_dict
         # Convert body of message into a jsonable object
-        if length:
+        if self.size:
             msg_dict["body"] = to_jsonable(msg)
-        messages.append(msg_dict)
-    return messages
+        return msg_dict
+
+
+def iter_raw_messages(
+    blob: bytes,
+    outbound: bool,
+    msgtypes: Optional[set[str]] = None,
+    since: Optional[int] = None,
+    until: Optional[int] = None,
+) -> Iterator[CapturedMessage]:
+    """
+    Walk a message_capture blob without copying it.
+
+    Records whose msgtype is not in msgtypes or whose time (microseconds since
+    the epoch) is before since are skipped on their header alone. Records are
+    written in time order, so the walk stops at the first one after until.
+    """
+    wanted = {msgtype.encode() for msgtype in msgtypes} if msgtypes else None
+    view = memoryview(blob)
+    offset = 0
+    end = len(view)
+    while offset + CAPTURE_HEADER.size <= end:
+        time, msgtype, length = CAPTURE_HEADER.unpack_from(view, offset)
+        offset += CAPTURE_HEADER.size
+        payload = view[offset : offset + length]
+        offset += length
+        if until is not None and time > until:
+            break
+        msgtype = msgtype.split(b"\x00", 1)[0]
+        if wanted is not None and msgtype not in wanted:
+            continue
+        if since is not None and time < since:
+            continue
+        yield CapturedMessage(outbound, time, msgtype, payload)
+
+
+# This function is a hacked-up copy of process_file() from
+# Bitcoin Core contrib/message-capture/message-capture-parser.py
+def parse_raw_messages(blob: bytes, outbound: bool):
+    return [message.to_dict() for message in iter_raw_messages(blob, outbound)]
 
 
 def to_jsonable(obj: str):
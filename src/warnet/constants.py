@@ -51,6 +51,8 @@ PLUGIN_ANNEX = "annex"
 DEFAULT_IMAGE_REPO = "bitcoindevproject/bitcoin"
 
 # Bitcoin Core config
+# rpcuser from the baseConfig of the bitcoincore chart
+BITCOIN_RPC_USER = "user"
 FORK_OBSERVER_RPCAUTH = "forkobserver:1418183465eecbd407010cf60811c6a0$d4e5f0647a63429c218da1302d7f19fe627302aeb0a71a74de55346a25d8057c"
 # Fork Observer config
 FORK_OBSERVER_RPC_USER = "forkobserver"
@@ -81,9 +83,37 @@ CADDY_INGRESS_NAME = "caddy-ingress"
 
 DEFAULT_NAMESPACES = Path("two_namespaces_two_users")
 
+# Local state kept between warnet invocations, e.g. cached pod logs
+WARNET_STATE_DIR = (
+    Path(os.environ.get("XDG_STATE_HOME", os.path.expanduser("~/.local/state"))) / "warnet"
+)
+
+# Field manager for objects warnet applies itself, and the per-namespace ConfigMap
+# recording which objects belong to each release (see warnet.manifests)
+WARNET_FIELD_MANAGER = "warnet"
+WARNET_RELEASE_RECORD = "warnet-releases"
+# Pod annotation holding a digest of the chart and values a tank was deployed from
+VALUES_DIGEST_ANNOTATION = "warnet.io/values-digest"
+# Nodes or namespaces `warnet deploy` works on at once, and how often a transient
+# failure is retried, with exponential backoff in seconds
+DEPLOY_WORKERS = int(os.environ.get("WARNET_DEPLOY_WORKERS", "16"))
+DEPLOY_RETRIES = 3
+DEPLOY_RETRY_BACKOFF = 1.0
+DEPLOY_RETRY_BACKOFF_MAX = 30.0
+# Images of pods started after deploy, by `warnet run` (see the commander chart)
+COMMANDER_IMAGES = ["bitcoindevproject/commander"]
+# Short-lived DaemonSet caching a network's images on every node before it is deployed
+PREPULL_DAEMONSET = "warnet-prepull"
+PREPULL_PAUSE_IMAGE = "registry.k8s.io/pause:3.9"
+# Statically linked, copied into the pre-pull pod to run as `true` in any image
+PREPULL_NOOP_IMAGE = "busybox:1.36"
+
 # Kubeconfig related stuffs
 KUBECONFIG = os.environ.get("KUBECONFIG", os.path.expanduser("~/.kube/config"))
 KUBECONFIG_UNDO = KUBECONFIG + "_warnet_undo"
+# Size of the shared kubernetes API connection pool. Commands that fan out over many
+# pods may raise it with warnet.k8s.set_connection_pool_size()
+KUBE_CONNECTION_POOL_SIZE = int(os.environ.get("WARNET_KUBE_POOL_SIZE", "16"))
 
 # TODO: all of this logging stuff should be a helm chart
 LOGGING_CONFIG = {
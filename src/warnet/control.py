@@ -1,10 +1,8 @@
-import io
 import json
 import os
 import subprocess
 import sys
 import time
-import zipapp
 from concurrent.futures import ThreadPoolExecutor, as_completed
 from multiprocessing import Pool
 from pathlib import Path
@@ -13,17 +11,21 @@ from typing import Optional
 import click
 import inquirer
 from inquirer.themes import GreenPassion
-from kubernetes.client.models import V1Pod
+from kubernetes.client.models import V1OwnerReference, V1Pod
+from kubernetes.client.rest import ApiException
 from rich import print
 from rich.console import Console
 from rich.prompt import Confirm, Prompt
 from rich.table import Table
 
+from .archive import delete_archives, delete_unused_scenarios, publish_scenario
 from .constants import (
+    BITCOIN_RPC_USER,
     BITCOINCORE_CONTAINER,
     COMMANDER_CHART,
     COMMANDER_CONTAINER,
     COMMANDER_MISSION,
+    LIGHTNING_MISSION,
     TANK_MISSION,
 )
 from .k8s import (
@@ -32,15 +34,16 @@ from .k8s import (
     get_default_namespace,
     get_default_namespace_or,
     get_mission,
+    get_missions,
     get_namespaces,
     get_pod,
     get_pods,
+    get_static_client,
     pod_log,
     snapshot_bitcoin_datadir,
-    wait_for_init,
     wait_for_pod,
-    write_file_to_container,
 )
+from .manifests import ManifestApplier, delete_release_record, get_release_records
 from .process import run_command, stream_command
 
 console = Console()
@@ -166,12 +169,20 @@ def down(force):
         subprocess.Popen(cmd, shell=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
         return f"Initiated deletion of pod: {pod_name} in namespace {namespace}"
 
+    def delete_applied_release(namespace, release_name, refs):
+        applier = ManifestApplier()
+        for ref in refs:
+            applier.delete(ref)
+        return f"Deleted applied release: {release_name} in namespace {namespace}"
+
     if not can_delete_pods():
         click.secho("You do not have permission to bring down the network.", fg="red")
         return
 
     namespaces = get_namespaces()
     release_list: list[dict[str, str]] = []
+    # Releases deployed with `warnet deploy --engine apply`, which helm knows nothing about
+    applied_list: list[dict] = []
     for v1namespace in namespaces:
         namespace = v1namespace.metadata.name
         command = f"helm list --namespace {namespace} -o json"
@@ -180,9 +191,11 @@ def down(force):
             releases = json.loads(result)
             for release in releases:
                 release_list.append({"namespace": namespace, "name": release["name"]})
+        for name, refs in get_release_records(namespace).items():
+            applied_list.append({"namespace": namespace, "name": name, "refs": refs})
 
     if not force:
-        affected_namespaces = set([entry["namespace"] for entry in release_list])
+        affected_namespaces = set([entry["namespace"] for entry in release_list + applied_list])
         namespace_listing = "\n  ".join(affected_namespaces)
         confirmed = "confirmed"
         click.secho("Preparing to bring down the running Warnet...", fg="yellow")
@@ -218,6 +231,14 @@ def down(force):
                 executor.submit(uninstall_release, release["namespace"], release["name"])
             )
 
+        # Delete objects of applied releases
+        for release in applied_list:
+            futures.append(
+                executor.submit(
+                    delete_applied_release, release["namespace"], release["name"], release["refs"]
+                )
+            )
+
         # Delete remaining pods
         pods = get_pods()
         for pod in pods:
@@ -227,6 +248,11 @@ def down(force):
         for future in as_completed(futures):
             console.print(f"[yellow]{future.result()}[/yellow]")
 
+    for namespace in set(release["namespace"] for release in applied_list):
+        delete_release_record(namespace)
+    for v1namespace in namespaces:
+        delete_archives(v1namespace.metadata.name)
+
     console.print("[bold yellow]Teardown process initiated for all components.[/bold yellow]")
     console.print("[bold yellow]Note: Some processes may continue in the background.[/bold yellow]")
     console.print("[bold green]Warnet teardown process completed.[/bold green]")
@@ -260,6 +286,12 @@ def get_active_network(namespace):
 @click.argument("additional_args", nargs=-1, type=click.UNPROCESSED)
 @click.option("--admin", is_flag=True, default=False, show_default=False)
 @click.option("--namespace", default=None, show_default=True)
+@click.option(
+    "--network-manifest",
+    is_flag=True,
+    default=False,
+    help="Look up the tanks, lightning nodes and channels here and pass them to the commander, so it makes no list calls",
+)
 def run(
     scenario_file: str,
     debug: bool,
@@ -267,12 +299,117 @@ def run(
     additional_args: tuple[str],
     admin: bool,
     namespace: Optional[str],
+    network_manifest: bool,
 ):
     """
     Run a scenario from a file.
     Pass `-- --help` to get individual scenario help
     """
-    return _run(scenario_file, debug, source_dir, additional_args, admin, namespace)
+    return _run(
+        scenario_file, debug, source_dir, additional_args, admin, namespace, network_manifest
+    )
+
+
+# The manifest holds RPC passwords, so it is handed to the commander in a Secret
+MANIFEST_SECRET_LABEL = "warnet.io/network-manifest"
+MANIFEST_SECRET_KEY = "warnet.json"
+
+
+def get_network_manifest(namespace: str, admin: bool) -> dict:
+    """
+    The tanks, lightning nodes and channels a commander would discover itself,
+    in the format of commander.discover_network()
+    """
+    sclient = get_static_client()
+
+    def list_objects(list_all, list_namespaced, label_selector):
+        if admin:
+            try:
+                return list_all(label_selector=label_selector).items
+            except ApiException as e:
+                if e.status != 403:
+                    raise e
+        return list_namespaced(namespace, label_selector=label_selector).items
+
+    manifest = {"tanks": [], "lightning": [], "channels": []}
+    pods = list_objects(
+        sclient.list_pod_for_all_namespaces,
+        sclient.list_namespaced_pod,
+        f"mission in ({TANK_MISSION},{LIGHTNING_MISSION})",
+    )
+    for pod in pods:
+        if not pod.status.pod_ip:
+            print(f"[yellow]Leaving {pod.metadata.name} out, it has no IP yet[/yellow]")
+            continue
+        labels = pod.metadata.labels
+        if labels["mission"] == TANK_MISSION:
+            manifest["tanks"].append(
+                {
+                    "tank": pod.metadata.name,
+                    "namespace": pod.metadata.namespace,
+                    "chain": labels["chain"],
+                    "rpc_host": pod.status.pod_ip,
+                    "rpc_port": int(labels["RPCPort"]),
+                    "rpc_user": BITCOIN_RPC_USER,
+                    "rpc_password": labels["rpcpassword"],
+                    "init_peers": pod.metadata.annotations["init_peers"],
+                }
+            )
+        else:
+            manifest["lightning"].append(
+                {
+                    "name": pod.metadata.name,
+                    "namespace": pod.metadata.namespace,
+                    "impl": "cln" if "cln" in labels["app.kubernetes.io/name"] else "lnd",
+                    "host": pod.status.pod_ip,
+                    "adminMacaroon": (pod.metadata.annotations or {}).get("adminMacaroon"),
+                }
+            )
+
+    cmaps = list_objects(
+        sclient.list_config_map_for_all_namespaces,
+        sclient.list_namespaced_config_map,
+        "channels=true",
+    )
+    for cm in cmaps:
+        for channel in json.loads(cm.data["channels"]):
+            manifest["channels"].append({**channel, "source": cm.data["source"]})
+    return manifest
+
+
+def publish_network_manifest(name: str, namespace: str, manifest: dict) -> str:
+    """Store the network manifest of the commander `name` in a Secret and return its name"""
+    secret_name = f"{name}-warnet"
+    body = {
+        "apiVersion": "v1",
+        "kind": "Secret",
+        "metadata": {"name": secret_name, "labels": {MANIFEST_SECRET_LABEL: name}},
+        "type": "Opaque",
+        "stringData": {MANIFEST_SECRET_KEY: json.dumps(manifest)},
+    }
+    get_static_client().create_namespaced_secret(namespace, body)
+    return secret_name
+
+
+def adopt_network_manifest(secret_name: str, name: str, namespace: str):
+    """Make the commander pod own its manifest Secret, so both are deleted together"""
+    sclient = get_static_client()
+    pod = sclient.read_namespaced_pod(name, namespace)
+    # Wargames players may update Secrets but not patch them
+    secret = sclient.read_namespaced_secret(secret_name, namespace)
+    secret.metadata.owner_references = [
+        V1OwnerReference(api_version="v1", kind="Pod", name=name, uid=pod.metadata.uid)
+    ]
+    sclient.replace_namespaced_secret(secret_name, namespace, secret)
+
+
+def delete_network_manifest(secret_name: str, namespace: str):
+    try:
+        get_static_client().delete_namespaced_secret(secret_name, namespace)
+    except ApiException as e:
+        # Wargames players cannot delete Secrets, and may read this one anyway
+        if e.status != 403:
+            raise e
 
 
 def _run(
@@ -282,6 +419,7 @@ def _run(
     additional_args: tuple[str],
     admin: bool,
     namespace: Optional[str],
+    network_manifest: bool = False,
 ) -> str:
     namespace = get_default_namespace_or(namespace)
 
@@ -294,49 +432,25 @@ def _run(
 
     name = f"commander-{scenario_name.replace('_', '')}-{int(time.time())}"
 
-    # Create in-memory buffer to store python archive instead of writing to disk
-    archive_buffer = io.BytesIO()
-
-    # No need to copy the entire scenarios/ directory into the archive
-    def filter(path):
-        if any(needle in str(path) for needle in [".pyc", ".csv", ".DS_Store"]):
-            return False
-        if any(
-            needle in str(path)
-            for needle in [
-                "__init__.py",
-                "commander.py",
-                "test_framework",
-                "ln_framework",
-                scenario_path.name,
-            ]
-        ):
-            print(f"Including: {path}")
-            return True
-        return False
-
-    # In case the scenario file is not in the root of the archive directory,
-    # we need to specify its relative path as a submodule
-    # First get the path of the file relative to the source directory
-    relative_path = scenario_path.relative_to(scenario_dir)
-    # Remove the '.py' extension
-    relative_name = relative_path.with_suffix("")
-    # Replace path separators with dots and pray the user included __init__.py
-    module_name = ".".join(relative_name.parts)
-    # Compile python archive
-    zipapp.create_archive(
-        source=scenario_dir,
-        target=archive_buffer,
-        main=f"{module_name}:main",
-        compressed=True,
-        filter=filter,
-    )
+    # Only the modules the scenario imports, the framework is shared by the namespace
+    try:
+        archive_configmap, framework_configmap = publish_scenario(
+            scenario_path, scenario_dir, namespace
+        )
+    except ValueError as e:
+        click.secho(e, fg="red")
+        return None
+    # Archives of scenarios whose commander is gone
+    delete_unused_scenarios(namespace)
 
-    # Encode the binary data as Base64
-    archive_buffer.seek(0)
-    archive_data = archive_buffer.read()
+    manifest_secret = None
+    if network_manifest:
+        manifest_secret = publish_network_manifest(
+            name, namespace, get_network_manifest(namespace, admin)
+        )
 
-    # Start the commander pod with python and init containers
+    # Start the commander pod
+    deployed = False
     try:
         # Construct Helm command
         helm_command = [
@@ -347,18 +461,25 @@ def _run(
             namespace,
             "--set",
             f"fullnameOverride={name}",
+            "--set",
+            f"archiveConfigMap={archive_configmap}",
         ]
 
         # Add additional arguments
         if admin:
             helm_command.extend(["--set", "admin=true"])
+        if framework_configmap:
+            helm_command.extend(["--set", f"frameworkConfigMap={framework_configmap}"])
         if additional_args:
             helm_command.extend(["--set", f"args={' '.join(additional_args)}"])
+        if manifest_secret:
+            helm_command.extend(["--set", f"warnetManifestSecret={manifest_secret}"])
 
         helm_command.extend([name, COMMANDER_CHART])
 
         # Execute Helm command
         result = subprocess.run(helm_command, check=True, capture_output=True, text=True)
+        deployed = True
 
         if result.returncode == 0:
             print(f"Successfully deployed scenario commander: {scenario_name}")
@@ -375,13 +496,11 @@ def _run(
         click.secho(e)
         click.secho("Please install Helm, or run `warnet setup`.", fg="red")
         return None
-
-    # upload scenario files and network data to the init container
-    wait_for_init(name, namespace=namespace)
-    if write_file_to_container(
-        name, "init", "/shared/archive.pyz", archive_data, namespace=namespace
-    ):
-        print(f"Successfully uploaded scenario data to commander: {scenario_name}")
+    finally:
+        if manifest_secret and deployed:
+            adopt_network_manifest(manifest_secret, name, namespace)
+        elif manifest_secret:
+            delete_network_manifest(manifest_secret, namespace)
 
     if debug:
         print("Waiting for commander pod to start...")
@@ -412,8 +531,9 @@ def _logs(pod_name: str, follow: bool, namespace: Optional[str] = None):
     if pod_name == "":
         try:
             pod_list = []
-            formatted_commanders = format_pods(get_mission(COMMANDER_MISSION))
-            formatted_tanks = format_pods(get_mission(TANK_MISSION))
+            crews = get_missions(COMMANDER_MISSION, TANK_MISSION)
+            formatted_commanders = format_pods(crews[COMMANDER_MISSION])
+            formatted_tanks = format_pods(crews[TANK_MISSION])
             pod_list.extend(formatted_commanders)
             pod_list.extend(formatted_tanks)
 
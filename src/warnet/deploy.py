@@ -2,9 +2,11 @@ import json
 import subprocess
 import sys
 import tempfile
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from functools import partial
 from multiprocessing import Process
 from pathlib import Path
-from typing import Optional
+from typing import Any, Callable, Optional
 
 import click
 import yaml
@@ -12,8 +14,8 @@ import yaml
 from .constants import (
     BITCOIN_CHART_LOCATION,
     CADDY_CHART,
-    DEFAULTS_FILE,
     DEFAULTS_NAMESPACE_FILE,
+    DEPLOY_WORKERS,
     FORK_OBSERVER_CHART,
     FORK_OBSERVER_RPC_PASSWORD,
     FORK_OBSERVER_RPC_USER,
@@ -27,6 +29,7 @@ from .constants import (
     NETWORK_FILE,
     PLUGIN_ANNEX,
     SCENARIOS_DIR,
+    VALUES_DIGEST_ANNOTATION,
     WARGAMES_NAMESPACE_PREFIX,
     AnnexMember,
     HookValue,
@@ -38,10 +41,42 @@ from .k8s import (
     get_default_namespace_or,
     get_mission,
     get_namespaces_by_type,
+    get_static_client,
+    set_connection_pool_size,
     wait_for_ingress_controller,
+    wait_for_pod_deleted,
     wait_for_pod_ready,
 )
+from .manifests import (
+    ManifestApplier,
+    get_release_records,
+    record_releases,
+    render_releases,
+    values_digest,
+)
+from .network_spec import NetworkSpec, NetworkSpecError
+from .plan import plan_network, print_plan, validate_node_pool
+from .plugins import close_plugin_host, get_plugin_host
+from .prepull import prepull_images
 from .process import run_command, stream_command
+from .scheduler import (
+    ScheduleResult,
+    interleave,
+    print_failures,
+    run_scheduled,
+    split_results,
+)
+from .tracing import span, start_tracing, stop_tracing, traced
+
+# Hooks run by the deploy process itself, node hooks run where the nodes are deployed
+DEPLOY_HOOKS = [
+    HookValue.PRE_DEPLOY,
+    HookValue.PRE_NETWORK,
+    HookValue.POST_NETWORK,
+    HookValue.POST_DEPLOY,
+]
+
+NODE_HOOKS = [HookValue.PRE_NODE, HookValue.POST_NODE]
 
 HINT = "\nAre you trying to run a scenario? See `warnet run --help`"
 
@@ -66,170 +101,371 @@ def validate_directory(ctx, param, value):
 @click.option("--debug", is_flag=True)
 @click.option("--namespace", type=str, help="Specify a namespace in which to deploy the network")
 @click.option("--to-all-users", is_flag=True, help="Deploy network to all user namespaces")
+@click.option(
+    "--engine",
+    type=click.Choice(["helm", "apply"]),
+    default="helm",
+    show_default=True,
+    help="Install each node as a helm release, or render the chart once per distinct node config and server-side apply the objects",
+)
+@click.option(
+    "--workers",
+    type=click.IntRange(min=1),
+    default=DEPLOY_WORKERS,
+    show_default=True,
+    help="Number of nodes or namespaces deployed at once",
+)
+@click.option(
+    "--only",
+    multiple=True,
+    help="Deploy only the named node or namespace, e.g. to retry failures (repeatable)",
+)
+@click.option(
+    "--incremental",
+    is_flag=True,
+    help="Only deploy nodes whose config changed since the last deploy, and remove nodes no longer in the network",
+)
+@click.option(
+    "--trace",
+    type=click.Path(dir_okay=False, writable=True, path_type=Path),
+    help="Record how long each deploy stage, node and plugin hook takes, as a Chrome trace file",
+)
+@click.option(
+    "--plan",
+    is_flag=True,
+    help="Render the network offline and report the pods, objects, resource requests and images it needs, without deploying",
+)
+@click.option(
+    "--node-pool",
+    callback=validate_node_pool,
+    help="With --plan, check the network can be scheduled on COUNTxCPU/MEMORY[/MAX_PODS] nodes, e.g. 10x4/16Gi",
+)
+@click.option(
+    "--prepull",
+    is_flag=True,
+    help="Cache the network's images on every cluster node before the nodes are deployed",
+)
 @click.argument("unknown_args", nargs=-1)
-def deploy(directory, debug, namespace, to_all_users, unknown_args):
+def deploy(
+    directory,
+    debug,
+    namespace,
+    to_all_users,
+    engine,
+    workers,
+    only,
+    incremental,
+    trace,
+    plan,
+    node_pool,
+    prepull,
+    unknown_args,
+):
     """Deploy a warnet with topology loaded from <directory>"""
     if unknown_args:
         raise click.BadParameter(f"Unknown args: {unknown_args}{HINT}")
 
-    _deploy(directory, debug, namespace, to_all_users)
+    spec = None
+    if (directory / NETWORK_FILE).exists():
+        # Report a broken network definition before anything touches the cluster
+        try:
+            spec = NetworkSpec.load(directory)
+        except NetworkSpecError as e:
+            raise click.ClickException(str(e)) from e
+
+    if plan:
+        if spec is None:
+            raise click.ClickException(f"--plan needs a {NETWORK_FILE} in {directory}")
+        # Only used to render metadata, the cluster is never contacted
+        if not print_plan(plan_network(spec, namespace or "default"), node_pool):
+            sys.exit(1)
+        return
+    if node_pool:
+        raise click.BadParameter("--node-pool is only used with --plan")
 
+    if not trace:
+        _deploy(
+            directory,
+            debug,
+            namespace,
+            to_all_users,
+            engine,
+            workers,
+            only,
+            incremental,
+            spec,
+            prepull=prepull,
+        )
+        return
 
-def _deploy(directory, debug, namespace, to_all_users):
+    spans_file = start_tracing(trace)
+    try:
+        with span("deploy", namespace=namespace):
+            _deploy(
+                directory,
+                debug,
+                namespace,
+                to_all_users,
+                engine,
+                workers,
+                only,
+                incremental,
+                spec,
+                prepull=prepull,
+            )
+    finally:
+        stop_tracing(spans_file, trace)
+        click.echo(f"Wrote deploy trace to {trace}, open it in chrome://tracing or Perfetto")
+
+
+def _deploy(
+    directory,
+    debug,
+    namespace,
+    to_all_users,
+    engine="helm",
+    workers=DEPLOY_WORKERS,
+    only=(),
+    incremental=False,
+    spec: Optional[NetworkSpec] = None,
+    show_progress=True,
+    prepull=False,
+):
     """Deploy a warnet with topology loaded from <directory>"""
     directory = Path(directory)
+    if spec is None and (directory / NETWORK_FILE).exists():
+        spec = NetworkSpec.load(directory)
+
+    if to_all_users and spec:
+        namespaces = [ns.metadata.name for ns in get_namespaces_by_type(WARGAMES_NAMESPACE_PREFIX)]
+        deploy_to_all_users(spec, debug, namespaces, engine, workers, only, incremental, prepull)
+        return
 
     if to_all_users:
         namespaces = get_namespaces_by_type(WARGAMES_NAMESPACE_PREFIX)
-        processes = []
-        for namespace in namespaces:
-            p = Process(target=_deploy, args=(directory, debug, namespace.metadata.name, False))
-            p.start()
-            processes.append(p)
-        for p in processes:
-            p.join()
+        tasks = {
+            ns.metadata.name: partial(
+                _deploy,
+                directory,
+                debug,
+                ns.metadata.name,
+                False,
+                engine,
+                workers,
+                only,
+                incremental,
+                spec,
+                False,
+            )
+            for ns in namespaces
+        }
+        result = run_scheduled(tasks, workers, "Deploying to users")
+        print_failures(result, f"warnet deploy {directory} --namespace <namespace>")
         return
 
-    if (directory / NETWORK_FILE).exists():
-        run_plugins(directory, HookValue.PRE_DEPLOY, namespace)
+    if spec:
+        try:
+            get_plugin_host().preload(
+                [plugin for hook in DEPLOY_HOOKS for plugin in spec.hook_plugins(hook)]
+            )
+            run_plugins(spec, HookValue.PRE_DEPLOY, namespace)
 
-        processes = []
-        # Deploy logging CRD first to avoid synchronisation issues
-        deploy_logging_crd(directory, debug)
+            processes = []
+            # Deploy logging CRD first to avoid synchronisation issues
+            deploy_logging_crd(spec, debug)
 
-        logging_process = Process(target=deploy_logging_stack, args=(directory, debug))
-        logging_process.start()
-        processes.append(logging_process)
+            logging_process = Process(target=deploy_logging_stack, args=(spec, debug))
+            logging_process.start()
+            processes.append(logging_process)
 
-        run_plugins(directory, HookValue.PRE_NETWORK, namespace)
+            if prepull:
+                prepull_images(spec, get_default_namespace_or(namespace))
 
-        network_process = Process(target=deploy_network, args=(directory, debug, namespace))
-        network_process.start()
+            run_plugins(spec, HookValue.PRE_NETWORK, namespace)
 
-        ingress_process = Process(target=deploy_ingress, args=(directory, debug))
-        ingress_process.start()
-        processes.append(ingress_process)
+            network_process = Process(
+                target=deploy_network,
+                args=(spec, debug, namespace, engine, workers, only, incremental, show_progress),
+            )
+            network_process.start()
 
-        caddy_process = Process(target=deploy_caddy, args=(directory, debug))
-        caddy_process.start()
-        processes.append(caddy_process)
+            ingress_process = Process(target=deploy_ingress, args=(spec, debug))
+            ingress_process.start()
+            processes.append(ingress_process)
 
-        # Wait for the network process to complete
-        network_process.join()
+            caddy_process = Process(target=deploy_caddy, args=(spec, debug))
+            caddy_process.start()
+            processes.append(caddy_process)
 
-        run_plugins(directory, HookValue.POST_NETWORK, namespace)
+            # Wait for the network process to complete
+            network_process.join()
 
-        # Start the fork observer process immediately after network process completes
-        fork_observer_process = Process(target=deploy_fork_observer, args=(directory, debug))
-        fork_observer_process.start()
-        processes.append(fork_observer_process)
+            run_plugins(spec, HookValue.POST_NETWORK, namespace)
 
-        # Wait for all other processes to complete
-        for p in processes:
-            p.join()
+            # Start the fork observer process immediately after network process completes
+            fork_observer_process = Process(target=deploy_fork_observer, args=(spec, debug))
+            fork_observer_process.start()
+            processes.append(fork_observer_process)
+
+            # Wait for all other processes to complete
+            for p in processes:
+                p.join()
 
-        run_plugins(directory, HookValue.POST_DEPLOY, namespace)
+            run_plugins(spec, HookValue.POST_DEPLOY, namespace)
+        finally:
+            # Plugin processes must be gone before this process can exit
+            close_plugin_host()
 
     elif (directory / NAMESPACES_FILE).exists():
-        deploy_namespaces(directory)
+        deploy_namespaces(directory, workers, only, show_progress)
     else:
         click.echo(
             "Error: Neither network.yaml nor namespaces.yaml found in the specified directory."
         )
 
 
-def run_plugins(directory, hook_value: HookValue, namespace, annex: Optional[dict] = None):
-    """Run the plugin commands within a given hook value"""
-
-    network_file_path = directory / NETWORK_FILE
-
-    with network_file_path.open() as f:
-        network_file = yaml.safe_load(f) or {}
-        if not isinstance(network_file, dict):
-            raise ValueError(f"Invalid network file structure: {network_file_path}")
-
-    processes = []
-
-    plugins_section = network_file.get("plugins", {})
-    hook_section = plugins_section.get(hook_value.value, {})
-    for plugin_name, plugin_content in hook_section.items():
-        match (plugin_name, plugin_content):
-            case (str(), dict()):
-                try:
-                    entrypoint_path = Path(plugin_content.get("entrypoint"))
-                except Exception as err:
-                    raise SyntaxError("Each plugin must have an 'entrypoint'") from err
-
-                warnet_content = {
-                    WarnetContent.HOOK_VALUE.value: hook_value.value,
-                    WarnetContent.NAMESPACE.value: namespace,
-                    PLUGIN_ANNEX: annex,
-                }
-
-                cmd = (
-                    f"{sys.executable} {network_file_path.parent / entrypoint_path / Path('plugin.py')} entrypoint "
-                    f"'{json.dumps(plugin_content)}' '{json.dumps(warnet_content)}'"
-                )
-                print(
-                    f"Queuing {hook_value.value} plugin command: {plugin_name} with {plugin_content}"
-                )
-
-                process = Process(target=run_command, args=(cmd,))
-                processes.append(process)
-
-            case _:
-                print(
-                    f"The following plugin command does not match known plugin command structures: {plugin_name} {plugin_content}"
-                )
-                sys.exit(1)
+def deploy_to_all_users(
+    spec: NetworkSpec,
+    debug: bool,
+    namespaces: list[str],
+    engine: str = "helm",
+    workers: int = DEPLOY_WORKERS,
+    only: tuple[str, ...] = (),
+    incremental: bool = False,
+    prepull: bool = False,
+):
+    """
+    Deploy the network to every user namespace from this one process.
 
-    if processes:
-        print(f"Starting {hook_value.value} plugins")
+    Cluster-wide stages run once. The nodes of all namespaces share a single
+    round-robin queue and worker budget, so every namespace's network comes up
+    at about the same pace.
+    """
+    get_plugin_host().preload(
+        [plugin for hook in DEPLOY_HOOKS + NODE_HOOKS for plugin in spec.hook_plugins(hook)]
+    )
+    try:
+        for namespace in namespaces:
+            run_plugins(spec, HookValue.PRE_DEPLOY, namespace)
 
-        for process in processes:
-            process.start()
+        deploy_logging_crd(spec, debug)
+        processes = [
+            Process(target=stage, args=(spec, debug))
+            for stage in (deploy_logging_stack, deploy_ingress, deploy_caddy)
+        ]
+        for p in processes:
+            p.start()
 
-        for process in processes:
-            process.join()
+        if prepull:
+            prepull_images(spec, get_default_namespace())
 
-        print(f"Completed {hook_value.value} plugins")
+        for namespace in namespaces:
+            run_plugins(spec, HookValue.PRE_NETWORK, namespace)
 
+        with span("network", namespaces=len(namespaces), engine=engine):
+            _deploy_nodes_to_all_users(spec, debug, namespaces, engine, workers, only, incremental)
 
-def check_logging_required(directory: Path):
-    # check if node-defaults has logging or metrics enabled
-    default_file_path = directory / DEFAULTS_FILE
-    with default_file_path.open() as f:
-        default_file = yaml.safe_load(f)
-    if default_file.get("collectLogs", False):
-        return True
-    if default_file.get("metricsExport", False):
-        return True
-    if default_file.get("lnd", {}).get("metricsExport"):
-        return True
+        for namespace in namespaces:
+            run_plugins(spec, HookValue.POST_NETWORK, namespace)
 
-    # check to see if individual nodes have logging enabled
-    network_file_path = directory / NETWORK_FILE
-    with network_file_path.open() as f:
-        network_file = yaml.safe_load(f)
+        fork_observer_process = Process(target=deploy_fork_observer, args=(spec, debug))
+        fork_observer_process.start()
+        processes.append(fork_observer_process)
+        for p in processes:
+            p.join()
 
-    nodes = network_file.get("nodes") or []
-    for node in nodes:
-        if node.get("collectLogs", False):
-            return True
-        if node.get("metricsExport", False):
-            return True
-        if node.get("lnd", {}).get("metricsExport"):
-            return True
+        for namespace in namespaces:
+            run_plugins(spec, HookValue.POST_DEPLOY, namespace)
+    finally:
+        close_plugin_host()
+
+
+def _deploy_nodes_to_all_users(
+    spec: NetworkSpec,
+    debug: bool,
+    namespaces: list[str],
+    engine: str,
+    workers: int,
+    only: tuple[str, ...],
+    incremental: bool,
+):
+    selected = select_only(spec.nodes, only, "node")
+    removals, deploys = {}, {}
+    for namespace in namespaces:
+        nodes = selected
+        if incremental:
+            nodes, removals[namespace] = plan_removals(nodes, spec, namespace, only)
+        deploys[namespace] = node_tasks(nodes, spec, debug, namespace, engine)
+
+    if engine == "apply":
+        set_connection_pool_size(workers)
+    retry_command = f"warnet deploy {spec.directory} --namespace {{namespace}}"
+    if engine != "helm":
+        retry_command += f" --engine {engine}"
+
+    if incremental:
+        removed = split_results(run_scheduled(interleave(removals), workers, "Removing nodes"))
+        for namespace, result in removed.items():
+            print_failures(result, retry_command.format(namespace=namespace) + " --incremental")
+            if engine == "apply":
+                record_releases(namespace, {}, removed=tuple(result.results))
+
+    deployed = split_results(run_scheduled(interleave(deploys), workers, "Deploying nodes"))
+    for namespace, result in deployed.items():
+        if engine == "apply":
+            record_releases(namespace, result.results)
+        print_failures(result, retry_command.format(namespace=namespace))
+
+    if spec.needs_ln_init:
+        tasks = {namespace: partial(run_ln_init, namespace) for namespace in namespaces}
+        result = run_scheduled(tasks, workers, "Initializing lightning networks")
+        print_failures(result, "warnet run resources/scenarios/ln_init.py --namespace <namespace>")
+
+
+def run_plugins(spec: NetworkSpec, hook_value: HookValue, namespace, annex: Optional[dict] = None):
+    """Run the plugins of a hook side by side on the resident plugin host"""
+    plugins = spec.hook_plugins(hook_value)
+    if not plugins:
+        return
 
-    return False
+    warnet_content = {
+        WarnetContent.HOOK_VALUE.value: hook_value.value,
+        WarnetContent.NAMESPACE.value: namespace,
+        PLUGIN_ANNEX: annex,
+    }
+    for plugin in plugins:
+        print(f"Queuing {hook_value.value} plugin command: {plugin.name} with {plugin.content}")
+
+    print(f"Starting {hook_value.value} plugins")
+    node = (annex or {}).get(AnnexMember.NODE_NAME.value)
+    host = get_plugin_host()
+
+    def run_plugin(plugin):
+        with span(f"plugin {plugin.name}", hook=hook_value.value, namespace=namespace, node=node):
+            host.run(plugin, warnet_content)
+
+    with (
+        span(f"{hook_value.value} plugins", namespace=namespace, node=node),
+        ThreadPoolExecutor(max_workers=len(plugins)) as executor,
+    ):
+        futures = {executor.submit(run_plugin, plugin): plugin for plugin in plugins}
+        for future in as_completed(futures):
+            try:
+                future.result()
+            except Exception as e:
+                click.secho(
+                    f"{hook_value.value} plugin {futures[future].name} failed: {e}", fg="red"
+                )
+    print(f"Completed {hook_value.value} plugins")
 
 
-def deploy_logging_crd(directory: Path, debug: bool) -> bool:
+@traced("logging-crd")
+def deploy_logging_crd(spec: NetworkSpec, debug: bool) -> bool:
     """
     This function exists so we can parallelise the rest of the loggin stack
     installation
     """
-    if not check_logging_required(directory):
+    if not spec.logging_required:
         return False
 
     click.echo(
@@ -243,8 +479,9 @@ def deploy_logging_crd(directory: Path, debug: bool) -> bool:
     return True
 
 
-def deploy_logging_stack(directory: Path, debug: bool) -> bool:
-    if not check_logging_required(directory):
+@traced("logging-stack")
+def deploy_logging_stack(spec: NetworkSpec, debug: bool) -> bool:
+    if not spec.logging_required:
         return False
 
     click.echo("Deploying logging stack")
@@ -256,27 +493,24 @@ def deploy_logging_stack(directory: Path, debug: bool) -> bool:
     return True
 
 
-def deploy_caddy(directory: Path, debug: bool):
-    network_file_path = directory / NETWORK_FILE
-    with network_file_path.open() as f:
-        network_file = yaml.safe_load(f)
-
+@traced("caddy")
+def deploy_caddy(spec: NetworkSpec, debug: bool):
     namespace = LOGGING_NAMESPACE
     # TODO: get this from the helm chart
     name = "caddy"
 
     # Only start if configured in the network file
-    if not network_file.get(name, {}).get("enabled", False):
+    if not spec.caddy.get("enabled", False):
         return
 
     # configure reverse proxy to webservers in the network
     services = []
     # built-in services
-    if check_logging_required(directory):
+    if spec.logging_required:
         services.append(
             {"title": "Grafana", "path": "/grafana/", "host": "loki-grafana", "port": 80}
         )
-    if network_file.get("fork_observer", {}).get("enabled", False):
+    if spec.fork_observer.get("enabled", False):
         services.append(
             {
                 "title": "Fork Observer",
@@ -286,7 +520,7 @@ def deploy_caddy(directory: Path, debug: bool):
             }
         )
     # add any extra services
-    services += network_file.get("services", {})
+    services += spec.services
 
     click.echo(f"Adding services to dashboard: {json.dumps(services, indent=2)}")
 
@@ -306,13 +540,10 @@ def deploy_caddy(directory: Path, debug: bool):
     click.echo("\nTo access the warnet dashboard run:\n  warnet dashboard")
 
 
-def deploy_ingress(directory: Path, debug: bool):
-    # Deploy ingress if either logging or fork observer is enabled
-    network_file_path = directory / NETWORK_FILE
-    with network_file_path.open() as f:
-        network_file = yaml.safe_load(f)
+@traced("ingress")
+def deploy_ingress(spec: NetworkSpec, debug: bool):
     # Only start if caddy is enabled in the network file
-    if not network_file.get("caddy", {}).get("enabled", False):
+    if not spec.caddy.get("enabled", False):
         return
     click.echo("Deploying ingress controller")
 
@@ -326,13 +557,10 @@ def deploy_ingress(directory: Path, debug: bool):
     return True
 
 
-def deploy_fork_observer(directory: Path, debug: bool) -> bool:
-    network_file_path = directory / NETWORK_FILE
-    with network_file_path.open() as f:
-        network_file = yaml.safe_load(f)
-
+@traced("fork-observer")
+def deploy_fork_observer(spec: NetworkSpec, debug: bool) -> bool:
     # Only start if configured in the network file
-    if not network_file.get("fork_observer", {}).get("enabled", False):
+    if not spec.fork_observer.get("enabled", False):
         return False
 
     default_namespace = get_default_namespace()
@@ -370,7 +598,7 @@ rpc_password = "{FORK_OBSERVER_RPC_PASSWORD}"
     # Create yaml string using multi-line string format
     override_string = override_string.strip()
     v = {"config": override_string}
-    v["configQueryinterval"] = network_file.get("fork_observer", {}).get("configQueryinterval", 20)
+    v["configQueryinterval"] = spec.fork_observer.get("configQueryinterval", 20)
     yaml_string = yaml.dump(v, default_style="|", default_flow_style=False)
 
     # Dump to yaml tempfile
@@ -386,40 +614,77 @@ rpc_password = "{FORK_OBSERVER_RPC_PASSWORD}"
     return True
 
 
-def deploy_network(directory: Path, debug: bool = False, namespace: Optional[str] = None):
-    network_file_path = directory / NETWORK_FILE
+def select_only(items: list[dict], only: tuple[str, ...], kind: str) -> list[dict]:
+    """Keep the named items of a network or namespaces file, when names were given"""
+    if not only:
+        return items
+    names = {item.get("name") for item in items}
+    for name in sorted(set(only) - names):
+        click.secho(f"No {kind} named {name} in the network definition", fg="yellow")
+    return [item for item in items if item.get("name") in only]
+
+
+def deploy_network(
+    spec: NetworkSpec,
+    debug: bool = False,
+    namespace: Optional[str] = None,
+    engine: str = "helm",
+    workers: int = DEPLOY_WORKERS,
+    only: tuple[str, ...] = (),
+    incremental: bool = False,
+    show_progress: bool = True,
+):
     namespace = get_default_namespace_or(namespace)
+    # Node hooks run in this process, keep their plugins resident here
+    get_plugin_host().preload([plugin for hook in NODE_HOOKS for plugin in spec.hook_plugins(hook)])
+    try:
+        with span("network", namespace=namespace, engine=engine):
+            _deploy_nodes(spec, debug, namespace, engine, workers, only, incremental, show_progress)
+    finally:
+        # Plugin processes must be gone before this process can exit
+        close_plugin_host()
+
+
+def _deploy_nodes(
+    spec: NetworkSpec,
+    debug: bool,
+    namespace: str,
+    engine: str,
+    workers: int,
+    only: tuple[str, ...],
+    incremental: bool,
+    show_progress: bool,
+):
+    nodes = select_only(spec.nodes, only, "node")
+    if incremental:
+        nodes, tasks = plan_removals(nodes, spec, namespace, only)
+        result = run_scheduled(tasks, workers, "Removing nodes", show_progress=show_progress)
+        print_failures(
+            result, f"warnet deploy {spec.directory} --namespace {namespace} --incremental"
+        )
+        if engine == "apply":
+            record_releases(namespace, {}, removed=tuple(result.results))
+        if not nodes:
+            return
+
+    if engine == "apply":
+        result = apply_nodes(nodes, spec, namespace, workers, show_progress)
+    else:
+        tasks = node_tasks(nodes, spec, debug, namespace, engine)
+        result = run_scheduled(tasks, workers, "Deploying nodes", show_progress=show_progress)
+
+    retry_command = f"warnet deploy {spec.directory} --namespace {namespace}"
+    if engine != "helm":
+        retry_command += f" --engine {engine}"
+    print_failures(result, retry_command)
+
+    if spec.needs_ln_init:
+        run_ln_init(namespace)
+
 
-    with network_file_path.open() as f:
-        network_file = yaml.safe_load(f)
-
-    needs_ln_init = False
-    supported_ln_projects = ["lnd", "cln"]
-    for node in network_file["nodes"]:
-        ln_config = node.get("ln", {})
-        for key in supported_ln_projects:
-            if ln_config.get(key, False) and key in node and "channels" in node[key]:
-                needs_ln_init = True
-                break
-        if needs_ln_init:
-            break
-
-    default_file_path = directory / DEFAULTS_FILE
-    with default_file_path.open() as f:
-        default_file = yaml.safe_load(f)
-    if any(default_file.get("ln", {}).get(key, False) for key in supported_ln_projects):
-        needs_ln_init = True
-
-    processes = []
-    for node in network_file["nodes"]:
-        p = Process(target=deploy_single_node, args=(node, directory, debug, namespace))
-        p.start()
-        processes.append(p)
-
-    for p in processes:
-        p.join()
-
-    if needs_ln_init:
+def run_ln_init(namespace: str):
+    """Open the channels of a lightning network and follow the scenario to the end"""
+    with span("ln-init", namespace=namespace):
         name = _run(
             scenario_file=SCENARIOS_DIR / "ln_init.py",
             debug=False,
@@ -432,16 +697,100 @@ def deploy_network(directory: Path, debug: bool = False, namespace: Optional[str
         _logs(pod_name=name, follow=True, namespace=namespace)
 
 
-def deploy_single_node(node, directory: Path, debug: bool, namespace: str):
-    defaults_file_path = directory / DEFAULTS_FILE
-    click.echo(f"Deploying node: {node.get('name')}")
+def node_tasks(
+    nodes: list[dict], spec: NetworkSpec, debug: bool, namespace: str, engine: str
+) -> dict[str, Callable[[], Any]]:
+    """A task per node deploying it with the given engine, for run_scheduled()"""
+    if engine == "apply":
+        return apply_tasks(nodes, spec, namespace)
+    return {
+        node["name"]: partial(deploy_single_node, node, spec, debug, namespace) for node in nodes
+    }
+
+
+def plan_removals(
+    nodes: list[dict], spec: NetworkSpec, namespace: str, only: tuple[str, ...]
+) -> tuple[list[dict], dict[str, Callable[[], Any]]]:
+    """The nodes an incremental deploy installs, and tasks removing stale ones first"""
+    # Removing nodes missing from the network file only makes sense when all were given
+    nodes, replaced, removed = plan_incremental(nodes, spec, namespace, prune=not only)
+    click.echo(
+        f"Deploying {len(nodes) - len(replaced)} new and {len(replaced)} changed nodes "
+        f"to {namespace}, removing {len(removed)} nodes"
+    )
+    return nodes, {name: partial(remove_node, name, namespace) for name in replaced + removed}
+
+
+def node_values(node: dict, spec: NetworkSpec) -> dict:
+    """
+    Chart values a node overrides, annotated with a digest of everything the
+    node is rendered from so a later deploy can tell whether it changed
+    """
+    values = {k: v for k, v in node.items() if k != "name"}
+    digest = values_digest(BITCOIN_CHART_LOCATION, [spec.defaults_file], values)
+    values["podAnnotations"] = {
+        **values.get("podAnnotations", {}),
+        VALUES_DIGEST_ANNOTATION: digest,
+    }
+    return values
+
+
+def plan_incremental(
+    nodes: list[dict], spec: NetworkSpec, namespace: str, prune: bool = True
+) -> tuple[list[dict], list[str], list[str]]:
+    """
+    Compare nodes with the tanks running in the namespace.
+
+    Returns the nodes to deploy, the running tanks among them that changed and
+    must be replaced, and the running tanks no longer in the network.
+    """
+    sclient = get_static_client()
+    tanks = sclient.list_namespaced_pod(namespace, label_selector="mission=tank").items
+    live = {
+        tank.metadata.name: (tank.metadata.annotations or {}).get(VALUES_DIGEST_ANNOTATION)
+        for tank in tanks
+    }
+
+    deploy, replaced = [], []
+    for node in nodes:
+        name = node["name"]
+        if name not in live:
+            deploy.append(node)
+        elif live[name] != node_values(node, spec)["podAnnotations"][VALUES_DIGEST_ANNOTATION]:
+            deploy.append(node)
+            replaced.append(name)
+    names = {node["name"] for node in nodes}
+    removed = sorted(name for name in live if name not in names) if prune else []
+    return deploy, replaced, removed
+
+
+def remove_node(name: str, namespace: str):
+    """Delete a node deployed by either engine and wait until its pods are gone"""
+    with span("remove node", node=name, namespace=namespace):
+        _remove_node(name, namespace)
+
+
+def _remove_node(name: str, namespace: str):
+    records = get_release_records(namespace)
+    if name not in records:
+        run_command(f"helm uninstall {name} --namespace {namespace} --wait")
+        return
+    applier = ManifestApplier()
+    for ref in records[name]:
+        applier.delete(ref)
+    for ref in records[name]:
+        if ref["kind"] == "Pod" and not wait_for_pod_deleted(ref["name"], namespace):
+            raise TimeoutError(f"Pod {ref['name']} was not deleted in time")
+
+
+def deploy_single_node(node, spec: NetworkSpec, debug: bool, namespace: str):
+    """Install or upgrade the helm release of one node, raising if helm fails"""
     temp_override_file_path = ""
     try:
         node_name = node.get("name")
-        node_config_override = {k: v for k, v in node.items() if k != "name"}
+        node_config_override = node_values(node, spec)
 
-        defaults_file_path = directory / DEFAULTS_FILE
-        cmd = f"{HELM_COMMAND} {node_name} {BITCOIN_CHART_LOCATION} --namespace {namespace} -f {defaults_file_path}"
+        cmd = f"{HELM_COMMAND} {node_name} {BITCOIN_CHART_LOCATION} --namespace {namespace} -f {spec.defaults_file}"
         if debug:
             cmd += " --debug"
 
@@ -452,29 +801,77 @@ def deploy_single_node(node, directory: Path, debug: bool, namespace: str):
             cmd = f"{cmd} -f {temp_override_file_path}"
 
         run_plugins(
-            directory, HookValue.PRE_NODE, namespace, annex={AnnexMember.NODE_NAME.value: node_name}
+            spec, HookValue.PRE_NODE, namespace, annex={AnnexMember.NODE_NAME.value: node_name}
         )
 
-        if not stream_command(cmd):
-            click.echo(f"Failed to run Helm command: {cmd}")
-            return
+        # Output of concurrent installs would interleave, so it is only shown with --debug
+        with span("helm node", node=node_name, namespace=namespace):
+            if debug:
+                stream_command(cmd)
+            else:
+                run_command(cmd)
 
         run_plugins(
-            directory,
+            spec,
             HookValue.POST_NODE,
             namespace,
             annex={AnnexMember.NODE_NAME.value: node_name},
         )
-
-    except Exception as e:
-        click.echo(f"Error: {e}")
-        return
     finally:
         if temp_override_file_path:
             Path(temp_override_file_path).unlink()
 
 
-def deploy_namespaces(directory: Path):
+def apply_nodes(
+    nodes: list[dict], spec: NetworkSpec, namespace: str, workers: int, show_progress: bool = True
+) -> ScheduleResult:
+    """
+    Deploy nodes without a helm release each: the bitcoincore chart is rendered
+    once per distinct node config and the objects are server-side applied by a
+    pool of threads sharing one API connection pool.
+    """
+    set_connection_pool_size(workers)
+    tasks = apply_tasks(nodes, spec, namespace)
+    result = run_scheduled(tasks, workers, "Applying nodes", show_progress=show_progress)
+
+    # Record what was applied, even after a partial failure, so `warnet down` can remove it
+    record_releases(namespace, result.results)
+    return result
+
+
+def apply_tasks(
+    nodes: list[dict], spec: NetworkSpec, namespace: str
+) -> dict[str, Callable[[], list[dict]]]:
+    """Render the nodes and return a task per node applying its objects"""
+    releases = {node["name"]: node_values(node, spec) for node in nodes}
+    with span("render", namespace=namespace, nodes=len(releases)):
+        rendered = render_releases(
+            releases, BITCOIN_CHART_LOCATION, namespace, [spec.defaults_file]
+        )
+    applier = ManifestApplier()
+    return {
+        name: partial(apply_single_node, applier, name, objects, spec, namespace)
+        for name, objects in rendered.items()
+    }
+
+
+def apply_single_node(
+    applier: ManifestApplier, node_name: str, objects: list[dict], spec: NetworkSpec, namespace: str
+) -> list[dict]:
+    annex = {AnnexMember.NODE_NAME.value: node_name}
+    run_plugins(spec, HookValue.PRE_NODE, namespace, annex=annex)
+    with span("apply node", node=node_name, namespace=namespace):
+        refs = applier.apply(objects, namespace)
+    run_plugins(spec, HookValue.POST_NODE, namespace, annex=annex)
+    return refs
+
+
+def deploy_namespaces(
+    directory: Path,
+    workers: int = DEPLOY_WORKERS,
+    only: tuple[str, ...] = (),
+    show_progress: bool = True,
+):
     namespaces_file_path = directory / NAMESPACES_FILE
     defaults_file_path = directory / DEFAULTS_NAMESPACE_FILE
 
@@ -490,18 +887,16 @@ def deploy_namespaces(directory: Path):
             )
             return
 
-    processes = []
-    for namespace in namespaces_file["namespaces"]:
-        p = Process(target=deploy_single_namespace, args=(namespace, defaults_file_path))
-        p.start()
-        processes.append(p)
-
-    for p in processes:
-        p.join()
+    tasks = {
+        namespace["name"]: partial(deploy_single_namespace, namespace, defaults_file_path)
+        for namespace in select_only(namespaces_file["namespaces"], only, "namespace")
+    }
+    result = run_scheduled(tasks, workers, "Deploying namespaces", show_progress=show_progress)
+    print_failures(result, f"warnet deploy {directory}")
 
 
 def deploy_single_namespace(namespace, defaults_file_path: Path):
-    click.echo(f"Deploying namespace: {namespace.get('name')}")
+    """Install or upgrade the helm release of one namespace, raising if helm fails"""
     temp_override_file_path = ""
     try:
         namespace_name = namespace.get("name")
@@ -515,12 +910,8 @@ def deploy_single_namespace(namespace, defaults_file_path: Path):
                 temp_override_file_path = Path(temp_file.name)
             cmd = f"{cmd} -f {temp_override_file_path}"
 
-        if not stream_command(cmd):
-            click.echo(f"Failed to run Helm command: {cmd}")
-            return
-    except Exception as e:
-        click.echo(f"Error: {e}")
-        return
+        with span("helm namespace", namespace=namespace_name):
+            run_command(cmd)
     finally:
         if temp_override_file_path:
             Path(temp_override_file_path).unlink()
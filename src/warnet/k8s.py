@@ -3,22 +3,25 @@ import os
 import sys
 import tarfile
 import tempfile
+import threading
+from functools import partial
 from pathlib import Path
-from time import sleep
+from time import monotonic
 from typing import Optional
 
 import yaml
 from kubernetes import client, config, watch
 from kubernetes.client import CoreV1Api
-from kubernetes.client.models import V1Namespace, V1Pod, V1PodList
+from kubernetes.client.models import V1Namespace, V1Pod, V1PodList, V1Service
 from kubernetes.client.rest import ApiException
 from kubernetes.dynamic import DynamicClient
-from kubernetes.stream import stream
+from kubernetes.stream import portforward, stream
 
 from .constants import (
     CADDY_INGRESS_NAME,
     DEFAULT_NAMESPACE,
     INGRESS_NAMESPACE,
+    KUBE_CONNECTION_POOL_SIZE,
     KUBE_INTERNAL_NAMESPACES,
     KUBECONFIG,
     LOGGING_NAMESPACE,
@@ -30,28 +33,327 @@ class K8sError(Exception):
     pass
 
 
+# One ApiClient (and therefore one urllib3 connection pool) is shared by every
+# helper in this process. It is rebuilt when the kubeconfig changes on disk, when
+# the pool size is changed, or after a fork (sockets must not be shared with a
+# parent process).
+_client_lock = threading.RLock()
+_client_state: dict = {}
+_pool_size = KUBE_CONNECTION_POOL_SIZE
+
+
+def _kubeconfig_stamp() -> tuple:
+    """Cheap fingerprint of the kubeconfig file(s) used to detect changes"""
+    stamp = []
+    for path in KUBECONFIG.split(os.pathsep):
+        try:
+            st = os.stat(path)
+            stamp.append((path, st.st_mtime_ns, st.st_size))
+        except OSError:
+            stamp.append((path, None, None))
+    return tuple(stamp)
+
+
+def _get_client_configuration() -> client.Configuration:
+    with _client_lock:
+        key = (os.getpid(), _kubeconfig_stamp(), _pool_size)
+        if _client_state.get("key") != key:
+            configuration = client.Configuration()
+            config.load_kube_config(config_file=KUBECONFIG, client_configuration=configuration)
+            configuration.connection_pool_maxsize = _pool_size
+            _client_state.clear()
+            _client_state["key"] = key
+            _client_state["configuration"] = configuration
+        return _client_state["configuration"]
+
+
+def get_api_client() -> client.ApiClient:
+    """Return the process-wide ApiClient, rebuilding it if the kubeconfig changed"""
+    with _client_lock:
+        configuration = _get_client_configuration()
+        if "api_client" not in _client_state:
+            _client_state["api_client"] = client.ApiClient(configuration)
+        return _client_state["api_client"]
+
+
+def set_connection_pool_size(size: int) -> None:
+    """Resize the shared connection pool, e.g. before fanning out over many pods"""
+    global _pool_size
+    with _client_lock:
+        if size != _pool_size:
+            _pool_size = size
+            _client_state.clear()
+
+
 def get_static_client() -> CoreV1Api:
-    config.load_kube_config(config_file=KUBECONFIG)
-    return client.CoreV1Api()
+    with _client_lock:
+        get_api_client()
+        if "core_v1" not in _client_state:
+            _client_state["core_v1"] = client.CoreV1Api(_client_state["api_client"])
+        return _client_state["core_v1"]
+
+
+def get_stream_client() -> CoreV1Api:
+    """
+    Return a CoreV1Api for exec/port-forward streams.
+
+    kubernetes.stream temporarily swaps out the request method of the ApiClient it
+    is given, so streams get their own ApiClient instead of the shared one. The
+    parsed kubeconfig is still reused.
+    """
+    return client.CoreV1Api(client.ApiClient(_get_client_configuration()))
 
 
 def get_dynamic_client() -> DynamicClient:
-    config.load_kube_config(config_file=KUBECONFIG)
-    return DynamicClient(client.ApiClient())
+    with _client_lock:
+        get_api_client()
+        if "dynamic" not in _client_state:
+            _client_state["dynamic"] = DynamicClient(_client_state["api_client"])
+        return _client_state["dynamic"]
+
+
+# Seconds a single watch request stays open before it is renewed from the last
+# seen resourceVersion
+INFORMER_WATCH_TIMEOUT = 300
+
+
+class PodInformer:
+    """
+    In-memory pod store kept current by a single list+watch stream.
+
+    The store is filled by one list request and then updated from a watch that
+    resumes from the last seen resourceVersion, relisting only when the server
+    reports it as expired (410). Readers get the current state without a round
+    trip. Only pods matching label_selector are kept.
+    """
 
+    def __init__(self, namespace: Optional[str] = None, label_selector: Optional[str] = None):
+        self.namespace = namespace
+        self.label_selector = label_selector
+        self.error: Optional[Exception] = None
+        self._pods: dict[tuple[str, str], V1Pod] = {}
+        self._resource_version: Optional[str] = None
+        self._synced = False
+        self._cond = threading.Condition()
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, name=f"pod-informer-{namespace or 'all'}", daemon=True
+        )
+
+    def start(self) -> "PodInformer":
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stopped.set()
+        with self._cond:
+            self._cond.notify_all()
+
+    @property
+    def forbidden(self) -> bool:
+        return isinstance(self.error, ApiException) and self.error.status in (401, 403)
+
+    def wait_synced(self, timeout: Optional[float] = None) -> bool:
+        """Block until the initial list is in the store or the informer failed"""
+        with self._cond:
+            return self._cond.wait_for(lambda: self._synced or self.error, timeout)
+
+    def pods(self, predicate=None) -> list[V1Pod]:
+        with self._cond:
+            return [
+                pod for _, pod in sorted(self._pods.items()) if predicate is None or predicate(pod)
+            ]
+
+    def get(self, name: str, namespace: str) -> Optional[V1Pod]:
+        with self._cond:
+            return self._pods.get((namespace, name))
+
+    def _list_func(self):
+        sclient = get_static_client()
+        if self.namespace:
+            return partial(
+                sclient.list_namespaced_pod, self.namespace, label_selector=self.label_selector
+            )
+        return partial(sclient.list_pod_for_all_namespaces, label_selector=self.label_selector)
+
+    def _list(self):
+        pod_list: V1PodList = self._list_func()()
+        with self._cond:
+            self._pods = {
+                (pod.metadata.namespace, pod.metadata.name): pod for pod in pod_list.items
+            }
+            self._resource_version = pod_list.metadata.resource_version
+            self._synced = True
+            self._cond.notify_all()
+
+    def _watch(self):
+        w = watch.Watch()
+        for event in w.stream(
+            self._list_func(),
+            resource_version=self._resource_version,
+            allow_watch_bookmarks=True,
+            timeout_seconds=INFORMER_WATCH_TIMEOUT,
+        ):
+            if self._stopped.is_set():
+                w.stop()
+                break
+            if event["type"] == "BOOKMARK":
+                self._resource_version = event["raw_object"]["metadata"]["resourceVersion"]
+                continue
+            pod: V1Pod = event["object"]
+            key = (pod.metadata.namespace, pod.metadata.name)
+            with self._cond:
+                if event["type"] == "DELETED":
+                    self._pods.pop(key, None)
+                else:
+                    self._pods[key] = pod
+                self._resource_version = pod.metadata.resource_version
+                self._cond.notify_all()
+
+    def _run(self):
+        backoff = 1
+        while not self._stopped.is_set():
+            try:
+                if self._resource_version is None:
+                    self._list()
+                self._watch()
+                backoff = 1
+            except ApiException as e:
+                if e.status == 410:
+                    # Our resourceVersion is too old to resume from
+                    self._resource_version = None
+                    continue
+                if e.status in (401, 403) or not self._synced:
+                    self._fail(e)
+                    return
+                self._stopped.wait(backoff)
+                backoff = min(backoff * 2, 30)
+            except Exception as e:
+                if not self._synced:
+                    self._fail(e)
+                    return
+                self._stopped.wait(backoff)
+                backoff = min(backoff * 2, 30)
+
+    def _fail(self, error: Exception):
+        with self._cond:
+            self.error = error
+            self._cond.notify_all()
+
+
+_informer_lock = threading.Lock()
+# Informers by (namespace, label_selector), namespace None watching all of them
+_informers: dict = {}
+
+
+def get_pod_informer(
+    namespace: Optional[str] = None, label_selector: Optional[str] = None
+) -> Optional[PodInformer]:
+    """
+    Return the process-wide synced informer of the pods matching label_selector
+    in namespace.
+
+    A cluster-wide informer is preferred. If RBAC forbids watching pods in all
+    namespaces, a per-namespace informer is started instead, and None is
+    returned when no namespace was requested.
+    """
+    cluster = _start_informer(None, label_selector)
+    if not cluster.forbidden:
+        return cluster
+    if namespace is None:
+        return None
+    return _start_informer(namespace, label_selector)
 
-def get_pods() -> list[V1Pod]:
+
+def running_pod_informer(label_selector: Optional[str] = None) -> Optional[PodInformer]:
+    """Return the cluster-wide informer of label_selector if this process already started one"""
+    with _informer_lock:
+        if _informers.get("pid") != os.getpid():
+            return None
+        informer = _informers.get((None, label_selector))
+    if informer is None or not informer.wait_synced(0) or informer.error:
+        return None
+    return informer
+
+
+def _start_informer(namespace: Optional[str], label_selector: Optional[str]) -> PodInformer:
+    key = (namespace, label_selector)
+    with _informer_lock:
+        # Threads do not survive a fork, children start their own informer
+        if _informers.get("pid") != os.getpid():
+            _informers.clear()
+            _informers["pid"] = os.getpid()
+        informer = _informers.get(key)
+        if informer is None:
+            informer = _informers[key] = PodInformer(namespace, label_selector).start()
+    informer.wait_synced()
+    if informer.error and not informer.forbidden:
+        with _informer_lock:
+            if _informers.get(key) is informer:
+                del _informers[key]
+        raise informer.error
+    return informer
+
+
+def _watch_pod(name: str, namespace: str, done, timeout: float) -> bool:
+    """
+    Watch a single pod until done(pod) holds, pod being None while it does not
+    exist. Returns False after timeout seconds.
+
+    Only this pod is listed and watched, and the watch is closed on return, so
+    many concurrent waits, e.g. one per deploy process, stay cheap.
+    """
     sclient = get_static_client()
-    pods: list[V1Pod] = []
-    namespaces = get_namespaces()
-    for ns in namespaces:
-        namespace = ns.metadata.name
+    selector = f"metadata.name={name}"
+    deadline = monotonic() + timeout
+    resource_version = None
+    while True:
+        if resource_version is None:
+            pod_list: V1PodList = sclient.list_namespaced_pod(namespace, field_selector=selector)
+            if done(pod_list.items[0] if pod_list.items else None):
+                return True
+            resource_version = pod_list.metadata.resource_version
+        remaining = deadline - monotonic()
+        if remaining <= 0:
+            return False
+        w = watch.Watch()
         try:
-            pod_list: V1PodList = sclient.list_namespaced_pod(namespace)
-            for pod in pod_list.items:
-                pods.append(pod)
-        except Exception as e:
+            for event in w.stream(
+                sclient.list_namespaced_pod,
+                namespace,
+                field_selector=selector,
+                resource_version=resource_version,
+                timeout_seconds=max(int(remaining), 1),
+            ):
+                pod: V1Pod = event["object"]
+                resource_version = pod.metadata.resource_version
+                if done(None if event["type"] == "DELETED" else pod):
+                    w.stop()
+                    return True
+        except ApiException as e:
+            if e.status != 410:
+                raise e
+            # Our resourceVersion is too old to resume from
+            resource_version = None
+
+
+def get_pods(label_selector: Optional[str] = None) -> list[V1Pod]:
+    sclient = get_static_client()
+    try:
+        # One request for the whole cluster if RBAC allows it
+        pod_list: V1PodList = sclient.list_pod_for_all_namespaces(label_selector=label_selector)
+        return [
+            pod for pod in pod_list.items if pod.metadata.namespace not in KUBE_INTERNAL_NAMESPACES
+        ]
+    except ApiException as e:
+        if e.status != 403:
             raise e
+
+    # Namespaced users fall back to listing each namespace they can see
+    pods: list[V1Pod] = []
+    for ns in get_namespaces():
+        pod_list = sclient.list_namespaced_pod(ns.metadata.name, label_selector=label_selector)
+        pods.extend(pod_list.items)
     return pods
 
 
@@ -61,13 +363,37 @@ def get_pod(name: str, namespace: Optional[str] = None) -> V1Pod:
     return sclient.read_namespaced_pod(name=name, namespace=namespace)
 
 
-def get_mission(mission: str) -> list[V1Pod]:
-    pods = get_pods()
-    crew: list[V1Pod] = []
+def get_service(name: str, namespace: Optional[str] = None) -> Optional[V1Service]:
+    namespace = get_default_namespace_or(namespace)
+    sclient = get_static_client()
+    try:
+        return sclient.read_namespaced_service(name=name, namespace=namespace)
+    except ApiException as e:
+        if e.status == 404:
+            return None
+        raise e
+
+
+def get_missions(*missions: str) -> dict[str, list[V1Pod]]:
+    """
+    Get the pods of several missions with one label-selected query, or from the
+    pod informer if one is already running. No informer is started here as it
+    would list every pod in the cluster.
+    """
+    crews: dict[str, list[V1Pod]] = {mission: [] for mission in missions}
+    label_selector = f"mission in ({','.join(missions)})"
+    informer = running_pod_informer(label_selector)
+    if informer is None:
+        pods = get_pods(label_selector=label_selector)
+    else:
+        pods = informer.pods(lambda pod: pod.metadata.namespace not in KUBE_INTERNAL_NAMESPACES)
     for pod in pods:
-        if "mission" in pod.metadata.labels and pod.metadata.labels["mission"] == mission:
-            crew.append(pod)
-    return crew
+        crews[pod.metadata.labels["mission"]].append(pod)
+    return crews
+
+
+def get_mission(mission: str) -> list[V1Pod]:
+    return get_missions(mission)[mission]
 
 
 def get_pod_exit_status(pod_name, namespace: Optional[str] = None):
@@ -153,19 +479,34 @@ def delete_pod(pod_name: str, namespace: Optional[str] = None) -> bool:
     return stream_command(command)
 
 
+_namespace_cache: dict = {}
+
+
 def get_default_namespace() -> str:
-    command = "kubectl config view --minify -o jsonpath='{..namespace}'"
-    try:
-        kubectl_namespace = run_command(command)
-    except Exception as e:
-        print(e)
-        if str(e).find("command not found"):
-            print(
-                "It looks like kubectl is not installed. Please install it to continue: "
-                "https://kubernetes.io/docs/tasks/tools/"
-            )
-        sys.exit(1)
-    return kubectl_namespace if kubectl_namespace else DEFAULT_NAMESPACE
+    """Namespace of the current kubeconfig context, resolved without running kubectl"""
+    stamp = _kubeconfig_stamp()
+    if _namespace_cache.get("stamp") == stamp:
+        return _namespace_cache["namespace"]
+
+    # Merge the same way kubectl does: the first file to set a value wins
+    current_context = None
+    contexts: dict = {}
+    for path in KUBECONFIG.split(os.pathsep):
+        if not path or not os.path.exists(path):
+            continue
+        try:
+            kubeconfig_data = open_kubeconfig(path) or {}
+        except K8sError as e:
+            print(e)
+            sys.exit(1)
+        current_context = current_context or kubeconfig_data.get("current-context")
+        for context in kubeconfig_data.get("contexts") or []:
+            contexts.setdefault(context.get("name"), context.get("context") or {})
+
+    namespace = contexts.get(current_context, {}).get("namespace") or DEFAULT_NAMESPACE
+    _namespace_cache["stamp"] = stamp
+    _namespace_cache["namespace"] = namespace
+    return namespace
 
 
 def get_default_namespace_or(namespace: Optional[str]) -> str:
@@ -180,7 +521,7 @@ def snapshot_bitcoin_datadir(
     namespace: Optional[str] = None,
 ) -> None:
     namespace = get_default_namespace_or(namespace)
-    sclient = get_static_client()
+    sclient = get_stream_client()
 
     try:
         sclient.read_namespaced_pod(name=pod_name, namespace=namespace)
@@ -286,40 +627,41 @@ def snapshot_bitcoin_datadir(
         print(f"An error occurred: {str(e)}")
 
 
+def _pod_is_ready(pod: V1Pod) -> bool:
+    if pod.status.phase != "Running":
+        return False
+    conditions = pod.status.conditions or []
+    ready_condition = next((c for c in conditions if c.type == "Ready"), None)
+    return bool(ready_condition and ready_condition.status == "True")
+
+
+def _init_container_running(pod: V1Pod) -> bool:
+    statuses = pod.status.init_container_statuses or []
+    return any(status.state.running for status in statuses)
+
+
 def wait_for_pod_ready(name, namespace, timeout=300):
-    sclient = get_static_client()
-    w = watch.Watch()
-    for event in w.stream(
-        sclient.list_namespaced_pod, namespace=namespace, timeout_seconds=timeout
-    ):
-        pod = event["object"]
-        if pod.metadata.name == name and pod.status.phase == "Running":
-            conditions = pod.status.conditions or []
-            ready_condition = next((c for c in conditions if c.type == "Ready"), None)
-            if ready_condition and ready_condition.status == "True":
-                w.stop()
-                return True
+    if _watch_pod(name, namespace, lambda pod: pod is not None and _pod_is_ready(pod), timeout):
+        return True
     print(f"Timeout waiting for pod {name} to be ready.")
     return False
 
 
+def wait_for_pod_deleted(name, namespace, timeout=120) -> bool:
+    if _watch_pod(name, namespace, lambda pod: pod is None, timeout):
+        return True
+    print(f"Timeout waiting for pod {name} to be deleted.")
+    return False
+
+
 def wait_for_init(pod_name, timeout=300, namespace: Optional[str] = None, quiet: bool = False):
     namespace = get_default_namespace_or(namespace)
-    sclient = get_static_client()
-    w = watch.Watch()
-    for event in w.stream(
-        sclient.list_namespaced_pod, namespace=namespace, timeout_seconds=timeout
+    if _watch_pod(
+        pod_name, namespace, lambda pod: pod is not None and _init_container_running(pod), timeout
     ):
-        pod = event["object"]
-        if pod.metadata.name == pod_name:
-            if not pod.status.init_container_statuses:
-                continue
-            for init_container_status in pod.status.init_container_statuses:
-                if init_container_status.state.running:
-                    if not quiet:
-                        print(f"initContainer in pod {pod_name} ({namespace}) is ready")
-                    w.stop()
-                    return True
+        if not quiet:
+            print(f"initContainer in pod {pod_name} ({namespace}) is ready")
+        return True
     if not quiet:
         print(f"Timeout waiting for initContainer in {pod_name} ({namespace}) to be ready.")
     return False
@@ -335,8 +677,7 @@ def wait_for_ingress_controller(timeout=300):
 
 
 def get_ingress_ip_or_host():
-    config.load_kube_config()
-    networking_v1 = client.NetworkingV1Api()
+    networking_v1 = client.NetworkingV1Api(get_api_client())
     try:
         ingress = networking_v1.read_namespaced_ingress(CADDY_INGRESS_NAME, LOGGING_NAMESPACE)
         if ingress.status.load_balancer.ingress[0].hostname:
@@ -348,12 +689,41 @@ def get_ingress_ip_or_host():
 
 
 def pod_log(
-    pod_name, container_name=None, follow=False, namespace: Optional[str] = None, tail_lines=None
+    pod_name,
+    container_name=None,
+    follow=False,
+    namespace: Optional[str] = None,
+    tail_lines=None,
+    timestamps=False,
+    since_seconds=None,
+    since_time: Optional[str] = None,
 ):
     namespace = get_default_namespace_or(namespace)
     sclient = get_static_client()
 
     try:
+        if since_time:
+            # The generated client has no sinceTime parameter, so call the endpoint directly
+            query_params = [
+                ("follow", follow),
+                ("timestamps", timestamps),
+                ("sinceTime", since_time),
+            ]
+            if container_name:
+                query_params.append(("container", container_name))
+            if tail_lines is not None:
+                query_params.append(("tailLines", tail_lines))
+            return sclient.api_client.call_api(
+                "/api/v1/namespaces/{namespace}/pods/{name}/log",
+                "GET",
+                {"name": pod_name, "namespace": namespace},
+                query_params,
+                {"Accept": "text/plain"},
+                response_type="str",
+                auth_settings=["BearerToken"],
+                _return_http_data_only=True,
+                _preload_content=False,
+            )
         return sclient.read_namespaced_pod_log(
             name=pod_name,
             namespace=namespace,
@@ -361,27 +731,42 @@ def pod_log(
             follow=follow,
             _preload_content=False,
             tail_lines=tail_lines,
+            timestamps=timestamps,
+            since_seconds=since_seconds,
         )
     except ApiException as e:
         raise Exception(json.loads(e.body.decode("utf-8"))["message"]) from None
 
 
+def open_port_forward(pod_name: str, port: int, namespace: Optional[str] = None):
+    """
+    Forward a single port of a pod over the API server.
+
+    Returns a kubernetes PortForward; pf.socket(port) is a connected socket to
+    the pod port and pf.close() tears the stream down.
+    """
+    namespace = get_default_namespace_or(namespace)
+    sclient = get_stream_client()
+    return portforward(
+        sclient.connect_get_namespaced_pod_portforward, pod_name, namespace, ports=str(port)
+    )
+
+
 def wait_for_pod(pod_name, timeout_seconds=10, namespace: Optional[str] = None):
     namespace = get_default_namespace_or(namespace)
-    sclient = get_static_client()
-    while timeout_seconds > 0:
-        pod = sclient.read_namespaced_pod_status(name=pod_name, namespace=namespace)
-        if pod.status.phase != "Pending":
-            return
-        sleep(1)
-        timeout_seconds -= 1
+    _watch_pod(
+        pod_name,
+        namespace,
+        lambda pod: pod is not None and pod.status.phase != "Pending",
+        timeout_seconds,
+    )
 
 
 def write_file_to_container(
     pod_name, container_name, dst_path, data, namespace: Optional[str] = None, quiet: bool = False
 ):
     namespace = get_default_namespace_or(namespace)
-    sclient = get_static_client()
+    sclient = get_stream_client()
     exec_command = ["sh", "-c", f"cat > {dst_path}.tmp && sync"]
     try:
         res = stream(
@@ -502,8 +887,7 @@ def get_service_accounts_in_namespace(namespace):
 def can_delete_pods(namespace: Optional[str] = None) -> bool:
     namespace = get_default_namespace_or(namespace)
 
-    get_static_client()
-    auth_api = client.AuthorizationV1Api()
+    auth_api = client.AuthorizationV1Api(get_api_client())
 
     # Define the SelfSubjectAccessReview request for deleting pods
     access_review = client.V1SelfSubjectAccessReview(
@@ -564,7 +948,7 @@ def download(
 
     namespace = get_default_namespace_or(namespace)
 
-    v1 = get_static_client()
+    v1 = get_stream_client()
 
     target_folder = destination_path / source_path.stem
     os.makedirs(target_folder, exist_ok=True)
@@ -601,6 +985,44 @@ def download(
     return destination_path
 
 
+def exec_output(
+    pod_name: str,
+    command: list[str],
+    container_name: Optional[str] = None,
+    namespace: Optional[str] = None,
+) -> bytes:
+    """Run command in a pod over a single exec stream and return its raw stdout"""
+    namespace = get_default_namespace_or(namespace)
+    v1 = get_stream_client()
+
+    resp = stream(
+        v1.connect_get_namespaced_pod_exec,
+        name=pod_name,
+        namespace=namespace,
+        container=container_name,
+        command=command,
+        stderr=True,
+        stdin=False,
+        stdout=True,
+        tty=False,
+        binary=True,
+        _preload_content=False,
+    )
+
+    stdout = bytearray()
+    stderr = bytearray()
+    while resp.is_open():
+        resp.update(timeout=1)
+        if resp.peek_stdout():
+            stdout += resp.read_stdout()
+        if resp.peek_stderr():
+            stderr += resp.read_stderr()
+    resp.close()
+    if not stdout and stderr:
+        raise K8sError(stderr.decode(errors="replace"))
+    return bytes(stdout)
+
+
 def read_file_from_container(
     pod_name,
     source_path: Path,
@@ -612,7 +1034,7 @@ def read_file_from_container(
 
     namespace = get_default_namespace_or(namespace)
 
-    v1 = get_static_client()
+    v1 = get_stream_client()
 
     command = ["cat", str(source_path)]
 
@@ -0,0 +1,200 @@
+import json
+import os
+import re
+from collections import Counter
+from collections.abc import Iterator
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Optional
+
+from kubernetes.client.models import V1Pod
+
+from .constants import WARNET_STATE_DIR
+from .k8s import pod_log
+
+LOG_CACHE_DIR = WARNET_STATE_DIR / "logs"
+
+DURATION = re.compile(r"^(\d+)([smhd])$")
+DURATION_UNITS = {"s": "seconds", "m": "minutes", "h": "hours", "d": "days"}
+
+
+def parse_log_time(value: str) -> str:
+    """
+    Turn a --since/--until value into an RFC3339 UTC timestamp.
+
+    Accepts a duration before now (30s, 10m, 2h, 1d) or an ISO 8601 time.
+    """
+    match = DURATION.match(value)
+    if match:
+        delta = timedelta(**{DURATION_UNITS[match.group(2)]: int(match.group(1))})
+        moment = datetime.now(timezone.utc) - delta
+    else:
+        try:
+            moment = datetime.fromisoformat(value.replace("Z", "+00:00"))
+        except ValueError:
+            raise ValueError(
+                f"Expected a duration like 10m or an ISO 8601 time, got {value}"
+            ) from None
+        if moment.tzinfo is None:
+            moment = moment.replace(tzinfo=timezone.utc)
+    return moment.astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def log_timestamp_key(log_entry: str) -> str:
+    """Sortable form of the k8s timestamp leading a log line"""
+    # k8s timestamps are RFC3339 with trailing zeros trimmed from the fraction,
+    # pad it so the timestamps compare correctly as strings
+    timestamp = log_entry.split(" ", 1)[0]
+    seconds, dot, fraction = timestamp.rstrip("Z").partition(".")
+    return f"{seconds}.{fraction:0<9}" if dot else f"{seconds}.000000000"
+
+
+def _fetch(pod: V1Pod, container: str, since_time: Optional[str]) -> Iterator[str]:
+    logs = pod_log(
+        pod.metadata.name,
+        container,
+        namespace=pod.metadata.namespace,
+        timestamps=True,
+        since_time=since_time,
+    )
+    try:
+        for line in logs:
+            yield line.decode("utf-8", errors="replace").rstrip("\n")
+    finally:
+        logs.release_conn()
+
+
+def stream_pod_log(
+    pod: V1Pod, container: str, since: Optional[str] = None, until: Optional[str] = None
+) -> Iterator[str]:
+    """Stream a container log with k8s timestamps, bounded by since/until, without caching"""
+    until_key = log_timestamp_key(until) if until else None
+    for line in _fetch(pod, container, since):
+        # The API has no upper bound, stop reading once past it
+        if until_key and log_timestamp_key(line) > until_key:
+            return
+        yield line
+
+
+class PodLogCache:
+    """
+    On-disk copy of one container log, extended incrementally.
+
+    Lines are stored with their k8s timestamp. A metadata file records the pod
+    uid, the time the copy starts from and the last timestamp fetched, so each
+    sync only asks the API for lines since then. Lines from the last second are
+    remembered to drop the overlap of the next fetch.
+    """
+
+    def __init__(self, pod: V1Pod, container: str, cache_dir: Path = LOG_CACHE_DIR):
+        self.pod = pod
+        self.container = container
+        directory = cache_dir / pod.metadata.namespace
+        self.log_path = directory / f"{pod.metadata.name}.{container}.log"
+        self.meta_path = directory / f"{pod.metadata.name}.{container}.json"
+
+    def _read_meta(self) -> Optional[dict]:
+        try:
+            meta = json.loads(self.meta_path.read_text())
+        except (OSError, ValueError):
+            return None
+        if meta.get("uid") != self.pod.metadata.uid or not self.log_path.exists():
+            return None
+        return meta
+
+    def _write_meta(self, meta: dict):
+        tmp_path = self.meta_path.with_suffix(".tmp")
+        tmp_path.write_text(json.dumps(meta))
+        os.replace(tmp_path, self.meta_path)
+
+    def _usable_meta(self, since: Optional[str]) -> Optional[dict]:
+        meta = self._read_meta()
+        # A copy that starts later than asked for is rebuilt from the requested time
+        if meta and meta["start"] and (not since or since < meta["start"]):
+            return None
+        return meta
+
+    def sync(self, since: Optional[str] = None):
+        """Fetch new lines from the API and append them to the cache"""
+        for _ in self._append_new(since):
+            pass
+
+    def _append_new(self, since: Optional[str]) -> Iterator[str]:
+        """Append new lines from the API to the cache, yielding each once it is written"""
+        self.log_path.parent.mkdir(parents=True, exist_ok=True)
+        meta = self._usable_meta(since)
+        if meta is None:
+            meta = {"uid": self.pod.metadata.uid, "start": since, "last": None, "tail": []}
+            mode, since_time = "w", since
+        else:
+            mode, since_time = "a", None
+            if meta["last"]:
+                # sinceTime has second precision, so the lines already stored from
+                # that second are kept in "tail" and skipped when fetched again
+                since_time = meta["last"][:19] + "Z"
+
+        seen = Counter(meta["tail"])
+        try:
+            with open(self.log_path, mode) as f:
+                for line in _fetch(self.pod, self.container, since_time):
+                    if seen[line]:
+                        seen[line] -= 1
+                        continue
+                    f.write(line + "\n")
+                    timestamp = line.split(" ", 1)[0]
+                    if timestamp[:19] != (meta["last"] or "")[:19]:
+                        meta["tail"] = []
+                    meta["last"] = timestamp
+                    meta["tail"].append(line)
+                    yield line
+        finally:
+            # Keep the metadata in step with whatever made it to disk
+            self._write_meta(meta)
+
+    def lines(self, since: Optional[str] = None, until: Optional[str] = None) -> Iterator[str]:
+        """Yield cached lines between since and until"""
+        with open(self.log_path) as f:
+            yield from _between((line.rstrip("\n") for line in f), since, until)
+
+    def stream(self, since: Optional[str] = None, until: Optional[str] = None) -> Iterator[str]:
+        """
+        Yield lines between since and until, the cached ones first and then new
+        ones as they are fetched, stopping the sync once past until
+        """
+        meta = self._usable_meta(since)
+        if meta is not None:
+            yield from self.lines(since, until)
+            # Nothing newer is needed when the copy already goes past until
+            if (
+                until
+                and meta["last"]
+                and log_timestamp_key(meta["last"]) > log_timestamp_key(until)
+            ):
+                return
+        yield from _between(self._append_new(since), since, until)
+
+
+def _between(lines: Iterator[str], since: Optional[str], until: Optional[str]) -> Iterator[str]:
+    since_key = log_timestamp_key(since) if since else None
+    until_key = log_timestamp_key(until) if until else None
+    for line in lines:
+        key = log_timestamp_key(line)
+        if since_key and key < since_key:
+            continue
+        if until_key and key > until_key:
+            return
+        yield line
+
+
+def cached_pod_log(
+    pod: V1Pod,
+    container: str,
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+    use_cache: bool = True,
+) -> Iterator[str]:
+    """Lines of a container log, each led by its k8s timestamp, between since and until"""
+    if not use_cache:
+        yield from stream_pod_log(pod, container, since, until)
+        return
+    yield from PodLogCache(pod, container).stream(since, until)
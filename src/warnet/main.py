@@ -9,6 +9,7 @@ from .graph import create, graph, import_network
 from .image import image
 from .ln import ln
 from .project import init, new, setup
+from .ready import ready
 from .status import status
 from .users import auth
 
@@ -74,6 +75,7 @@ cli.add_command(init)
 cli.add_command(logs)
 cli.add_command(ln)
 cli.add_command(new)
+cli.add_command(ready)
 cli.add_command(run)
 cli.add_command(setup)
 cli.add_command(snapshot)
@@ -0,0 +1,246 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from functools import cache
+from pathlib import Path
+from typing import Optional
+
+import yaml
+from kubernetes.client.rest import ApiException
+
+from .constants import (
+    WARNET_FIELD_MANAGER,
+    WARNET_RELEASE_RECORD,
+    WARNET_STATE_DIR,
+)
+from .k8s import get_dynamic_client, get_static_client
+from .process import run_command
+
+RENDER_CACHE_DIR = WARNET_STATE_DIR / "renders"
+
+# Stand-in release name for charts rendered once and shared by several releases
+RELEASE_PLACEHOLDER = "warnet-release-placeholder"
+# Longer release names may be truncated by the chart, so they are rendered on their own
+MAX_SHARED_RELEASE_NAME = 40
+
+# Objects are applied in this order, like helm does, so pods find their config
+INSTALL_ORDER = [
+    "Namespace",
+    "ServiceAccount",
+    "Secret",
+    "ConfigMap",
+    "PersistentVolumeClaim",
+    "Role",
+    "RoleBinding",
+    "Service",
+    "Pod",
+]
+
+
+@cache
+def chart_digest(chart: str) -> str:
+    """Hash of every file in a chart directory, including its subcharts"""
+    digest = hashlib.sha256()
+    root = Path(chart)
+    for path in sorted(p for p in root.rglob("*") if p.is_file()):
+        digest.update(str(path.relative_to(root)).encode())
+        digest.update(path.read_bytes())
+    return digest.hexdigest()
+
+
+def values_digest(chart: str, values_files: list[Path], values: dict) -> str:
+    """Identify a render: chart contents, values files and inline values"""
+    digest = hashlib.sha256(chart_digest(chart).encode())
+    for values_file in values_files:
+        digest.update(Path(values_file).read_bytes())
+    digest.update(json.dumps(values, sort_keys=True, default=str).encode())
+    return digest.hexdigest()
+
+
+def render_chart(
+    release: str,
+    chart: str,
+    namespace: str,
+    values_files: list[Path],
+    values: dict,
+) -> str:
+    """
+    Render a chart with `helm template`, caching the output in the state dir.
+
+    The cache key covers the chart files, every values file and the inline
+    values, so an edit to any of them renders again.
+    """
+    digest = hashlib.sha256(
+        f"{release}\0{namespace}\0{values_digest(chart, values_files, values)}".encode()
+    ).hexdigest()
+    cache_file = RENDER_CACHE_DIR / f"{digest}.yaml"
+    if cache_file.exists():
+        return cache_file.read_text()
+
+    override_file = None
+    try:
+        cmd = f"helm template {release} {chart} --namespace {namespace}"
+        for values_file in values_files:
+            cmd += f" -f {values_file}"
+        if values:
+            with tempfile.NamedTemporaryFile(mode="w", suffix=".yaml", delete=False) as f:
+                yaml.dump(values, f)
+                override_file = Path(f.name)
+            cmd += f" -f {override_file}"
+        rendered = run_command(cmd)
+    finally:
+        if override_file:
+            override_file.unlink()
+
+    RENDER_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    with tempfile.NamedTemporaryFile("w", dir=RENDER_CACHE_DIR, delete=False) as f:
+        f.write(rendered)
+    os.replace(f.name, cache_file)
+    return rendered
+
+
+def render_releases(
+    releases: dict[str, dict],
+    chart: str,
+    namespace: str,
+    values_files: list[Path],
+) -> dict[str, list[dict]]:
+    """
+    Render many releases of one chart, returning the objects of each release.
+
+    Releases whose values are identical are rendered once under a placeholder
+    name which is then replaced by each release name.
+    """
+    groups: dict[str, list[str]] = {}
+    for release, values in releases.items():
+        if len(release) > MAX_SHARED_RELEASE_NAME:
+            groups[f"release:{release}"] = [release]
+            continue
+        key = json.dumps(values, sort_keys=True, default=str)
+        groups.setdefault(key, []).append(release)
+
+    rendered: dict[str, list[dict]] = {}
+    for members in groups.values():
+        values = releases[members[0]]
+        if len(members) == 1:
+            text = render_chart(members[0], chart, namespace, values_files, values)
+            rendered[members[0]] = parse_manifests(text)
+            continue
+        template = render_chart(RELEASE_PLACEHOLDER, chart, namespace, values_files, values)
+        for release in members:
+            rendered[release] = parse_manifests(template.replace(RELEASE_PLACEHOLDER, release))
+    return rendered
+
+
+def parse_manifests(text: str) -> list[dict]:
+    return [doc for doc in yaml.safe_load_all(text) if doc]
+
+
+def install_order(obj: dict) -> int:
+    kind = obj.get("kind")
+    return INSTALL_ORDER.index(kind) if kind in INSTALL_ORDER else len(INSTALL_ORDER)
+
+
+def object_ref(obj: dict, namespace: Optional[str]) -> dict:
+    return {
+        "apiVersion": obj["apiVersion"],
+        "kind": obj["kind"],
+        "name": obj["metadata"]["name"],
+        "namespace": namespace,
+    }
+
+
+class ManifestApplier:
+    """
+    Server-side apply of rendered objects through the shared dynamic client.
+
+    API resources are discovered once per (apiVersion, kind) under a lock, after
+    which apply() is safe to call from many threads.
+    """
+
+    def __init__(self, field_manager: str = WARNET_FIELD_MANAGER):
+        self.field_manager = field_manager
+        self.client = get_dynamic_client()
+        self._resources: dict[tuple[str, str], object] = {}
+        self._lock = threading.Lock()
+
+    def resource(self, api_version: str, kind: str):
+        with self._lock:
+            key = (api_version, kind)
+            if key not in self._resources:
+                self._resources[key] = self.client.resources.get(api_version=api_version, kind=kind)
+            return self._resources[key]
+
+    def apply(self, objects: list[dict], namespace: str) -> list[dict]:
+        """Apply objects in install order, returning references to what was applied"""
+        refs = []
+        for obj in sorted(objects, key=install_order):
+            resource = self.resource(obj["apiVersion"], obj["kind"])
+            obj_namespace = None
+            if resource.namespaced:
+                obj_namespace = obj["metadata"].get("namespace") or namespace
+                obj["metadata"]["namespace"] = obj_namespace
+            self.client.server_side_apply(
+                resource,
+                body=obj,
+                namespace=obj_namespace,
+                field_manager=self.field_manager,
+                force_conflicts=True,
+            )
+            refs.append(object_ref(obj, obj_namespace))
+        return refs
+
+    def delete(self, ref: dict):
+        resource = self.resource(ref["apiVersion"], ref["kind"])
+        kwargs = {}
+        if ref["kind"] == "Pod":
+            kwargs["grace_period_seconds"] = 0
+        try:
+            self.client.delete(resource, name=ref["name"], namespace=ref["namespace"], **kwargs)
+        except ApiException as e:
+            if e.status != 404:
+                raise e
+
+
+def get_release_records(namespace: str) -> dict[str, list[dict]]:
+    """Objects applied per release in a namespace, as recorded by record_releases()"""
+    sclient = get_static_client()
+    try:
+        record = sclient.read_namespaced_config_map(WARNET_RELEASE_RECORD, namespace)
+    except ApiException as e:
+        if e.status == 404:
+            return {}
+        raise e
+    return {release: json.loads(refs) for release, refs in (record.data or {}).items()}
+
+
+def record_releases(namespace: str, releases: dict[str, list[dict]], removed: tuple[str, ...] = ()):
+    """Update the namespace's release record, a ConfigMap used for teardown"""
+    records = get_release_records(namespace)
+    records.update(releases)
+    for release in removed:
+        records.pop(release, None)
+    body = {
+        "apiVersion": "v1",
+        "kind": "ConfigMap",
+        "metadata": {
+            "name": WARNET_RELEASE_RECORD,
+            "namespace": namespace,
+            "labels": {"app.kubernetes.io/managed-by": WARNET_FIELD_MANAGER},
+        },
+        "data": {release: json.dumps(refs) for release, refs in records.items()},
+    }
+    ManifestApplier().apply([body], namespace)
+
+
+def delete_release_record(namespace: str):
+    ManifestApplier().delete(
+        {
+            "apiVersion": "v1",
+            "kind": "ConfigMap",
+            "name": WARNET_RELEASE_RECORD,
+            "namespace": namespace,
+        }
+    )
@@ -1,7 +1,9 @@
 import json
 import shutil
 from pathlib import Path
+from typing import Optional
 
+from kubernetes.client.models import V1Pod
 from rich import print
 
 from .bitcoin import _rpc
@@ -64,8 +66,9 @@ def is_connection_manual(peer):
     return bool(peer.get("connection_type") == "manual" or peer.get("addnode") is True)
 
 
-def _connected(end="\n"):
-    tanks = get_mission("tank")
+def _connected(end="\n", tanks: Optional[list[V1Pod]] = None):
+    if tanks is None:
+        tanks = get_mission("tank")
     for tank in tanks:
         # Get actual
         try:
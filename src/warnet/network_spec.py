@@ -0,0 +1,161 @@
+import re
+from dataclasses import dataclass, field
+from pathlib import Path
+
+import yaml
+
+from .constants import DEFAULTS_FILE, NETWORK_FILE, HookValue
+
+# Node names become helm release, pod and service names
+NODE_NAME = re.compile(r"^[a-z0-9]([-a-z0-9]*[a-z0-9])?$")
+MAX_NODE_NAME = 53
+SUPPORTED_LN_PROJECTS = ("lnd", "cln")
+
+
+class NetworkSpecError(Exception):
+    """A network definition that can not be deployed, listing every problem found"""
+
+    def __init__(self, path: Path, problems: list[str]):
+        self.path = path
+        self.problems = problems
+        super().__init__(f"Invalid network definition in {path}:\n  " + "\n  ".join(problems))
+
+
+@dataclass
+class Plugin:
+    name: str
+    # Plugin directory, resolved against the network directory
+    entrypoint: Path
+    # The plugin's section of network.yaml, passed on to the plugin as-is
+    content: dict
+
+    __slots__ = ["name", "entrypoint", "content"]
+
+
+@dataclass
+class NetworkSpec:
+    """
+    A network.yaml and node-defaults.yaml pair, parsed and validated once.
+
+    Deploy stages share this instead of reading the files again, and it is
+    plain data so sending it to a worker process is cheap.
+    """
+
+    directory: Path
+    nodes: list[dict]
+    defaults: dict
+    plugins: dict[str, list[Plugin]] = field(default_factory=dict)
+    caddy: dict = field(default_factory=dict)
+    fork_observer: dict = field(default_factory=dict)
+    services: list = field(default_factory=list)
+
+    @property
+    def defaults_file(self) -> Path:
+        return self.directory / DEFAULTS_FILE
+
+    def hook_plugins(self, hook_value: HookValue) -> list[Plugin]:
+        return self.plugins.get(hook_value.value, [])
+
+    @property
+    def logging_required(self) -> bool:
+        """Whether the defaults or any node collect logs or export metrics"""
+        for values in [self.defaults, *self.nodes]:
+            if values.get("collectLogs") or values.get("metricsExport"):
+                return True
+            if (values.get("lnd") or {}).get("metricsExport"):
+                return True
+        return False
+
+    @property
+    def needs_ln_init(self) -> bool:
+        """Whether the network has lightning nodes to fund and open channels for"""
+        ln_defaults = self.defaults.get("ln") or {}
+        if any(ln_defaults.get(key) for key in SUPPORTED_LN_PROJECTS):
+            return True
+        for node in self.nodes:
+            ln_config = node.get("ln") or {}
+            for key in SUPPORTED_LN_PROJECTS:
+                if ln_config.get(key) and "channels" in (node.get(key) or {}):
+                    return True
+        return False
+
+    @classmethod
+    def load(cls, directory: Path) -> "NetworkSpec":
+        """Parse and validate the network in directory, raising NetworkSpecError"""
+        directory = Path(directory)
+        network_file = _load_mapping(directory / NETWORK_FILE)
+        defaults = _load_mapping(directory / DEFAULTS_FILE)
+
+        problems = []
+        nodes = network_file.get("nodes") or []
+        if not isinstance(nodes, list):
+            problems.append("'nodes' must be a list")
+            nodes = []
+        names = set()
+        for i, node in enumerate(nodes):
+            if not isinstance(node, dict):
+                problems.append(f"node {i} must be a mapping")
+                continue
+            name = node.get("name")
+            if not isinstance(name, str) or not NODE_NAME.match(name):
+                problems.append(f"node {i} name {name!r} must be lowercase letters, digits and '-'")
+            elif len(name) > MAX_NODE_NAME:
+                problems.append(f"node {i} name {name!r} is longer than {MAX_NODE_NAME}")
+            elif name in names:
+                problems.append(f"node name {name!r} is used more than once")
+            names.add(name)
+
+        plugins = {}
+        plugins_section = network_file.get("plugins") or {}
+        if not isinstance(plugins_section, dict):
+            problems.append("'plugins' must be a mapping of hooks")
+            plugins_section = {}
+        hooks = {hook.value for hook in HookValue}
+        for hook, hook_section in plugins_section.items():
+            if hook not in hooks:
+                problems.append(f"unknown plugin hook {hook!r}, expected one of {sorted(hooks)}")
+                continue
+            if not isinstance(hook_section, dict):
+                problems.append(f"plugins for {hook} must be a mapping of plugin names")
+                continue
+            plugins[hook] = []
+            for plugin_name, content in hook_section.items():
+                if not isinstance(content, dict) or not content.get("entrypoint"):
+                    problems.append(f"{hook} plugin {plugin_name!r} must have an 'entrypoint'")
+                    continue
+                plugins[hook].append(
+                    Plugin(str(plugin_name), directory / content["entrypoint"], content)
+                )
+
+        sections = {}
+        for key in ("caddy", "fork_observer"):
+            sections[key] = network_file.get(key) or {}
+            if not isinstance(sections[key], dict):
+                problems.append(f"'{key}' must be a mapping")
+                sections[key] = {}
+        services = network_file.get("services") or []
+        if not isinstance(services, list):
+            problems.append("'services' must be a list")
+            services = []
+
+        if problems:
+            raise NetworkSpecError(directory / NETWORK_FILE, problems)
+        return cls(
+            directory=directory,
+            nodes=nodes,
+            defaults=defaults,
+            plugins=plugins,
+            services=services,
+            **sections,
+        )
+
+
+def _load_mapping(path: Path) -> dict:
+    try:
+        with path.open() as f:
+            data = yaml.safe_load(f) or {}
+    except (OSError, yaml.YAMLError) as e:
+        raise NetworkSpecError(path, [str(e)]) from e
+    if not isinstance(data, dict):
+        raise NetworkSpecError(path, ["the file must contain a mapping"])
+    return data
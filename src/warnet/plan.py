@@ -0,0 +1,251 @@
+import re
+from collections import Counter
+from dataclasses import dataclass, field
+from decimal import Decimal
+from typing import Optional
+
+import click
+from kubernetes.utils.quantity import parse_quantity
+from rich.console import Console
+from rich.table import Table
+
+from .constants import BITCOIN_CHART_LOCATION
+from .manifests import render_releases
+from .network_spec import NetworkSpec
+
+# Default pod limit of a kubelet
+DEFAULT_MAX_PODS = 110
+NODE_POOL_FORMAT = re.compile(r"^(\d+)x([^/]+)/([^/]+)(?:/(\d+))?$")
+
+
+@dataclass
+class PodRequest:
+    """CPU (cores) and memory (bytes) the scheduler reserves for one pod"""
+
+    name: str
+    role: str
+    cpu: Decimal
+    memory: Decimal
+
+    @property
+    def has_requests(self) -> bool:
+        return bool(self.cpu or self.memory)
+
+
+@dataclass
+class NodePool:
+    """Shape of a pool of identical kubernetes nodes: how many and what each can hold"""
+
+    count: int
+    cpu: Decimal
+    memory: Decimal
+    max_pods: int = DEFAULT_MAX_PODS
+
+    @classmethod
+    def parse(cls, value: str) -> "NodePool":
+        """Parse COUNTxCPU/MEMORY[/MAX_PODS], e.g. 10x4/16Gi or 3x8/32Gi/250"""
+        match = NODE_POOL_FORMAT.match(value.strip())
+        if not match:
+            raise ValueError(f"'{value}' is not COUNTxCPU/MEMORY[/MAX_PODS], e.g. 10x4/16Gi")
+        count, cpu, memory, max_pods = match.groups()
+        pool = cls(
+            count=int(count),
+            cpu=parse_quantity(cpu),
+            memory=parse_quantity(memory),
+            max_pods=int(max_pods) if max_pods else DEFAULT_MAX_PODS,
+        )
+        if not (pool.count and pool.cpu > 0 and pool.memory > 0 and pool.max_pods):
+            raise ValueError(f"'{value}' describes a pool with no room for pods")
+        return pool
+
+
+@dataclass
+class _Bin:
+    cpu: Decimal
+    memory: Decimal
+    pods: int = 0
+
+    def fits(self, pod: PodRequest, pool: NodePool) -> bool:
+        return (
+            self.pods < pool.max_pods
+            and self.cpu + pod.cpu <= pool.cpu
+            and self.memory + pod.memory <= pool.memory
+        )
+
+    def add(self, pod: PodRequest):
+        self.cpu += pod.cpu
+        self.memory += pod.memory
+        self.pods += 1
+
+
+@dataclass
+class Placement:
+    """Outcome of packing pods onto a node pool"""
+
+    nodes_used: int
+    unplaced: list[PodRequest]
+
+    @property
+    def fits(self) -> bool:
+        return not self.unplaced
+
+
+def pack(pods: list[PodRequest], pool: NodePool, limit: Optional[int] = None) -> Placement:
+    """
+    Place pods onto nodes of the pool's shape, first fit by decreasing size.
+
+    This approximates the scheduler without taints, affinity or daemonsets, so a
+    plan that only just fits may still leave pods pending. Without a limit as
+    many nodes are opened as needed.
+    """
+    bins: list[_Bin] = []
+    unplaced = []
+    for pod in sorted(
+        pods, key=lambda pod: (pod.cpu / pool.cpu, pod.memory / pool.memory), reverse=True
+    ):
+        target = next((b for b in bins if b.fits(pod, pool)), None)
+        if target is None:
+            empty = _Bin(Decimal(0), Decimal(0))
+            if (limit is not None and len(bins) >= limit) or not empty.fits(pod, pool):
+                unplaced.append(pod)
+                continue
+            bins.append(empty)
+            target = empty
+        target.add(pod)
+    return Placement(nodes_used=len(bins), unplaced=unplaced)
+
+
+def _container_requests(container: dict) -> tuple[Decimal, Decimal]:
+    requests = (container.get("resources") or {}).get("requests") or {}
+    return (
+        parse_quantity(requests.get("cpu", 0)),
+        parse_quantity(requests.get("memory", 0)),
+    )
+
+
+@dataclass
+class NetworkPlan:
+    """Totals of the objects a network renders to, without touching a cluster"""
+
+    kinds: Counter = field(default_factory=Counter)
+    pods: list[PodRequest] = field(default_factory=list)
+    containers: int = 0
+    # (role, image) -> [containers, cpu, memory]
+    images: dict[tuple[str, str], list] = field(default_factory=dict)
+
+    @property
+    def cpu(self) -> Decimal:
+        return sum((pod.cpu for pod in self.pods), Decimal(0))
+
+    @property
+    def memory(self) -> Decimal:
+        return sum((pod.memory for pod in self.pods), Decimal(0))
+
+    def add(self, objects: list[dict]):
+        for obj in objects:
+            self.kinds[obj["kind"]] += 1
+            if obj["kind"] == "Pod":
+                self._add_pod(obj)
+
+    def _add_pod(self, pod: dict):
+        mission = (pod["metadata"].get("labels") or {}).get("mission", "other")
+        spec = pod.get("spec") or {}
+        cpu = memory = Decimal(0)
+        for container in spec.get("containers", []):
+            container_cpu, container_memory = _container_requests(container)
+            cpu += container_cpu
+            memory += container_memory
+            self._add_image(f"{mission}/{container['name']}", container, 1)
+        # Init containers run before the others, so a pod needs the larger of the two
+        for container in spec.get("initContainers", []):
+            init_cpu, init_memory = _container_requests(container)
+            cpu, memory = max(cpu, init_cpu), max(memory, init_memory)
+            self._add_image(f"{mission}/{container['name']} (init)", container, 0)
+        self.containers += len(spec.get("containers", [])) + len(spec.get("initContainers", []))
+        self.pods.append(PodRequest(pod["metadata"]["name"], mission, cpu, memory))
+
+    def _add_image(self, role: str, container: dict, running: int):
+        entry = self.images.setdefault((role, container["image"]), [0, Decimal(0), Decimal(0)])
+        cpu, memory = _container_requests(container)
+        entry[0] += 1
+        entry[1] += cpu * running
+        entry[2] += memory * running
+
+
+def plan_network(spec: NetworkSpec, namespace: str) -> NetworkPlan:
+    """Render every node of the network offline with `helm template` and total it up"""
+    releases = {node["name"]: {k: v for k, v in node.items() if k != "name"} for node in spec.nodes}
+    rendered = render_releases(releases, BITCOIN_CHART_LOCATION, namespace, [spec.defaults_file])
+    plan = NetworkPlan()
+    for objects in rendered.values():
+        plan.add(objects)
+    return plan
+
+
+def format_cpu(cores: Decimal) -> str:
+    return f"{cores:.2f}"
+
+
+def format_memory(size: Decimal) -> str:
+    return f"{size / 2**30:.2f}Gi"
+
+
+def print_plan(plan: NetworkPlan, pool: Optional[NodePool] = None) -> bool:
+    """Print what a network will create, returning False if it does not fit the pool"""
+    console = Console()
+
+    totals = Table(title="Deploy plan", header_style="bold magenta")
+    totals.add_column("Resource", style="cyan")
+    totals.add_column("Total", justify="right")
+    totals.add_row("Pods", str(len(plan.pods)))
+    totals.add_row("Containers", str(plan.containers))
+    for kind, count in sorted(plan.kinds.items()):
+        if kind != "Pod":
+            totals.add_row(f"{kind}s", str(count))
+    totals.add_row("CPU requests (cores)", format_cpu(plan.cpu))
+    totals.add_row("Memory requests", format_memory(plan.memory))
+    totals.add_row("Images to pull", str(len({image for _, image in plan.images})))
+    console.print(totals)
+
+    images = Table(title="By image and role", header_style="bold magenta")
+    images.add_column("Role", style="cyan")
+    images.add_column("Image", style="green")
+    images.add_column("Containers", justify="right")
+    images.add_column("CPU", justify="right")
+    images.add_column("Memory", justify="right")
+    for (role, image), (count, cpu, memory) in sorted(plan.images.items()):
+        images.add_row(role, image, str(count), format_cpu(cpu), format_memory(memory))
+    console.print(images)
+
+    unrequested = sum(1 for pod in plan.pods if not pod.has_requests)
+    if unrequested:
+        console.print(
+            f"[yellow]{unrequested} pods request no CPU or memory, "
+            "so only the pod limit of a node constrains them[/yellow]"
+        )
+
+    if pool is None:
+        return True
+    placement = pack(plan.pods, pool, pool.count)
+    needed = pack(plan.pods, pool).nodes_used
+    shape = f"{pool.count} nodes of {format_cpu(pool.cpu)} cores, {format_memory(pool.memory)} and {pool.max_pods} pods"
+    if placement.fits:
+        console.print(f"[bold green]Fits on {placement.nodes_used} of {shape}[/bold green]")
+        return True
+    console.print(
+        f"[red]{len(placement.unplaced)} of {len(plan.pods)} pods do not fit on {shape}; "
+        f"about {needed} such nodes are needed[/red]"
+    )
+    for pod in placement.unplaced:
+        if not _Bin(Decimal(0), Decimal(0)).fits(pod, pool):
+            console.print(f"[red]{pod.name} requests more than one node has[/red]")
+    return False
+
+
+def validate_node_pool(ctx, param, value) -> Optional[NodePool]:
+    if value is None:
+        return None
+    try:
+        return NodePool.parse(value)
+    except ValueError as e:
+        raise click.BadParameter(str(e)) from e
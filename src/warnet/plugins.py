@@ -0,0 +1,207 @@
+import atexit
+import importlib.util
+import itertools
+import json
+import multiprocessing
+import os
+import sys
+import threading
+from multiprocessing.connection import Connection
+from pathlib import Path
+from typing import Optional
+
+import click
+
+from .network_spec import Plugin
+from .process import run_command
+
+PLUGIN_FILE = "plugin.py"
+
+
+class PluginHookError(Exception):
+    pass
+
+
+def load_plugin_group(plugin_file: Path) -> Optional[click.Group]:
+    """
+    Import a plugin module and return its click group, if it has one with an
+    `entrypoint` command. Plugins that only act when run as a script have none.
+    """
+    plugin_dir = str(plugin_file.parent)
+    if plugin_dir not in sys.path:
+        sys.path.insert(0, plugin_dir)
+    module_name = f"warnet_plugin_{plugin_file.parent.name}"
+    module_spec = importlib.util.spec_from_file_location(module_name, plugin_file)
+    module = importlib.util.module_from_spec(module_spec)
+    sys.modules[module_name] = module
+    module_spec.loader.exec_module(module)
+    for value in vars(module).values():
+        if isinstance(value, click.Group) and "entrypoint" in value.commands:
+            return value
+    return None
+
+
+def _dispatch(group: click.Group, request_id: int, args: list[str], conn: Connection, lock):
+    error = None
+    try:
+        group.main(args, prog_name=group.name, standalone_mode=False)
+    except SystemExit as e:
+        if e.code:
+            error = f"exited with {e.code}"
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"
+    with lock:
+        conn.send((request_id, error))
+
+
+def _serve(plugin_file: Path, conn: Connection):
+    """Worker process: import the plugin once, then run each hook event sent to it"""
+    try:
+        group = load_plugin_group(plugin_file)
+    except Exception as e:
+        conn.send(("failed", f"{type(e).__name__}: {e}"))
+        return
+    conn.send(("ready" if group else "script", None))
+    if group is None:
+        return
+
+    lock = threading.Lock()
+    threads = []
+    while True:
+        try:
+            message = conn.recv()
+        except EOFError:
+            break
+        if message is None:
+            break
+        # Hooks of different nodes arrive concurrently, run them side by side
+        thread = threading.Thread(target=_dispatch, args=(group, *message, conn, lock))
+        thread.start()
+        threads.append(thread)
+    for thread in threads:
+        thread.join()
+
+
+class _PluginWorker:
+    """Host side of a long-lived plugin process, matching replies to pending calls"""
+
+    def __init__(self, plugin_file: Path):
+        self.conn, child_conn = multiprocessing.Pipe()
+        self.process = multiprocessing.Process(
+            target=_serve, args=(plugin_file, child_conn), name=f"plugin-{plugin_file.parent.name}"
+        )
+        self.process.start()
+        child_conn.close()
+        self.state, self.error = self.conn.recv()
+        self._ids = itertools.count()
+        self._lock = threading.Lock()
+        self._pending: dict[int, tuple[threading.Event, list]] = {}
+        if self.resident:
+            threading.Thread(target=self._read, daemon=True).start()
+
+    @property
+    def resident(self) -> bool:
+        return self.state == "ready"
+
+    def _read(self):
+        while True:
+            try:
+                request_id, error = self.conn.recv()
+            except (EOFError, OSError):
+                break
+            with self._lock:
+                event, result = self._pending.pop(request_id)
+            result.append(error)
+            event.set()
+        # The worker is gone, fail whatever is still waiting on it
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        for event, result in pending.values():
+            result.append("plugin process exited")
+            event.set()
+
+    def call(self, args: list[str]):
+        event, result = threading.Event(), []
+        with self._lock:
+            request_id = next(self._ids)
+            self._pending[request_id] = (event, result)
+            self.conn.send((request_id, args))
+        event.wait()
+        if result[0]:
+            raise PluginHookError(result[0])
+
+    def close(self):
+        if self.process.is_alive():
+            with self._lock:
+                self.conn.send(None)
+            self.process.join()
+        self.conn.close()
+
+
+class PluginHost:
+    """
+    Keeps each plugin imported in its own long-lived process for the whole deploy.
+
+    Hook events are sent to the resident plugin over a pipe and run through its
+    click `entrypoint` command with the same JSON arguments a fresh interpreter
+    would get. Plugins without such a command run as a script per event.
+    """
+
+    def __init__(self):
+        self._workers: dict[Path, _PluginWorker] = {}
+        self._lock = threading.Lock()
+
+    def preload(self, plugins: list[Plugin]):
+        """Start the workers up front, before the deploy starts threads of its own"""
+        for plugin in plugins:
+            self._worker(plugin)
+
+    def _worker(self, plugin: Plugin) -> _PluginWorker:
+        plugin_file = (plugin.entrypoint / PLUGIN_FILE).resolve()
+        with self._lock:
+            if plugin_file not in self._workers:
+                self._workers[plugin_file] = _PluginWorker(plugin_file)
+            return self._workers[plugin_file]
+
+    def run(self, plugin: Plugin, warnet_content: dict):
+        """Run one hook event of a plugin, raising if it fails"""
+        args = ["entrypoint", json.dumps(plugin.content), json.dumps(warnet_content)]
+        worker = self._worker(plugin)
+        if worker.state == "failed":
+            raise PluginHookError(f"Could not load plugin {plugin.name}: {worker.error}")
+        if worker.resident:
+            worker.call(args)
+        else:
+            run_command(
+                f"{sys.executable} {plugin.entrypoint / PLUGIN_FILE} {args[0]} "
+                f"'{args[1]}' '{args[2]}'"
+            )
+
+    def close(self):
+        with self._lock:
+            workers, self._workers = self._workers, {}
+        for worker in workers.values():
+            worker.close()
+
+
+_host_lock = threading.Lock()
+_hosts: dict[int, PluginHost] = {}
+
+
+def get_plugin_host() -> PluginHost:
+    """The plugin host of this process; a forked child gets its own"""
+    with _host_lock:
+        pid = os.getpid()
+        if pid not in _hosts:
+            _hosts[pid] = PluginHost()
+        return _hosts[pid]
+
+
+def close_plugin_host():
+    with _host_lock:
+        host = _hosts.pop(os.getpid(), None)
+    if host:
+        host.close()
+
+
+atexit.register(close_plugin_host)
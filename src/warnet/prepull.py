@@ -0,0 +1,141 @@
+import re
+import time
+from typing import Optional
+
+import click
+from kubernetes import client
+from kubernetes.client.rest import ApiException
+
+from .constants import (
+    COMMANDER_IMAGES,
+    PREPULL_DAEMONSET,
+    PREPULL_NOOP_IMAGE,
+    PREPULL_PAUSE_IMAGE,
+)
+from .k8s import get_api_client
+from .manifests import ManifestApplier
+from .network_spec import NetworkSpec
+from .plan import plan_network
+from .tracing import traced
+
+PREPULL_POLL_INTERVAL = 2.0
+# Where the no-op binary is shared with the init containers of the pre-pull pod
+PREPULL_NOOP_DIR = "/warnet-prepull"
+
+
+def network_images(spec: NetworkSpec, namespace: str) -> list[str]:
+    """Every distinct image the network's pods and its scenarios will run"""
+    plan = plan_network(spec, namespace)
+    return sorted({image for _, image in plan.images} | set(COMMANDER_IMAGES))
+
+
+def prepull_manifest(images: list[str], namespace: str) -> dict:
+    """
+    A DaemonSet with one init container per image, so each node pulls every image.
+
+    The first init container copies a static busybox into a shared volume, where the
+    others run it as `true`, so images need no shell or tools of their own. Once
+    they all exited, a pause container keeps the pod Ready which tells that the
+    node has all images.
+    """
+    labels = {"app.kubernetes.io/name": PREPULL_DAEMONSET}
+    mount = {"name": "noop", "mountPath": PREPULL_NOOP_DIR}
+    resources = {"requests": {"cpu": "1m", "memory": "4Mi"}}
+    init_containers = [
+        {
+            "name": "noop",
+            "image": PREPULL_NOOP_IMAGE,
+            "imagePullPolicy": "IfNotPresent",
+            # Busybox runs the applet named by the file it is started as
+            "command": ["cp", "/bin/busybox", f"{PREPULL_NOOP_DIR}/true"],
+            "volumeMounts": [mount],
+            "resources": resources,
+        }
+    ]
+    init_containers += [
+        {
+            # Names must be DNS labels and unique within the pod
+            "name": f"pull-{i}-{re.sub(r'[^a-z0-9-]', '-', image.lower())}"[:63].rstrip("-"),
+            "image": image,
+            "imagePullPolicy": "IfNotPresent",
+            "command": [f"{PREPULL_NOOP_DIR}/true"],
+            "volumeMounts": [mount],
+            "resources": resources,
+        }
+        for i, image in enumerate(images)
+    ]
+    return {
+        "apiVersion": "apps/v1",
+        "kind": "DaemonSet",
+        "metadata": {"name": PREPULL_DAEMONSET, "namespace": namespace, "labels": labels},
+        "spec": {
+            "selector": {"matchLabels": labels},
+            "template": {
+                "metadata": {"labels": labels},
+                "spec": {
+                    "initContainers": init_containers,
+                    "containers": [
+                        {
+                            "name": "pause",
+                            "image": PREPULL_PAUSE_IMAGE,
+                            "resources": resources,
+                        }
+                    ],
+                    "volumes": [{"name": "noop", "emptyDir": {}}],
+                    "terminationGracePeriodSeconds": 0,
+                },
+            },
+        },
+    }
+
+
+def _rollout_done(daemonset) -> Optional[tuple[int, int]]:
+    """Ready and desired pod counts once the DaemonSet status is current"""
+    status = daemonset.status
+    if (status.observed_generation or 0) < daemonset.metadata.generation:
+        return None
+    return status.number_ready or 0, status.desired_number_scheduled or 0
+
+
+@traced("prepull")
+def prepull_images(spec: NetworkSpec, namespace: str, timeout: float = 600) -> bool:
+    """
+    Cache the network's images on every schedulable node before deploying it,
+    so tanks start without each pulling the same images at once.
+
+    Returns whether every node had every image before the timeout. The
+    DaemonSet is removed either way.
+    """
+    images = network_images(spec, namespace)
+    click.echo(f"Pre-pulling {len(images)} images on every node: {', '.join(images)}")
+
+    applier = ManifestApplier()
+    manifest = prepull_manifest(images, namespace)
+    ref = applier.apply([manifest], namespace)[0]
+    apps = client.AppsV1Api(get_api_client())
+    deadline = time.monotonic() + timeout
+    try:
+        while True:
+            counts = _rollout_done(apps.read_namespaced_daemon_set(PREPULL_DAEMONSET, namespace))
+            if counts and not counts[1]:
+                click.secho(
+                    "No node can run the pre-pull pods, images are pulled on demand", fg="yellow"
+                )
+                return False
+            if counts and counts[0] >= counts[1]:
+                click.echo(f"Images are cached on all {counts[1]} nodes")
+                return True
+            if time.monotonic() > deadline:
+                ready, desired = counts or (0, "?")
+                click.secho(
+                    f"Only {ready} of {desired} nodes pulled all images in time, "
+                    "the remaining images are pulled on demand",
+                    fg="yellow",
+                )
+                return False
+            time.sleep(PREPULL_POLL_INTERVAL)
+    except ApiException as e:
+        click.secho(f"Could not pre-pull images: {e.reason}", fg="yellow")
+        return False
+    finally:
+        applier.delete(ref)
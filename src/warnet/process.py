@@ -1,8 +1,11 @@
 import subprocess
+from typing import Optional
 
 
-def run_command(command: str) -> str:
-    result = subprocess.run(command, shell=True, capture_output=True, text=True, executable="bash")
+def run_command(command: str, timeout: Optional[float] = None) -> str:
+    result = subprocess.run(
+        command, shell=True, capture_output=True, text=True, executable="bash", timeout=timeout
+    )
     if result.returncode != 0:
         raise Exception(result.stderr)
     return result.stdout
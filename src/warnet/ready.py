@@ -0,0 +1,188 @@
+import json
+import math
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Optional
+
+import click
+from kubernetes.client.models import V1Pod
+from rich.console import Console
+from rich.table import Table
+
+from .constants import LIGHTNING_MISSION, TANK_MISSION
+from .k8s import (
+    _pod_is_ready,
+    exec_output,
+    get_default_namespace,
+    get_pod_informer,
+    set_connection_pool_size,
+)
+from .network import is_connection_manual
+from .rpc import rpc_call
+
+PHASES = ["pod-ready", "rpc", "peers"]
+READY_PROBE_INTERVAL = 1.0
+READY_PROBE_TIMEOUT = 5.0
+
+
+class _Node:
+    """Readiness of one tank or lightning pod, as seconds after the pod was created"""
+
+    def __init__(self, pod: V1Pod):
+        self.name = pod.metadata.name
+        self.namespace = pod.metadata.namespace
+        self.mission = pod.metadata.labels.get("mission")
+        self.created = pod.metadata.creation_timestamp
+        self.pod = pod
+        self.times: dict[str, float] = {}
+
+    @property
+    def phases(self) -> list[str]:
+        # Lightning nodes have no init_peers to wait for
+        return PHASES if self.mission == TANK_MISSION else PHASES[:2]
+
+    @property
+    def next_phase(self) -> Optional[str]:
+        return next((phase for phase in self.phases if phase not in self.times), None)
+
+    def reached(self, phase: str, moment: Optional[datetime] = None):
+        moment = moment or datetime.now(timezone.utc)
+        self.times[phase] = max((moment - self.created).total_seconds(), 0.0)
+
+
+def _ready_since(pod: V1Pod) -> Optional[datetime]:
+    if not _pod_is_ready(pod):
+        return None
+    ready = next(c for c in pod.status.conditions if c.type == "Ready")
+    return ready.last_transition_time
+
+
+def _probe_rpc(node: _Node) -> bool:
+    if node.mission == TANK_MISSION:
+        rpc_call(node.name, "getblockcount", namespace=node.namespace, timeout=READY_PROBE_TIMEOUT)
+        return True
+    chain = node.pod.metadata.labels["chain"]
+    if "cln" in node.pod.metadata.labels["app.kubernetes.io/name"]:
+        command, container = ["lightning-cli", f"--network={chain}", "getinfo"], "cln"
+    else:
+        command, container = ["lncli", "--network", chain, "getinfo"], "lnd"
+    json.loads(exec_output(node.name, command, container, node.namespace))
+    return True
+
+
+def _probe_peers(node: _Node) -> bool:
+    peers = rpc_call(
+        node.name, "getpeerinfo", namespace=node.namespace, timeout=READY_PROBE_TIMEOUT
+    )
+    expected = int(node.pod.metadata.annotations.get("init_peers", 0))
+    # bitcoind only makes 8 manual outbound connections however many are configured
+    return sum(1 for peer in peers if is_connection_manual(peer)) >= min(8, expected)
+
+
+def _probe(node: _Node):
+    phase = node.next_phase
+    probe = _probe_rpc if phase == "rpc" else _probe_peers
+    try:
+        if probe(node):
+            node.reached(phase)
+    except Exception:
+        # Not there yet, probed again next round
+        pass
+
+
+def wait_until_ready(
+    namespace: Optional[str] = None, timeout: float = 600, concurrency: int = 32
+) -> list[_Node]:
+    """
+    Wait until every tank and lightning node is pod-ready, answers RPC and, for
+    tanks, has connected to the peers it was configured with.
+
+    Pod readiness comes from one pod watch; RPC and peer checks run as concurrent
+    probe rounds over the nodes still waiting. Returns the nodes with the time
+    each reached every phase, measured from the pod's creation.
+    """
+    label_selector = f"mission in ({TANK_MISSION},{LIGHTNING_MISSION})"
+    informer = get_pod_informer(namespace, label_selector)
+    if informer is None:
+        informer = get_pod_informer(get_default_namespace(), label_selector)
+    informer.wait_synced()
+    if informer.error:
+        raise informer.error
+
+    set_connection_pool_size(max(concurrency, 1))
+    deadline = time.monotonic() + timeout
+    tracked: dict[str, _Node] = {}
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        while True:
+            # Nodes added or replaced since the last round are picked up, deleted ones dropped
+            pods = informer.pods(
+                lambda pod: namespace is None or pod.metadata.namespace == namespace
+            )
+            tracked = {
+                pod.metadata.uid: tracked.get(pod.metadata.uid) or _Node(pod) for pod in pods
+            }
+            nodes = list(tracked.values())
+            for node, pod in zip(nodes, pods):
+                if "pod-ready" in node.times:
+                    continue
+                since = _ready_since(pod)
+                if since:
+                    node.pod = pod
+                    node.reached("pod-ready", since)
+
+            waiting = [node for node in nodes if node.next_phase not in (None, "pod-ready")]
+            list(executor.map(_probe, waiting))
+
+            if all(node.next_phase is None for node in nodes) or time.monotonic() > deadline:
+                return nodes
+            time.sleep(READY_PROBE_INTERVAL)
+
+
+def percentile(values: list[float], p: float) -> float:
+    """Nearest-rank percentile of values"""
+    ordered = sorted(values)
+    return ordered[max(math.ceil(p / 100 * len(ordered)) - 1, 0)]
+
+
+@click.command()
+@click.option("--namespace", type=str, help="Only wait for nodes in this namespace")
+@click.option(
+    "--timeout", type=float, default=600, show_default=True, help="Seconds to wait in total"
+)
+@click.option(
+    "--concurrency",
+    type=click.IntRange(min=1),
+    default=32,
+    show_default=True,
+    help="Maximum number of RPC probes in flight",
+)
+def ready(namespace: Optional[str], timeout: float, concurrency: int):
+    """Wait until all tanks and lightning nodes are ready, and report startup times"""
+    nodes = wait_until_ready(namespace, timeout, concurrency)
+    console = Console()
+
+    table = Table(title="Time to ready (seconds after pod creation)", header_style="bold magenta")
+    table.add_column("Phase", style="cyan")
+    table.add_column("Ready", style="green")
+    table.add_column("p50", justify="right")
+    table.add_column("p95", justify="right")
+    table.add_column("max", justify="right")
+    for phase in PHASES:
+        expected = [node for node in nodes if phase in node.phases]
+        times = [node.times[phase] for node in expected if phase in node.times]
+        if not expected:
+            continue
+        stats = [f"{percentile(times, p):.1f}" for p in (50, 95, 100)] if times else ["-", "-", "-"]
+        table.add_row(phase, f"{len(times)}/{len(expected)}", *stats)
+    console.print(table)
+
+    not_ready = [node for node in nodes if node.next_phase is not None]
+    if not_ready:
+        for node in not_ready:
+            console.print(
+                f"[red]{node.namespace}/{node.name} did not reach {node.next_phase}[/red]"
+            )
+        sys.exit(1)
+    console.print(f"[bold green]All {len(nodes)} nodes are ready[/bold green]")
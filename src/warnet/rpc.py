@@ -0,0 +1,285 @@
+import base64
+import http.client
+import json
+import os
+import select
+import socket
+import threading
+from collections import defaultdict
+from typing import Any, Optional
+
+from kubernetes.client.models import V1Pod
+
+from .constants import BITCOIN_RPC_USER
+from .k8s import get_default_namespace_or, get_pod, open_port_forward
+
+# Idle keep-alive connections kept per tank
+MAX_IDLE_CONNECTIONS = 4
+# Same as bitcoin-cli's -rpcclienttimeout
+DEFAULT_RPC_TIMEOUT = 900
+
+
+class RPCError(Exception):
+    """An error returned by bitcoind, formatted the way bitcoin-cli prints it"""
+
+    def __init__(self, code: int, message: str):
+        self.code = code
+        self.message = message
+        super().__init__(f"error code: {code}\nerror message:\n{message}\n")
+
+
+class RPCTransportError(Exception):
+    """The tank could not be reached over JSON-RPC, so the request never ran"""
+
+
+class RPCRequestLost(Exception):
+    """The request was sent but no reply came back, so it may or may not have run"""
+
+
+class _RawFloat(float):
+    """A float that remembers the exact digits bitcoind sent, e.g. 0.10000000"""
+
+    def __new__(cls, text: str):
+        number = super().__new__(cls, text)
+        number.raw = text
+        return number
+
+
+class _Connection:
+    def __init__(self, http: http.client.HTTPConnection, forward=None):
+        self.http = http
+        self.forward = forward
+
+    def close(self):
+        self.http.close()
+        if self.forward is not None:
+            self.forward.close()
+
+
+class RPCConnectionPool:
+    """
+    Keep-alive JSON-RPC connections to tanks.
+
+    From inside the cluster tanks are reached directly on their pod IP, otherwise
+    through a port-forward opened over the API server. Connections are returned to
+    the pool after each call and reused by later calls to the same tank.
+    """
+
+    def __init__(self, max_idle: int = MAX_IDLE_CONNECTIONS):
+        self.max_idle = max_idle
+        self.in_cluster = bool(os.environ.get("KUBERNETES_SERVICE_HOST"))
+        self._lock = threading.Lock()
+        self._idle: dict[tuple[str, str], list[_Connection]] = defaultdict(list)
+        self._endpoints: dict[tuple[str, str], tuple[str, int, str]] = {}
+        self._next_id = 0
+
+    def add_pods(self, pods: list[V1Pod]):
+        """Record the RPC endpoints of pods already at hand to skip looking them up"""
+        for pod in pods:
+            try:
+                self._add_endpoint(pod)
+            except RPCTransportError:
+                continue
+
+    def _add_endpoint(self, pod: V1Pod) -> tuple[str, int, str]:
+        try:
+            labels = pod.metadata.labels or {}
+            port = int(labels["RPCPort"])
+            password = labels["rpcpassword"]
+        except (KeyError, ValueError) as e:
+            raise RPCTransportError(f"{pod.metadata.name} has no RPC labels: {e}") from e
+        token = base64.b64encode(f"{BITCOIN_RPC_USER}:{password}".encode()).decode()
+        endpoint = (pod.status.pod_ip, port, f"Basic {token}")
+        with self._lock:
+            self._endpoints[(pod.metadata.namespace, pod.metadata.name)] = endpoint
+        return endpoint
+
+    def _endpoint(self, tank: str, namespace: str) -> tuple[str, int, str]:
+        with self._lock:
+            if (namespace, tank) in self._endpoints:
+                return self._endpoints[(namespace, tank)]
+        try:
+            pod = get_pod(tank, namespace)
+        except Exception as e:
+            raise RPCTransportError(f"Could not resolve RPC endpoint of {tank}: {e}") from e
+        return self._add_endpoint(pod)
+
+    def _connect(self, tank: str, namespace: str, timeout: float) -> _Connection:
+        host, port, _ = self._endpoint(tank, namespace)
+        try:
+            if self.in_cluster and host:
+                conn = http.client.HTTPConnection(host, port, timeout=timeout)
+                conn.connect()
+                return _Connection(conn)
+            forward = open_port_forward(tank, port, namespace)
+            sock = forward.socket(port)
+            sock.settimeout(timeout)
+            conn = http.client.HTTPConnection("localhost", port, timeout=timeout)
+            conn.sock = sock
+            return _Connection(conn, forward)
+        except Exception as e:
+            with self._lock:
+                self._endpoints.pop((namespace, tank), None)
+            raise RPCTransportError(f"Could not connect to {tank}: {e}") from e
+
+    def _checkout(self, key: tuple[str, str]) -> Optional[_Connection]:
+        while True:
+            with self._lock:
+                idle = self._idle[key]
+                if not idle:
+                    return None
+                conn = idle.pop()
+            # An idle connection is only readable once the server closed it
+            readable, _, _ = select.select([conn.http.sock], [], [], 0)
+            if not readable:
+                return conn
+            conn.close()
+
+    def _checkin(self, key: tuple[str, str], conn: _Connection):
+        with self._lock:
+            idle = self._idle[key]
+            if len(idle) < self.max_idle:
+                idle.append(conn)
+                return
+        conn.close()
+
+    def call(
+        self,
+        tank: str,
+        method: str,
+        params: Optional[list] = None,
+        namespace: Optional[str] = None,
+        timeout: float = DEFAULT_RPC_TIMEOUT,
+    ) -> Any:
+        """Call method on a tank and return the decoded result or raise RPCError"""
+        namespace = get_default_namespace_or(namespace)
+        key = (namespace, tank)
+        with self._lock:
+            self._next_id += 1
+            request_id = self._next_id
+        body = json.dumps(
+            {"jsonrpc": "1.0", "id": request_id, "method": method, "params": params or []}
+        )
+
+        _, _, auth = self._endpoint(tank, namespace)
+        while True:
+            conn = self._checkout(key)
+            reused = conn is not None
+            if conn is None:
+                conn = self._connect(tank, namespace, timeout)
+            try:
+                conn.http.sock.settimeout(timeout)
+                conn.http.request(
+                    "POST",
+                    "/",
+                    body,
+                    {"Authorization": auth, "Content-Type": "application/json"},
+                )
+            except (OSError, http.client.HTTPException) as e:
+                conn.close()
+                # The request was not sent whole, so bitcoind did not run it
+                if reused:
+                    continue
+                raise RPCTransportError(f"Could not send {method} to {tank}: {e}") from e
+            break
+
+        # From here on bitcoind may have run the request, so it is never sent again
+        try:
+            response = conn.http.getresponse()
+            data = response.read()
+        except socket.timeout as e:
+            conn.close()
+            raise RPCError(-344, f"{method} RPC took longer than {timeout} sec") from e
+        except (OSError, http.client.HTTPException) as e:
+            conn.close()
+            raise RPCRequestLost(
+                f"Connection to {tank} lost waiting for the reply to {method}, "
+                f"it may or may not have run: {e}"
+            ) from e
+
+        if response.will_close:
+            conn.close()
+        else:
+            self._checkin(key, conn)
+
+        try:
+            reply = json.loads(data, parse_float=_RawFloat)
+        except ValueError:
+            # e.g. 401 with an empty body when rpcpassword does not match
+            if response.status in (401, 403):
+                raise RPCTransportError(f"HTTP {response.status} response from {tank}") from None
+            raise RPCRequestLost(
+                f"Unexpected HTTP {response.status} response from {tank} to {method}"
+            ) from None
+        if reply.get("error"):
+            raise RPCError(reply["error"].get("code"), reply["error"].get("message"))
+        return reply.get("result")
+
+    def close(self):
+        with self._lock:
+            idle = [conn for conns in self._idle.values() for conn in conns]
+            self._idle.clear()
+        for conn in idle:
+            conn.close()
+
+
+_pool_lock = threading.Lock()
+_pools: dict[int, RPCConnectionPool] = {}
+
+
+def get_rpc_pool() -> RPCConnectionPool:
+    """Return the process-wide RPC connection pool"""
+    with _pool_lock:
+        pid = os.getpid()
+        if pid not in _pools:
+            _pools.clear()
+            _pools[pid] = RPCConnectionPool()
+        return _pools[pid]
+
+
+def rpc_call(
+    tank: str,
+    method: str,
+    params: Optional[list] = None,
+    namespace: Optional[str] = None,
+    timeout: float = DEFAULT_RPC_TIMEOUT,
+) -> Any:
+    return get_rpc_pool().call(tank, method, params, namespace, timeout)
+
+
+def format_result(result: Any) -> str:
+    """Render an RPC result exactly like bitcoin-cli writes it to stdout"""
+    if result is None:
+        return ""
+    if isinstance(result, str):
+        return result + "\n"
+    return _univalue(result) + "\n"
+
+
+def _univalue(value: Any, level: int = 0) -> str:
+    # Mirrors UniValue::write(2): two space indent, "key": value, empty
+    # containers still break the line
+    if isinstance(value, (dict, list)):
+        indent = "  " * (level + 1)
+        if isinstance(value, dict):
+            items = [
+                f"{json.dumps(k, ensure_ascii=False)}: {_univalue(v, level + 1)}"
+                for k, v in value.items()
+            ]
+            opening, closing = "{", "}"
+        else:
+            items = [_univalue(v, level + 1) for v in value]
+            opening, closing = "[", "]"
+        body = ",\n".join(indent + item for item in items)
+        if body:
+            body += "\n"
+        return f"{opening}\n{body}{'  ' * level}{closing}"
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if value is None:
+        return "null"
+    if isinstance(value, _RawFloat):
+        return value.raw
+    if isinstance(value, str):
+        return json.dumps(value, ensure_ascii=False)
+    return str(value)
@@ -0,0 +1,168 @@
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Callable
+
+import click
+from kubernetes.client.rest import ApiException
+from rich.progress import BarColumn, MofNCompleteColumn, Progress, TextColumn, TimeElapsedColumn
+from urllib3.exceptions import HTTPError
+
+from .constants import DEPLOY_RETRIES, DEPLOY_RETRY_BACKOFF, DEPLOY_RETRY_BACKOFF_MAX
+
+TRANSIENT_STATUS = {429, 500, 502, 503, 504}
+# Failures reported by helm or kubectl that are worth another attempt. A release
+# stuck with "another operation is in progress" is not one of them, it needs fixing.
+TRANSIENT_MESSAGES = (
+    "connection refused",
+    "connection reset",
+    "context deadline exceeded",
+    "etcdserver: request timed out",
+    "i/o timeout",
+    "the server is currently unable to handle the request",
+    "the server was unable to return a response",
+    "tls handshake timeout",
+    "too many requests",
+)
+
+
+def is_transient(error: Exception) -> bool:
+    """Whether a failed API request or helm command may succeed if tried again"""
+    if isinstance(error, ApiException):
+        return error.status in TRANSIENT_STATUS
+    if isinstance(error, (HTTPError, ConnectionError, TimeoutError)):
+        return True
+    message = str(error).lower()
+    return any(transient in message for transient in TRANSIENT_MESSAGES)
+
+
+def retry_delay(attempt: int) -> float:
+    """Exponential backoff with jitter, so retries from many workers spread out"""
+    delay = min(DEPLOY_RETRY_BACKOFF * 2**attempt, DEPLOY_RETRY_BACKOFF_MAX)
+    return delay / 2 + random.uniform(0, delay / 2)
+
+
+@dataclass
+class ScheduleResult:
+    results: dict[str, Any] = field(default_factory=dict)
+    failed: dict[str, Exception] = field(default_factory=dict)
+
+
+class _Counts:
+    def __init__(self, queued: int):
+        self.lock = threading.Lock()
+        self.queued = queued
+        self.applying = 0
+        self.done = 0
+        self.failed = 0
+
+    def move(self, src: str, dst: str):
+        with self.lock:
+            setattr(self, src, getattr(self, src) - 1)
+            setattr(self, dst, getattr(self, dst) + 1)
+
+    def __str__(self):
+        return (
+            f"queued {self.queued}  applying {self.applying}  "
+            f"done {self.done}  [red]failed {self.failed}[/red]"
+        )
+
+
+def run_scheduled(
+    tasks: dict[str, Callable[[], Any]],
+    workers: int,
+    description: str = "Deploying",
+    retries: int = DEPLOY_RETRIES,
+    show_progress: bool = True,
+) -> ScheduleResult:
+    """
+    Run named tasks on a bounded pool of worker threads.
+
+    A task failing with a transient error is tried again after a backoff, up to
+    `retries` more times. Progress is shown live, and the result holds the return
+    value of each task that succeeded and the last error of each that did not.
+    """
+    result = ScheduleResult()
+    if not tasks:
+        return result
+    counts = _Counts(len(tasks))
+
+    progress = Progress(
+        TextColumn("[bold blue]{task.description}"),
+        BarColumn(),
+        MofNCompleteColumn(),
+        TextColumn("{task.fields[counts]}"),
+        TimeElapsedColumn(),
+        disable=not show_progress,
+    )
+    bar = progress.add_task(description, total=len(tasks), counts=str(counts))
+
+    def run(name: str, task: Callable[[], Any]):
+        counts.move("queued", "applying")
+        progress.update(bar, counts=str(counts))
+        attempt = 0
+        while True:
+            try:
+                result.results[name] = task()
+                counts.move("applying", "done")
+                break
+            except Exception as e:
+                if attempt < retries and is_transient(e):
+                    time.sleep(retry_delay(attempt))
+                    attempt += 1
+                    continue
+                result.failed[name] = e
+                counts.move("applying", "failed")
+                break
+        progress.update(bar, advance=1, counts=str(counts))
+
+    with progress, ThreadPoolExecutor(max_workers=min(workers, len(tasks))) as executor:
+        for name, task in tasks.items():
+            executor.submit(run, name, task)
+    return result
+
+
+def interleave(queues: dict[str, dict[str, Callable[[], Any]]]) -> dict[str, Callable[[], Any]]:
+    """
+    Merge named groups of tasks round-robin into one queue, named group/task.
+
+    run_scheduled() starts tasks in order, so every group gets an equal share
+    of the workers instead of one group waiting for all groups before it.
+    """
+    merged = {}
+    iterators = [(group, iter(tasks.items())) for group, tasks in queues.items()]
+    while iterators:
+        remaining = []
+        for group, tasks in iterators:
+            item = next(tasks, None)
+            if item is None:
+                continue
+            name, task = item
+            merged[f"{group}/{name}"] = task
+            remaining.append((group, tasks))
+        iterators = remaining
+    return merged
+
+
+def split_results(result: ScheduleResult) -> dict[str, ScheduleResult]:
+    """Undo interleave() on a result, giving the result of each group"""
+    groups: dict[str, ScheduleResult] = {}
+    for attr in ("results", "failed"):
+        for key, value in getattr(result, attr).items():
+            group, name = key.split("/", 1)
+            getattr(groups.setdefault(group, ScheduleResult()), attr)[name] = value
+    return groups
+
+
+def print_failures(result: ScheduleResult, retry_command: str):
+    """Summarize failed tasks and how to retry only those"""
+    if not result.failed:
+        return
+    click.secho(f"{len(result.failed)} failed:", fg="red")
+    for name, error in sorted(result.failed.items()):
+        reason = str(error).strip().splitlines()
+        click.secho(f"  {name}: {reason[-1] if reason else type(error).__name__}", fg="red")
+    only = " ".join(f"--only {name}" for name in sorted(result.failed))
+    click.echo(f"To retry them run:\n  {retry_command} {only}")
@@ -1,6 +1,8 @@
 import sys
+from typing import Optional
 
 import click
+from kubernetes.client.models import V1Pod
 from kubernetes.config.config_exception import ConfigException
 from rich.console import Console
 from rich.panel import Panel
@@ -9,7 +11,7 @@ from rich.text import Text
 from urllib3.exceptions import MaxRetryError
 
 from .constants import COMMANDER_MISSION, LIGHTNING_MISSION, TANK_MISSION
-from .k8s import get_mission
+from .k8s import get_mission, get_missions
 from .network import _connected
 
 
@@ -19,9 +21,10 @@ def status():
     console = Console()
 
     try:
-        tanks = _get_tank_status()
-        lns = _get_ln_status()
-        scenarios = _get_deployed_scenarios()
+        crews = get_missions(TANK_MISSION, LIGHTNING_MISSION, COMMANDER_MISSION)
+        tanks = _get_tank_status(crews[TANK_MISSION])
+        lns = _get_ln_status(crews[LIGHTNING_MISSION])
+        scenarios = _get_deployed_scenarios(crews[COMMANDER_MISSION])
     except ConfigException as e:
         print(e)
         print(
@@ -89,11 +92,12 @@ def status():
     summary.append(f"\nTotal Tanks: {len(tanks)}", style="bold cyan")
     summary.append(f" | Active Scenarios: {active}", style="bold green")
     console.print(summary)
-    _connected(end="\r")
+    _connected(end="\r", tanks=crews[TANK_MISSION])
 
 
-def _get_tank_status():
-    tanks = get_mission(TANK_MISSION)
+def _get_tank_status(tanks: Optional[list[V1Pod]] = None):
+    if tanks is None:
+        tanks = get_mission(TANK_MISSION)
     return [
         {
             "name": tank.metadata.name,
@@ -104,8 +108,9 @@ def _get_tank_status():
     ]
 
 
-def _get_ln_status():
-    tanks = get_mission(LIGHTNING_MISSION)
+def _get_ln_status(tanks: Optional[list[V1Pod]] = None):
+    if tanks is None:
+        tanks = get_mission(LIGHTNING_MISSION)
     return [
         {
             "name": tank.metadata.name,
@@ -116,8 +121,9 @@ def _get_ln_status():
     ]
 
 
-def _get_deployed_scenarios():
-    commanders = get_mission(COMMANDER_MISSION)
+def _get_deployed_scenarios(commanders: Optional[list[V1Pod]] = None):
+    if commanders is None:
+        commanders = get_mission(COMMANDER_MISSION)
     return [
         {
             "name": c.metadata.name,
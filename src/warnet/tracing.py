@@ -0,0 +1,112 @@
+import functools
+import json
+import multiprocessing
+import os
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Optional
+
+# Set while tracing; the environment carries it to every worker process
+TRACE_FILE_ENV = "WARNET_TRACE_SPANS"
+
+_write_lock = threading.Lock()
+
+
+def start_tracing(output: Path) -> Path:
+    """Record spans from this process and its children next to output"""
+    spans_file = Path(f"{output}.spans.jsonl")
+    spans_file.unlink(missing_ok=True)
+    spans_file.touch()
+    os.environ[TRACE_FILE_ENV] = str(spans_file.resolve())
+    return spans_file
+
+
+def _spans_file() -> Optional[str]:
+    return os.environ.get(TRACE_FILE_ENV)
+
+
+@contextmanager
+def span(name: str, **args):
+    """
+    Time the enclosed block as a span named name, with args such as the node
+    and namespace attached. Does nothing unless tracing was started.
+    """
+    spans_file = _spans_file()
+    if not spans_file:
+        yield
+        return
+    start = time.time_ns()
+    error = None
+    try:
+        yield
+    except BaseException as e:
+        error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        record = {
+            "name": name,
+            "start": start // 1000,
+            "duration": (time.time_ns() - start) // 1000,
+            "pid": os.getpid(),
+            "tid": threading.get_native_id(),
+            "process": multiprocessing.current_process().name,
+            "thread": threading.current_thread().name,
+            "args": {k: v for k, v in args.items() if v is not None},
+        }
+        if error:
+            record["args"]["error"] = error
+        line = json.dumps(record, default=str) + "\n"
+        # One append per span keeps lines from concurrent processes whole
+        with _write_lock, open(spans_file, "a") as f:
+            f.write(line)
+
+
+def traced(name: str):
+    """Decorator recording each call of a function as a span"""
+
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def write_chrome_trace(spans_file: Path, output: Path):
+    """Convert recorded spans to the Chrome trace format read by chrome://tracing and Perfetto"""
+    events = []
+    names = {}
+    with open(spans_file) as f:
+        for line in f:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            names[("process_name", record["pid"], 0)] = record["process"]
+            names[("thread_name", record["pid"], record["tid"])] = record["thread"]
+            events.append(
+                {
+                    "name": record["name"],
+                    "cat": "deploy",
+                    "ph": "X",
+                    "ts": record["start"],
+                    "dur": record["duration"],
+                    "pid": record["pid"],
+                    "tid": record["tid"],
+                    "args": record["args"],
+                }
+            )
+    for (kind, pid, tid), name in names.items():
+        events.append({"name": kind, "ph": "M", "pid": pid, "tid": tid, "args": {"name": name}})
+    with open(output, "w") as f:
+        json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+
+
+def stop_tracing(spans_file: Path, output: Path):
+    os.environ.pop(TRACE_FILE_ENV, None)
+    write_chrome_trace(spans_file, output)
+    spans_file.unlink()
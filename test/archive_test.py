@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+
+import io
+import os
+import tempfile
+import zipfile
+from pathlib import Path
+from unittest import mock
+
+from test_base import TestBase
+
+from warnet import archive
+from warnet.archive import framework_archive, import_graph, publish_scenario
+
+
+class ArchiveTest(TestBase):
+    def __init__(self):
+        super().__init__()
+        self.scenarios_dir = (
+            Path(os.path.dirname(__file__)).parent / "resources" / "scenarios"
+        ).resolve()
+
+    def run_test(self):
+        self.test_import_graph()
+        self.test_relative_imports()
+        self.test_framework_archive()
+        self.test_size_limit()
+        self.test_cache_pruning()
+        self.log.info("All scenario archive tests passed.")
+
+    def relative(self, files):
+        return sorted(str(path.relative_to(self.scenarios_dir)) for path in files)
+
+    def test_import_graph(self):
+        self.log.info("Following the imports of a scenario")
+        scenario = self.scenarios_dir / "test_scenarios" / "connect_dag.py"
+        assert self.relative(import_graph(scenario, self.scenarios_dir, True)) == [
+            "test_scenarios/__init__.py",
+            "test_scenarios/connect_dag.py",
+        ]
+        bundled = self.relative(import_graph(scenario, self.scenarios_dir, False))
+        assert "commander.py" in bundled
+        assert "test_framework/messages.py" in bundled
+        # Framework modules the scenario never reaches stay out
+        assert "test_framework/bdb.py" not in bundled
+
+    def test_relative_imports(self):
+        self.log.info("Following relative imports")
+        with tempfile.TemporaryDirectory() as tmp:
+            source = Path(tmp)
+            (source / "pkg").mkdir()
+            (source / "pkg" / "__init__.py").write_text("")
+            (source / "pkg" / "helpers.py").write_text("import json\n")
+            (source / "pkg" / "unused.py").write_text("")
+            (source / "pkg" / "scenario.py").write_text("from . import helpers\n")
+            files = import_graph(source / "pkg" / "scenario.py", source, True)
+            assert sorted(path.name for path in files) == [
+                "__init__.py",
+                "helpers.py",
+                "scenario.py",
+            ]
+
+    def test_framework_archive(self):
+        self.log.info("Caching the framework archive by content")
+        with (
+            tempfile.TemporaryDirectory() as tmp,
+            mock.patch.object(archive, "ARCHIVE_CACHE_DIR", Path(tmp)),
+        ):
+            digest, data = framework_archive(self.scenarios_dir)
+            names = zipfile.ZipFile(io.BytesIO(data)).namelist()
+            assert "commander.py" in names and "ln_framework/ln.py" in names
+            assert not any(name.endswith(".pyc") for name in names)
+            assert (Path(tmp) / f"{digest}.zip").exists()
+            assert framework_archive(self.scenarios_dir) == (digest, data)
+
+    def test_size_limit(self):
+        self.log.info("Refusing archives too large for a ConfigMap")
+        scenario = self.scenarios_dir / "test_scenarios" / "connect_dag.py"
+        with (
+            tempfile.TemporaryDirectory() as tmp,
+            mock.patch.multiple(archive, ARCHIVE_CACHE_DIR=Path(tmp), MAX_ARCHIVE_SIZE=1024),
+        ):
+            try:
+                # The framework does not fit either, so it is bundled with the scenario
+                assert framework_archive(self.scenarios_dir) is None
+                publish_scenario(scenario, self.scenarios_dir, "default")
+            except ValueError as e:
+                assert "connect_dag.py" in str(e)
+            else:
+                raise AssertionError("Expected the archive to be rejected")
+
+    def test_cache_pruning(self):
+        self.log.info("Keeping only the most recently used archives")
+        with (
+            tempfile.TemporaryDirectory() as tmp,
+            mock.patch.multiple(archive, ARCHIVE_CACHE_DIR=Path(tmp), ARCHIVE_CACHE_ENTRIES=2),
+        ):
+            archive._cached("a", lambda: b"a")
+            archive._cached("b", lambda: b"b")
+            os.utime(Path(tmp) / "a.zip", (0, 0))
+            os.utime(Path(tmp) / "b.zip", (1, 1))
+            # Reading "a" makes "b" the least recently used
+            assert archive._cached("a", lambda: b"rebuilt") == b"a"
+            archive._cached("c", lambda: b"c")
+            assert sorted(path.name for path in Path(tmp).iterdir()) == ["a.zip", "c.zip"]
+
+
+if __name__ == "__main__":
+    test = ArchiveTest()
+    test.run_test()
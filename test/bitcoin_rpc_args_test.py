@@ -8,9 +8,9 @@ from unittest.mock import patch
 # Import TestBase for consistent test structure
 from test_base import TestBase
 
-from warnet.bitcoin import _rpc
+from warnet.bitcoin import _json_params, _rpc_exec
 
-# Import _rpc from warnet.bitcoin and run_command from warnet.process
+# Import _rpc_exec from warnet.bitcoin and run_command from warnet.process
 sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
 
 # Edge cases to test
@@ -109,6 +109,22 @@ EDGE_CASES = [
 ]
 
 
+# (params, expected JSON-RPC params) for the native transport
+JSON_PARAM_CASES = [
+    ([], []),
+    (
+        ["1", "bcrt1qsrsmr7f77kcxggk99yp2h8yjzv29lxhet4efwn"],
+        [1, "bcrt1qsrsmr7f77kcxggk99yp2h8yjzv29lxhet4efwn"],
+    ),
+    (
+        ['[{"bcrt1qsrsmr7f77kcxggk99yp2h8yjzv29lxhet4efwn":0.1}]', "1", "economical"],
+        [[{"bcrt1qsrsmr7f77kcxggk99yp2h8yjzv29lxhet4efwn": 0.1}], 1, "economical"],
+    ),
+    (['[{"desc":', '"addr(x)"}]'], [[{"desc": "addr(x)"}]]),
+    (["true", "null", "eco nomical"], [True, None, "eco nomical"]),
+]
+
+
 class BitcoinRPCRPCArgsTest(TestBase):
     def __init__(self):
         super().__init__()
@@ -117,7 +133,7 @@ class BitcoinRPCRPCArgsTest(TestBase):
         self.captured_cmds = []
 
     def run_test(self):
-        self.log.info("Testing bitcoin _rpc argument handling edge cases")
+        self.log.info("Testing bitcoin _rpc_exec argument handling edge cases")
         for params, expected_suffix, should_fail in EDGE_CASES:
             # Extract the method from the expected suffix
             method = expected_suffix[0]
@@ -125,7 +141,7 @@ class BitcoinRPCRPCArgsTest(TestBase):
             with patch("warnet.bitcoin.run_command") as mock_run_command:
                 mock_run_command.return_value = "MOCKED"
                 try:
-                    _rpc(self.tank, method, params, self.namespace)
+                    _rpc_exec(self.tank, method, params, self.namespace)
                     called_args = mock_run_command.call_args[0][0]
                     self.captured_cmds.append(called_args)
                     # Parse the command string into arguments for comparison
@@ -139,6 +155,10 @@ class BitcoinRPCRPCArgsTest(TestBase):
                     if not should_fail:
                         raise AssertionError(f"Unexpected failure for params: {params}: {e}") from e
                     self.log.info(f"Expected failure for params: {params}: {e}")
+        self.log.info("Testing JSON-RPC param decoding")
+        for params, expected in JSON_PARAM_CASES:
+            decoded = _json_params(params)
+            assert decoded == expected, f"Params: {params} | Got: {decoded} | Expected: {expected}"
         self.log.info("All edge case argument tests passed.")
 
 
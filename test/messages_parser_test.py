@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+
+import struct
+
+from test_base import TestBase
+from test_framework.messages import msg_ping, msg_verack
+
+from warnet.bitcoin import iter_raw_messages, parse_raw_messages
+
+
+def capture_record(time: int, msgtype: bytes, payload: bytes) -> bytes:
+    return struct.pack("<Q12sI", time, msgtype, len(payload)) + payload
+
+
+class MessagesParserTest(TestBase):
+    def __init__(self):
+        super().__init__()
+        self.blob = b"".join(
+            [
+                capture_record(1_000_000, b"verack", msg_verack().serialize()),
+                capture_record(2_000_000, b"ping", msg_ping(42).serialize()),
+                capture_record(3_000_000, b"notreal", b"\x01\x02"),
+                capture_record(4_000_000, b"ping", b"\x01"),  # truncated body
+                capture_record(5_000_000, b"ping", msg_ping(7).serialize()),
+            ]
+        )
+
+    def run_test(self):
+        self.test_parse_raw_messages()
+        self.test_filters()
+        self.test_truncated_capture()
+        self.log.info("All message capture parser tests passed.")
+
+    def test_parse_raw_messages(self):
+        self.log.info("Testing parse_raw_messages")
+        messages = parse_raw_messages(self.blob, outbound=True)
+        assert [m["msgtype"] for m in messages] == ["verack", "ping", "notreal", "ping", "ping"]
+        assert messages[0] == {"outbound": True, "time": 1_000_000, "size": 0, "msgtype": "verack"}
+        assert messages[1]["body"] == {"nonce": 42}
+        assert messages[2]["body"] == "0102"
+        assert messages[2]["error"] == "Unrecognized message type."
+        assert messages[3]["body"] == "01"
+        assert messages[3]["error"] == "Unable to deserialize message."
+        assert messages[4]["body"] == {"nonce": 7}
+
+    def test_filters(self):
+        self.log.info("Testing msgtype and time filters")
+        pings = list(iter_raw_messages(self.blob, False, msgtypes={"ping"}))
+        assert [m.time for m in pings] == [2_000_000, 4_000_000, 5_000_000]
+        assert all(not m.outbound for m in pings)
+
+        window = list(iter_raw_messages(self.blob, False, since=2_000_000, until=4_000_000))
+        assert [m.msgtype for m in window] == ["ping", "notreal", "ping"]
+
+        assert pings[2].body().nonce == 7
+
+    def test_truncated_capture(self):
+        self.log.info("Testing a capture cut off in the middle of a header")
+        messages = parse_raw_messages(self.blob + b"\x00" * 10, outbound=False)
+        assert len(messages) == 5
+
+
+if __name__ == "__main__":
+    test = MessagesParserTest()
+    test.run_test()
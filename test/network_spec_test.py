@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+
+import os
+import tempfile
+from pathlib import Path
+
+from test_base import TestBase
+
+from warnet.constants import HookValue
+from warnet.network_spec import NetworkSpec, NetworkSpecError
+
+
+class NetworkSpecTest(TestBase):
+    def __init__(self):
+        super().__init__()
+        self.data_dir = Path(os.path.dirname(__file__)) / "data"
+
+    def run_test(self):
+        self.test_load_networks()
+        self.test_plugins()
+        self.test_invalid_network()
+        self.log.info("All network spec tests passed.")
+
+    def test_load_networks(self):
+        self.log.info("Loading the test networks")
+        spec = NetworkSpec.load(self.data_dir / "12_node_ring")
+        assert len(spec.nodes) == 12
+        assert spec.defaults_file == self.data_dir / "12_node_ring" / "node-defaults.yaml"
+
+        ln = NetworkSpec.load(self.data_dir / "ln")
+        assert ln.needs_ln_init
+
+        logging = NetworkSpec.load(self.data_dir / "logging")
+        assert logging.logging_required
+
+    def test_plugins(self):
+        self.log.info("Testing plugin hooks")
+        spec = NetworkSpec.load(self.data_dir / "network_with_plugins")
+        post_deploy = spec.hook_plugins(HookValue.POST_DEPLOY)
+        assert [plugin.name for plugin in post_deploy] == ["hello", "simln"]
+        assert post_deploy[0].entrypoint == spec.directory / "../plugins/hello"
+        assert post_deploy[0].content["podName"] == "hello-post-deploy"
+
+    def test_invalid_network(self):
+        self.log.info("Testing that every problem is reported at once")
+        with tempfile.TemporaryDirectory() as tmp:
+            directory = Path(tmp)
+            (directory / "node-defaults.yaml").write_text("image:\n  tag: '27.0'\n")
+            (directory / "network.yaml").write_text(
+                "nodes:\n"
+                "  - name: tank-0000\n"
+                "  - name: tank-0000\n"
+                "  - name: Tank_1\n"
+                "plugins:\n"
+                "  preNodes:\n"
+                "    hello: {}\n"
+                "  postDeploy:\n"
+                "    hello:\n"
+                "      helloTo: nobody\n"
+            )
+            try:
+                NetworkSpec.load(directory)
+            except NetworkSpecError as e:
+                assert len(e.problems) == 4, e.problems
+                assert "used more than once" in e.problems[0]
+                assert "Tank_1" in e.problems[1]
+                assert "preNodes" in e.problems[2]
+                assert "entrypoint" in e.problems[3]
+            else:
+                raise AssertionError("Expected NetworkSpecError")
+
+
+if __name__ == "__main__":
+    test = NetworkSpecTest()
+    test.run_test()
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+
+import os
+from decimal import Decimal
+from pathlib import Path
+
+from test_base import TestBase
+
+from warnet.network_spec import NetworkSpec
+from warnet.plan import NetworkPlan, NodePool, PodRequest, pack, plan_network
+
+
+def pod(name, cpu="0", memory="0", init_cpu=None):
+    spec = {
+        "containers": [
+            {
+                "name": "bitcoincore",
+                "image": "bitcoindevproject/bitcoin:27.0",
+                "resources": {"requests": {"cpu": cpu, "memory": memory}},
+            },
+            {"name": "prometheus", "image": "jvstein/bitcoin-prometheus-exporter:latest"},
+        ]
+    }
+    if init_cpu:
+        spec["initContainers"] = [
+            {
+                "name": "init",
+                "image": "busybox",
+                "resources": {"requests": {"cpu": init_cpu}},
+            }
+        ]
+    return {
+        "apiVersion": "v1",
+        "kind": "Pod",
+        "metadata": {"name": name, "labels": {"mission": "tank"}},
+        "spec": spec,
+    }
+
+
+class PlanTest(TestBase):
+    def __init__(self):
+        super().__init__()
+        self.data_dir = Path(os.path.dirname(__file__)) / "data"
+
+    def run_test(self):
+        self.test_node_pool()
+        self.test_totals()
+        self.test_pack()
+        self.test_plan_network()
+        self.log.info("All deploy plan tests passed.")
+
+    def test_node_pool(self):
+        self.log.info("Parsing node pool shapes")
+        pool = NodePool.parse("10x4/16Gi")
+        assert (pool.count, pool.cpu, pool.memory, pool.max_pods) == (10, 4, 16 * 2**30, 110)
+        assert NodePool.parse("3x500m/1Gi/20").max_pods == 20
+        for invalid in ["10x4", "x4/16Gi", "0x4/16Gi", "2x0/1Gi"]:
+            try:
+                NodePool.parse(invalid)
+            except ValueError:
+                continue
+            raise AssertionError(f"Expected {invalid} to be rejected")
+
+    def test_totals(self):
+        self.log.info("Totalling rendered objects")
+        plan = NetworkPlan()
+        plan.add(
+            [
+                pod("tank-0000", "500m", "1Gi"),
+                pod("tank-0001", "250m", "512Mi", init_cpu="1"),
+                {"apiVersion": "v1", "kind": "Service", "metadata": {"name": "tank-0000"}},
+                {"apiVersion": "v1", "kind": "ConfigMap", "metadata": {"name": "tank-0000"}},
+            ]
+        )
+        assert len(plan.pods) == 2
+        assert plan.containers == 5
+        assert plan.kinds["Service"] == 1 and plan.kinds["ConfigMap"] == 1
+        # The init container of tank-0001 needs more cpu than its containers together
+        assert plan.cpu == Decimal("1.5"), plan.cpu
+        assert plan.memory == Decimal(1.5 * 2**30)
+        assert plan.images[("tank/bitcoincore", "bitcoindevproject/bitcoin:27.0")][0] == 2
+        assert ("tank/init (init)", "busybox") in plan.images
+
+    def test_pack(self):
+        self.log.info("Packing pods onto node pools")
+        pods = [
+            PodRequest(f"tank-{i:04d}", "tank", Decimal("1"), Decimal(2 * 2**30)) for i in range(10)
+        ]
+        pool = NodePool.parse("3x4/16Gi")
+        placement = pack(pods, pool, pool.count)
+        assert placement.fits and placement.nodes_used == 3
+
+        small = NodePool.parse("2x4/16Gi")
+        placement = pack(pods, small, small.count)
+        assert len(placement.unplaced) == 2
+        assert pack(pods, small).nodes_used == 3
+
+        # Pods without requests are only limited by the number of pods per node
+        empty = [PodRequest(f"tank-{i:04d}", "tank", Decimal(0), Decimal(0)) for i in range(5)]
+        assert pack(empty, NodePool.parse("1x1/1Gi/4")).nodes_used == 2
+
+        too_big = [PodRequest("tank-0000", "tank", Decimal(8), Decimal(0))]
+        assert not pack(too_big, pool).fits
+
+    def test_plan_network(self):
+        self.log.info("Rendering a network offline")
+        spec = NetworkSpec.load(self.data_dir / "12_node_ring")
+        plan = plan_network(spec, "default")
+        assert len(plan.pods) == 12
+        assert plan.kinds["Service"] >= 12
+        assert all(pod.role == "tank" for pod in plan.pods)
+
+
+if __name__ == "__main__":
+    test = PlanTest()
+    test.run_test()
@@ -16,6 +16,7 @@ class RPCTest(TestBase):
         try:
             self.setup_network()
             self.test_rpc_commands()
+            self.test_rpc_fan_out()
             self.test_transaction_propagation()
             self.test_message_exchange()
             self.test_address_manager()
@@ -35,6 +36,23 @@ class RPCTest(TestBase):
         self.warnet("bitcoin rpc tank-0001 -generate 101")
         self.wait_for_predicate(lambda: "101" in self.warnet("bitcoin rpc tank-0000 getblockcount"))
 
+    def test_rpc_fan_out(self):
+        self.log.info("Testing RPC fan out to all tanks")
+
+        def all_synced():
+            lines = self.warnet("bitcoin rpc --all --summary getblockcount").splitlines()
+            results = [json.loads(line) for line in lines]
+            summary = results.pop()["summary"]
+            assert len(results) == 12, f"Expected 12 tanks, got {len(results)}"
+            assert {r["tank"] for r in results} == {f"tank-{i:04d}" for i in range(12)}
+            return summary["min"] == summary["max"] == 101
+
+        self.wait_for_predicate(all_synced)
+
+        lines = self.warnet("bitcoin rpc --selector app=tank-0000 getblockcount").splitlines()
+        assert len(lines) == 1, f"Expected one tank to match the selector, got {lines}"
+        assert json.loads(lines[0])["result"] == 101
+
     def test_transaction_propagation(self):
         self.log.info("Testing transaction propagation")
         address = "bcrt1qthmht0k2qnh3wy7336z05lu2km7emzfpm3wg46"